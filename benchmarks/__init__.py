@@ -0,0 +1,14 @@
+"""
+Package: benchmarks
+HTTP load benchmarks of the Wishlist service
+
+    python -m benchmarks seed --wishlists 10000 --items-min 10 --items-max 100
+    python -m benchmarks run --output benchmarks/results.json
+    python -m benchmarks compare benchmarks/baseline.json benchmarks/results.json
+    python -m benchmarks serialize --items 100 1000 10000
+
+seed fills a local database, run starts the service against it and drives
+every endpoint with concurrent clients, and compare flags the endpoints that
+got slower than a stored baseline. All of them read DATABASE_URI. serialize
+times the JSON encoding of large wishlists in memory.
+"""
@@ -0,0 +1,48 @@
+"""
+Comparison
+
+Flags the endpoints of a benchmark run that got slower, started failing or
+used more memory than in a stored baseline run
+"""
+import json
+
+# metric: True if higher is better
+METRICS = {"rps": True, "p50_ms": False, "p95_ms": False, "p99_ms": False, "peak_rss_mb": False}
+
+
+def load(path: str) -> dict:
+    """Returns the results of a run written by benchmarks.load.report()"""
+    with open(path, encoding="utf-8") as results:
+        return json.load(results)["endpoints"]
+
+
+def compare(baseline: dict, current: dict, threshold: float = 0.10) -> list:
+    """Returns a message for every regression by more than threshold (0.10 = 10%)"""
+    regressions = []
+    for endpoint, before in sorted(baseline.items()):
+        after = current.get(endpoint)
+        if after is None:
+            regressions.append(f"{endpoint}: missing from the current run")
+            continue
+        if after["errors"] > before["errors"]:
+            regressions.append(f"{endpoint}: errors {before['errors']} -> {after['errors']}")
+        for metric, higher_is_better in METRICS.items():
+            old, new = before[metric], after[metric]
+            if not old:
+                continue
+            change = (new - old) / old
+            if (-change if higher_is_better else change) > threshold:
+                regressions.append(f"{endpoint}: {metric} {old} -> {new} ({change:+.0%})")
+    return regressions
+
+
+def table(baseline: dict, current: dict) -> str:
+    """Returns the throughput and p95 latency of both runs side by side"""
+    lines = [f"{'endpoint':40} {'rps':>17} {'p95 ms':>19}"]
+    for endpoint in sorted(set(baseline) | set(current)):
+        before, after = baseline.get(endpoint, {}), current.get(endpoint, {})
+        lines.append(
+            f"{endpoint:40} {before.get('rps', '-'):>8} {after.get('rps', '-'):>8} "
+            f"{before.get('p95_ms', '-'):>9} {after.get('p95_ms', '-'):>9}"
+        )
+    return "\n".join(lines)
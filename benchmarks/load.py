@@ -0,0 +1,377 @@
+"""
+Load Generation
+
+Starts the service in a server process of its own, sends the requests of
+every endpoint scenario from concurrent keep-alive clients and measures the
+throughput, the latency percentiles and the peak RSS of the server
+"""
+import http.client
+import itertools
+import json
+import logging
+import math
+import os
+import random
+import subprocess
+import sys
+import threading
+import time
+from urllib.parse import quote
+from sqlalchemy import create_engine, func, select
+from benchmarks.seed import CATEGORIES
+from service.models import Item, Wishlist
+
+logger = logging.getLogger("benchmarks")
+
+API = "/api/wishlists"
+ITEMS_API = "/api/items"
+JSON_HEADERS = {"Content-Type": "application/json", "Accept": "application/json"}
+
+
+######################################################################
+#  S E R V E R
+######################################################################
+class Server():
+    """The service running in gunicorn or uvicorn worker processes"""
+
+    # pylint: disable=too-many-arguments
+    def __init__(self, database_uri: str, kind: str = "gunicorn", workers: int = 2, port: int = 8099, env: dict = None):
+        self.database_uri = database_uri
+        self.kind = kind
+        self.workers = workers
+        self.port = port
+        self.env = env or {}
+        self.process = None
+
+    def command(self) -> list:
+        """Returns the command line that starts the server"""
+        if self.kind == "uvicorn":
+            return [sys.executable, "-m", "uvicorn", "--port", str(self.port), "--workers", str(self.workers),
+                    "--log-level", "warning", "service.asgi:app"]
+        return [sys.executable, "-m", "gunicorn", "--bind", f"127.0.0.1:{self.port}", "--workers", str(self.workers),
+                "--log-level", "warning", "service:app"]
+
+    def start(self, timeout: float = 30):
+        """Starts the server and waits until /health answers"""
+        env = dict(os.environ, DATABASE_URI=self.database_uri, **self.env)
+        self.process = subprocess.Popen(self.command(), env=env)  # pylint: disable=consider-using-with
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if self.process.poll() is not None:
+                raise RuntimeError(f"{self.kind} exited with status {self.process.returncode}")
+            try:
+                connection = http.client.HTTPConnection("127.0.0.1", self.port, timeout=1)
+                connection.request("GET", "/health")
+                if connection.getresponse().status == 200:
+                    return
+            except OSError:
+                time.sleep(0.2)
+        self.stop()
+        raise RuntimeError(f"{self.kind} did not answer /health within {timeout} seconds")
+
+    def stop(self):
+        """Stops the server and its workers"""
+        if self.process and self.process.poll() is None:
+            self.process.terminate()
+            try:
+                self.process.wait(10)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+
+    def rss(self) -> int:
+        """Returns the resident memory of the server and its workers in bytes"""
+        return process_tree_rss(self.process.pid) if self.process else 0
+
+
+def process_tree_rss(pid: int) -> int:
+    """Returns the RSS of a process and all of its descendants (Linux only, else 0)"""
+    children = {}
+    for entry in os.listdir("/proc") if os.path.isdir("/proc") else []:
+        if entry.isdigit():
+            try:
+                with open(f"/proc/{entry}/stat", encoding="utf-8") as stat:
+                    parent = int(stat.read().rsplit(")", 1)[1].split()[1])
+            except (OSError, IndexError, ValueError):
+                continue
+            children.setdefault(parent, []).append(int(entry))
+    total, pending = 0, [pid]
+    while pending:
+        current = pending.pop()
+        pending.extend(children.get(current, []))
+        try:
+            with open(f"/proc/{current}/status", encoding="utf-8") as status:
+                for line in status:
+                    if line.startswith("VmRSS:"):
+                        total += int(line.split()[1]) * 1024
+        except OSError:
+            continue
+    return total
+
+
+class RssSampler(threading.Thread):
+    """Records the peak RSS of the server while a scenario runs"""
+
+    def __init__(self, server: Server, interval: float = 0.05):
+        super().__init__(daemon=True)
+        self.server = server
+        self.interval = interval
+        self.peak = 0
+        self.done = threading.Event()
+
+    def run(self):
+        while not self.done.is_set():
+            self.peak = max(self.peak, self.server.rss())
+            self.done.wait(self.interval)
+
+    def stop(self) -> int:
+        """Stops sampling and returns the peak RSS in bytes"""
+        self.done.set()
+        self.join()
+        return max(self.peak, self.server.rss())
+
+
+######################################################################
+#  S C E N A R I O S
+######################################################################
+class Dataset():  # pylint: disable=too-few-public-methods
+    """Samples of the seeded rows that the read scenarios request"""
+
+    def __init__(self, database_uri: str, size: int = 1000, rng_seed: int = 2022):
+        engine = create_engine(database_uri)
+        wishlist, item = Wishlist.__table__, Item.__table__
+        with engine.connect() as connection:
+            self.wishlists = connection.execute(
+                select(wishlist.c.id, wishlist.c.user_id, wishlist.c.name).order_by(func.random()).limit(size)
+            ).all()
+            self.items = connection.execute(
+                select(item.c.id, item.c.wishlist_id).order_by(func.random()).limit(size)
+            ).all()
+            self.next_item_id = connection.execute(select(func.coalesce(func.max(item.c.id), 0))).scalar() + 1
+        engine.dispose()
+        if not self.wishlists or not self.items:
+            raise RuntimeError("The database has no wishlists or items, run: python -m benchmarks seed")
+        self.rng = random.Random(rng_seed)
+        self.item_ids = itertools.count(self.next_item_id + 1000000)
+        # wishlists and items created by the write scenarios for the later ones to change
+        self.created_wishlists = []
+        self.created_items = []
+
+    def wishlist(self):
+        """Returns a random seeded wishlist"""
+        return self.rng.choice(self.wishlists)
+
+    def new_item(self, wishlist_id) -> dict:
+        """Returns the JSON of an item that does not exist yet"""
+        item_id = next(self.item_ids)
+        return {"id": item_id, "wishlist_id": wishlist_id, "name": f"item {item_id}", "category": "food",
+                "price": 9.99, "description": "benchmark item"}
+
+
+class Scenario():  # pylint: disable=too-few-public-methods
+    """The requests of one endpoint
+
+    Args:
+        build: returns the (method, path, JSON body) of the n-th request
+        captures: the created wishlists or items are kept for later scenarios
+        needs: "wishlists" or "items" that earlier scenarios must have created
+    """
+
+    def __init__(self, name: str, build, captures: bool = False, needs: str = None):
+        self.name = name
+        self.build = build
+        self.captures = captures
+        self.needs = needs
+
+
+def scenarios(data: Dataset) -> list:
+    """Returns the scenario of every endpoint in the order they run
+
+    The write scenarios only change wishlists created by the benchmark, so the
+    seeded data stays the same from one run to the next
+    """
+    def wishlist_json(number):
+        return {"name": f"bench {number}", "user_id": 1, "is_enabled": True, "items": []}
+
+    def created_id(number):
+        return data.created_wishlists[number % len(data.created_wishlists)]
+
+    def created(number):
+        return f"{API}/{created_id(number)}"
+
+    def created_item(number):
+        return data.created_items[number % len(data.created_items)]
+
+    def seeded(number):  # pylint: disable=unused-argument
+        return f"{API}/{data.wishlist().id}"
+
+    def by_user(number):  # pylint: disable=unused-argument
+        return f"{API}?user_id={data.wishlist().user_id}"
+
+    def by_name(number):  # pylint: disable=unused-argument
+        return f"{API}?limit=20&name={quote(data.wishlist().name, safe='')}"
+
+    def seeded_item(number):  # pylint: disable=unused-argument
+        return items_url(data.rng.choice(data.items))
+
+    return [
+        Scenario("GET /wishlists", lambda n: ("GET", f"{API}?limit=20", None)),
+        Scenario("GET /wishlists?user_id", lambda n: ("GET", by_user(n), None)),
+        Scenario("GET /wishlists?name", lambda n: ("GET", by_name(n), None)),
+        Scenario("GET /wishlists/{id}", lambda n: ("GET", seeded(n), None)),
+        Scenario("GET /wishlists/{id}/items", lambda n: ("GET", f"{seeded(n)}/items", None)),
+        Scenario("GET /wishlists/{id}/items/{item_id}", lambda n: ("GET", seeded_item(n), None)),
+        Scenario("GET /items?category", lambda n: ("GET", item_query(data), None)),
+        Scenario("GET /items/search", lambda n: ("GET", item_search(data), None)),
+        Scenario("POST /wishlists", lambda n: ("POST", API, wishlist_json(n)), captures=True),
+        Scenario("PUT /wishlists/{id}", lambda n: ("PUT", created(n), wishlist_json(n)), needs="wishlists"),
+        Scenario(
+            "POST /wishlists/{id}/items",
+            lambda n: ("POST", f"{created(n)}/items", data.new_item(created_id(n))),
+            captures=True, needs="wishlists",
+        ),
+        Scenario(
+            "POST /wishlists/{id}/items:batch",
+            lambda n: ("POST", f"{created(n)}/items:batch", [data.new_item(created_id(n)) for _ in range(10)]),
+            needs="wishlists",
+        ),
+        Scenario(
+            "PUT /wishlists/{id}/items/{item_id}",
+            lambda n: ("PUT", items_url(created_item(n)), item_json(created_item(n))),
+            needs="items",
+        ),
+        Scenario(
+            "DELETE /wishlists/{id}/items/{item_id}",
+            lambda n: ("DELETE", items_url(created_item(n)), None),
+            needs="items",
+        ),
+        Scenario("PUT /wishlists/{id}/clear", lambda n: ("PUT", f"{created(n)}/clear", None), needs="wishlists"),
+        Scenario("DELETE /wishlists/{id}", lambda n: ("DELETE", created(n), None), needs="wishlists"),
+    ]
+
+
+def items_url(item) -> str:
+    """Returns the URL of an item row or JSON"""
+    item_id, wishlist_id = (item["id"], item["wishlist_id"]) if isinstance(item, dict) else item
+    return f"{API}/{wishlist_id}/items/{item_id}"
+
+
+def item_json(item: dict) -> dict:
+    """Returns the JSON that renames an item"""
+    return dict(item, name=f"renamed {item['id']}")
+
+
+def item_query(data: Dataset) -> str:
+    """Returns the URL of the first page of the items of a random category in a price range"""
+    low = data.rng.randrange(1, 400)
+    return f"{ITEMS_API}?limit=20&category={data.rng.choice(CATEGORIES)}&min_price={low}&max_price={low + 100}"
+
+
+def item_search(data: Dataset) -> str:
+    """Returns the URL of the first page of a search for a seeded item, named "item <id>" by seed()"""
+    return f"{ITEMS_API}/search?limit=20&q={quote(f'item {data.rng.choice(data.items).id}', safe='')}"
+
+
+######################################################################
+#  L O A D
+######################################################################
+def percentile(latencies: list, fraction: float) -> float:
+    """Returns the nearest-rank percentile of sorted latencies"""
+    if not latencies:
+        return 0.0
+    rank = math.ceil(round(fraction * len(latencies), 9))
+    return latencies[min(max(rank, 1), len(latencies)) - 1]
+
+
+def summarize(latencies: list, errors: int, elapsed: float, peak_rss: int) -> dict:
+    """Returns the throughput, latency percentiles in ms and peak RSS in MB of a scenario"""
+    latencies = sorted(latencies)
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "rps": round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 0.95) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 2),
+        "peak_rss_mb": round(peak_rss / 2 ** 20, 1),
+    }
+
+
+def drive(port: int, build, count: int, concurrency: int, on_created=None):
+    """Sends count requests from concurrency keep-alive clients
+
+    Returns:
+        the latency of every request in seconds, the number of errors and the elapsed time
+    """
+    numbers = iter(range(count))
+    lock = threading.Lock()
+    latencies, errors = [], [0]
+
+    def client():
+        connection = http.client.HTTPConnection("127.0.0.1", port, timeout=60)
+        while True:
+            with lock:
+                number = next(numbers, None)
+            if number is None:
+                break
+            method, path, body = build(number)
+            payload = json.dumps(body) if body is not None else None
+            start = time.perf_counter()
+            try:
+                connection.request(method, path, body=payload, headers=JSON_HEADERS)
+                response = connection.getresponse()
+                data = response.read()
+            except (OSError, http.client.HTTPException):
+                connection.close()
+                connection = http.client.HTTPConnection("127.0.0.1", port, timeout=60)
+                with lock:
+                    errors[0] += 1
+                continue
+            elapsed = time.perf_counter() - start
+            with lock:
+                latencies.append(elapsed)
+                if response.status >= 400:
+                    errors[0] += 1
+                elif on_created:
+                    on_created(json.loads(data), body)
+        connection.close()
+
+    start = time.perf_counter()
+    threads = [threading.Thread(target=client) for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return latencies, errors[0], time.perf_counter() - start
+
+
+def run(server: Server, data: Dataset, requests: int, concurrency: int, only: list = None) -> dict:
+    """Runs every scenario (or the ones named in only) against a started server"""
+    results = {}
+
+    def remember(response, body):
+        if "user_id" in body:
+            data.created_wishlists.append(response["id"])
+        else:
+            data.created_items.append(body)
+
+    for scenario in scenarios(data):
+        if only and scenario.name not in only:
+            continue
+        if scenario.needs and not getattr(data, f"created_{scenario.needs}"):
+            logger.warning("Skipping %s: no %s were created by the scenarios before it", scenario.name, scenario.needs)
+            continue
+        sampler = RssSampler(server)
+        sampler.start()
+        latencies, errors, elapsed = drive(
+            server.port, scenario.build, requests, concurrency, remember if scenario.captures else None
+        )
+        results[scenario.name] = summarize(latencies, errors, elapsed, sampler.stop())
+        logger.info("%-40s %s", scenario.name, results[scenario.name])
+    return results
+
+
+def report(path: str, results: dict, meta: dict):
+    """Writes the results of a run to a JSON file"""
+    with open(path, "w", encoding="utf-8") as output:
+        json.dump({"meta": meta, "endpoints": results}, output, indent=2, sort_keys=True)
+        output.write("\n")
@@ -0,0 +1,78 @@
+"""
+Name Search Benchmark
+
+Times the first page of GET /wishlists?name= in every match mode straight
+against a seeded database, e.g. one seeded with 1,000,000 wishlists:
+
+    python -m benchmarks seed --wishlists 1000000 --items-min 0 --items-max 0
+    python -m benchmarks name-search --samples 200
+"""
+import logging
+import random
+import time
+from sqlalchemy import func
+from benchmarks.load import percentile
+from service.common.search import NAME_MODES
+from service.models import Wishlist, db
+
+logger = logging.getLogger("benchmarks")
+
+
+def search_terms(samples: int, rng: random.Random) -> dict:
+    """Returns search terms for every mode taken from the names of random wishlists
+
+    The seeded names look like "wishlist 123456": the prefixes keep the word
+    and at least the first two digits, the substrings are any four characters
+    """
+    low, high = db.session.query(func.min(Wishlist.id), func.max(Wishlist.id)).one()
+    if low is None:
+        raise ValueError("The database has no wishlists, seed it first")
+    names = []
+    while len(names) < samples:
+        wishlist = Wishlist.query.get(rng.randint(low, high))
+        if wishlist is not None and wishlist.name:
+            names.append(wishlist.name)
+    db.session.remove()
+    terms = {"prefix": [], "contains": []}
+    for name in names:
+        terms["prefix"].append(name[:rng.randint(max(len(name) - 4, 1), len(name))].upper())
+        start = rng.randint(0, max(len(name) - 4, 0))
+        terms["contains"].append(name[start:start + 4])
+    return terms
+
+
+def bench(samples: int = 200, limit: int = 100, rng_seed: int = 7) -> dict:
+    """Returns the latency percentiles in ms and the average page size of every mode"""
+    terms = search_terms(samples, random.Random(rng_seed))
+    results = {}
+    for mode in NAME_MODES:
+        latencies, found = [], 0
+        for term in terms[mode]:
+            start = time.perf_counter()
+            query = Wishlist.project(Wishlist.find_by_name(term, mode), ("id", "name"), items=False)
+            rows, _ = Wishlist.paginate(query, limit)
+            latencies.append(time.perf_counter() - start)
+            found += len(rows)
+            db.session.remove()
+        latencies.sort()
+        results[mode] = {
+            "searches": len(latencies),
+            "p50_ms": round(percentile(latencies, 0.50) * 1000, 2),
+            "p95_ms": round(percentile(latencies, 0.95) * 1000, 2),
+            "p99_ms": round(percentile(latencies, 0.99) * 1000, 2),
+            "rows": round(found / max(len(latencies), 1), 1),
+        }
+        logger.info("%s: %s", mode, results[mode])
+    results["wishlists"] = db.session.query(func.count(Wishlist.id)).scalar()
+    return results
+
+
+def table(results: dict) -> str:
+    """Returns the latencies of the modes as a text table"""
+    lines = [f"{results['wishlists']} wishlists", f"{'mode':>10} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'rows':>6}"]
+    for mode in NAME_MODES:
+        result = results[mode]
+        lines.append(
+            f"{mode:>10} {result['p50_ms']:>8.2f} {result['p95_ms']:>8.2f} {result['p99_ms']:>8.2f} {result['rows']:>6.1f}"
+        )
+    return "\n".join(lines)
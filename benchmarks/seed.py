@@ -0,0 +1,89 @@
+"""
+Seeding
+
+Fills a database with wishlists and items for the load benchmarks, using
+multi-row INSERTs of batch_size rows so that millions of rows load quickly
+"""
+import logging
+import random
+import time
+from sqlalchemy import create_engine, func, select
+from service import migrations
+from service.models import Item, Wishlist
+
+logger = logging.getLogger("benchmarks")
+
+CATEGORIES = ["food", "recreation", "other", "books", "garden"]
+
+
+# pylint: disable=too-many-arguments
+def seed(database_uri: str, wishlists: int, items_min: int, items_max: int, users: int = None,
+         batch_size: int = 1000, reset: bool = False, rng_seed: int = 2022) -> dict:
+    """Adds wishlists with items_min to items_max items each
+
+    Returns:
+        the number of wishlists and items in the database
+    """
+    rng = random.Random(rng_seed)
+    users = users or max(wishlists // 10, 1)
+    engine = create_engine(database_uri)
+    migrations.upgrade(engine)
+    if reset:
+        with engine.begin() as connection:
+            connection.execute(Item.__table__.delete())
+            connection.execute(Wishlist.__table__.delete())
+
+    start = time.perf_counter()
+    for first in range(0, wishlists, batch_size):
+        count = min(batch_size, wishlists - first)
+        with engine.begin() as connection:
+            insert_batch(connection, rng, count, users, items_min, items_max, batch_size)
+        logger.info("Seeded %d of %d wishlists", first + count, wishlists)
+
+    with engine.connect() as connection:
+        totals = {
+            "wishlists": connection.execute(select(func.count()).select_from(Wishlist.__table__)).scalar(),
+            "items": connection.execute(select(func.count()).select_from(Item.__table__)).scalar(),
+        }
+    logger.info("Seeded in %.1f s: %s", time.perf_counter() - start, totals)
+    engine.dispose()
+    return totals
+
+
+def insert_batch(connection, rng, count, users, items_min, items_max, batch_size):
+    """Inserts count wishlists and their items"""
+    wishlist_table, item_table = Wishlist.__table__, Item.__table__
+    last_id = connection.execute(select(func.coalesce(func.max(wishlist_table.c.id), 0))).scalar()
+    connection.execute(wishlist_table.insert(), [
+        {
+            "name": f"wishlist {rng.randrange(1000000)}",
+            "user_id": rng.randint(1, users),
+            "is_enabled": rng.random() < 0.9,
+            "version": 1,
+        }
+        for _ in range(count)
+    ])
+    wishlist_ids = connection.execute(
+        select(wishlist_table.c.id).where(wishlist_table.c.id > last_id).order_by(wishlist_table.c.id)
+    ).scalars().all()
+
+    # item ids are chosen by the clients of the service, so pick them here
+    item_id = connection.execute(select(func.coalesce(func.max(item_table.c.id), 0))).scalar()
+    rows = []
+    for wishlist_id in wishlist_ids:
+        for _ in range(rng.randint(items_min, items_max)):
+            item_id += 1
+            rows.append({
+                "id": item_id,
+                "wishlist_id": wishlist_id,
+                "name": f"item {item_id}",
+                "category": rng.choice(CATEGORIES),
+                "price": round(rng.uniform(1, 500), 2),
+                "description": f"benchmark item {item_id}",
+            })
+            if len(rows) == batch_size:
+                connection.execute(item_table.insert(), rows)
+                rows = []
+    if rows:
+        connection.execute(item_table.insert(), rows)
+    connection.execute(Wishlist.recount(wishlist_ids))
@@ -0,0 +1,69 @@
+"""
+Serialization Benchmark
+
+Times the JSON encoding of large in-memory wishlists with serialize() plus
+marshalling with the Swagger models against the single-pass serializers
+"""
+import json
+import logging
+import random
+import timeit
+from datetime import datetime, timezone
+from flask_restx import marshal
+from service import serializers
+from service.models import Item, Wishlist
+from service.routes import wishlist_model
+
+logger = logging.getLogger("benchmarks")
+
+CATEGORIES = ["food", "recreation", "other"]
+
+
+def large_wishlist(items: int, rng: random.Random) -> Wishlist:
+    """Returns a transient Wishlist with the given number of Items"""
+    now = datetime.now(timezone.utc)
+    wishlist = Wishlist(id=1, user_id=1, name="large", is_enabled=True, created_at=now, last_updated=now)
+    wishlist.items = [
+        Item(
+            id=number,
+            wishlist_id=1,
+            name=f"item {number}",
+            category=rng.choice(CATEGORIES),
+            price=round(rng.uniform(1, 1000), 2),
+            description=f"description of item {number}",
+        )
+        for number in range(1, items + 1)
+    ]
+    return wishlist
+
+
+def marshalled(wishlist: Wishlist) -> bytes:
+    """Encodes a Wishlist the way the routes did before the serializers"""
+    return json.dumps(marshal(wishlist.serialize(), wishlist_model)).encode("utf-8")
+
+
+def bench(sizes: list, repeat: int = 5, rng_seed: int = 42) -> dict:
+    """Returns the best time in ms of both encodings for every wishlist size"""
+    rng = random.Random(rng_seed)
+    results = {}
+    for size in sizes:
+        wishlist = large_wishlist(size, rng)
+        number = max(1, 10000 // size)
+        timings = {}
+        for name, encode in (("marshal", marshalled), ("serializer", serializers.dump_wishlist)):
+            best = min(timeit.repeat(lambda encode=encode, wishlist=wishlist: encode(wishlist), number=number, repeat=repeat))
+            timings[name] = round(best / number * 1000, 3)
+        timings["speedup"] = round(timings["marshal"] / timings["serializer"], 1)
+        logger.info("%d items: %s", size, timings)
+        results[str(size)] = timings
+    return results
+
+
+def table(results: dict) -> str:
+    """Returns the timings as a text table"""
+    lines = [f"{'items':>8} {'marshal ms':>12} {'serializer ms':>14} {'speedup':>8}"]
+    for size, timings in results.items():
+        lines.append(
+            f"{size:>8} {timings['marshal']:>12.3f} {timings['serializer']:>14.3f} {timings['speedup']:>7.1f}x"
+        )
+    return "\n".join(lines)
@@ -0,0 +1,25 @@
+"""
+Gunicorn configuration
+
+Every worker writes its metrics to files in PROMETHEUS_MULTIPROC_DIR and
+/metrics adds up the files of all workers, so the directory has to be set
+before the workers import the service and emptied when the server starts
+"""
+import os
+import shutil
+import tempfile
+
+os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR", os.path.join(tempfile.gettempdir(), "wishlist-metrics"))
+
+
+def on_starting(server):  # pylint: disable=unused-argument
+    """Removes the metrics left behind by an earlier run"""
+    path = os.environ["PROMETHEUS_MULTIPROC_DIR"]
+    shutil.rmtree(path, ignore_errors=True)
+    os.makedirs(path)
+
+
+def child_exit(server, worker):  # pylint: disable=unused-argument
+    """Keeps the counts of a worker that exited but stops reporting it as alive"""
+    from prometheus_client import multiprocess  # pylint: disable=import-outside-toplevel
+    multiprocess.mark_process_dead(worker.pid)
@@ -0,0 +1,19 @@
+"""
+ASGI entry point
+
+Serves the same routes and models as service:app from an event loop over
+the asyncio driver of the database (asyncpg or aiosqlite), so that one
+process can hold thousands of requests that wait on the database:
+
+    uvicorn --host 0.0.0.0 --port 8080 service.asgi:app
+"""
+from service import app as wsgi_app
+from service.models import db, payload_cache
+from service.common.asgi import GreenletAsgiApp, use_async_drivers
+
+use_async_drivers(wsgi_app.config)
+# Waiting on a shared cache server must not block the event loop either
+payload_cache.configure(wsgi_app.config, asynchronous=True)
+
+# Sessions are scoped to the greenlet of a request, so close each one with it
+app = GreenletAsgiApp(wsgi_app, teardown=db.session.remove)
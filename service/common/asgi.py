@@ -0,0 +1,136 @@
+"""
+ASGI adapter
+
+Serves the Flask app from an asyncio event loop. Every request runs in its
+own greenlet through SQLAlchemy's greenlet_spawn(), the mechanism behind
+sqlalchemy.ext.asyncio, so whenever a handler waits on an asyncio database
+driver its greenlet yields to the event loop and the process keeps serving
+the other requests in flight
+"""
+import io
+import sys
+from sqlalchemy.engine import make_url
+from sqlalchemy.util import await_only, greenlet_spawn
+
+# The asyncio driver of each database the service can use
+ASYNC_DRIVERS = {"postgresql": "asyncpg", "sqlite": "aiosqlite"}
+
+
+class GreenletAsgiApp():
+    """Runs a WSGI app as an ASGI app, one greenlet per request
+
+    Args:
+        teardown: called in the greenlet of every request once it is answered,
+            to release what the request held, like its database session
+    """
+
+    def __init__(self, wsgi_app, teardown=None):
+        self.wsgi_app = wsgi_app
+        self.teardown = teardown
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            await self.lifespan(receive, send)
+            return
+        if scope["type"] != "http":
+            raise ValueError(f"Unsupported ASGI scope type '{scope['type']}'")
+        body = await read_body(receive)
+        await greenlet_spawn(self.handle, wsgi_environ(scope, body), send)
+
+    @staticmethod
+    async def lifespan(receive, send):
+        """Acknowledges the startup and shutdown of the server"""
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    def handle(self, environ, send):
+        """Calls the WSGI app and sends its response as it is produced"""
+        response_start = {}
+
+        def start_response(status, headers, exc_info=None):  # pylint: disable=unused-argument
+            response_start.update({
+                "type": "http.response.start",
+                "status": int(status.split(" ", 1)[0]),
+                "headers": [(name.lower().encode("latin-1"), value.encode("latin-1")) for name, value in headers],
+            })
+
+        try:
+            response = self.wsgi_app(environ, start_response)
+            try:
+                await_only(send(response_start))
+                for chunk in response:
+                    if chunk:
+                        await_only(send({"type": "http.response.body", "body": chunk, "more_body": True}))
+                await_only(send({"type": "http.response.body", "body": b""}))
+            finally:
+                if hasattr(response, "close"):
+                    response.close()
+        finally:
+            if self.teardown:
+                self.teardown()
+
+
+async def read_body(receive) -> bytes:
+    """Returns the whole body of an HTTP request"""
+    chunks = []
+    while True:
+        message = await receive()
+        if message["type"] == "http.disconnect":
+            break
+        chunks.append(message.get("body", b""))
+        if not message.get("more_body"):
+            break
+    return b"".join(chunks)
+
+
+def wsgi_environ(scope, body: bytes) -> dict:
+    """Returns the WSGI environ of an ASGI http scope"""
+    server_name, server_port = scope.get("server") or ("localhost", 80)
+    environ = {
+        "REQUEST_METHOD": scope["method"],
+        "SCRIPT_NAME": scope.get("root_path", "").encode("utf-8").decode("latin-1"),
+        "PATH_INFO": scope["path"].encode("utf-8").decode("latin-1"),
+        "QUERY_STRING": scope.get("query_string", b"").decode("latin-1"),
+        "SERVER_NAME": server_name,
+        "SERVER_PORT": str(server_port),
+        "SERVER_PROTOCOL": f"HTTP/{scope.get('http_version', '1.1')}",
+        "REMOTE_ADDR": (scope.get("client") or ("", 0))[0],
+        "wsgi.version": (1, 0),
+        "wsgi.url_scheme": scope.get("scheme", "http"),
+        "CONTENT_LENGTH": str(len(body)),
+        "wsgi.input": io.BytesIO(body),
+        "wsgi.errors": sys.stderr,
+        "wsgi.multithread": True,
+        "wsgi.multiprocess": True,
+        "wsgi.run_once": False,
+    }
+    for name, value in scope.get("headers", []):
+        name = name.decode("latin-1").upper().replace("-", "_")
+        value = value.decode("latin-1")
+        # the body was read already, so its length is known
+        if name in ("CONTENT_LENGTH", "TRANSFER_ENCODING"):
+            continue
+        if name not in ("CONTENT_TYPE", "CONTENT_LENGTH"):
+            name = "HTTP_" + name
+        environ[name] = f"{environ[name]},{value}" if name in environ else value
+    return environ
+
+
+def async_uri(uri: str) -> str:
+    """Returns a database URI that uses the asyncio driver of its database"""
+    url = make_url(uri)
+    driver = ASYNC_DRIVERS.get(url.get_backend_name())
+    if driver is None or url.get_dialect().is_async:
+        return uri
+    return url.set(drivername=f"{url.get_backend_name()}+{driver}").render_as_string(hide_password=False)
+
+
+def use_async_drivers(config):
+    """Points the database and its replicas in the app config at their asyncio drivers"""
+    config["SQLALCHEMY_DATABASE_URI"] = async_uri(config["SQLALCHEMY_DATABASE_URI"])
+    config["SQLALCHEMY_BINDS"] = {key: async_uri(uri) for key, uri in config["SQLALCHEMY_BINDS"].items()}
@@ -0,0 +1,353 @@
+"""
+Bulk Export and Import
+
+Exports every wishlist and item to files of newline delimited JSON or CSV,
+optionally gzip compressed, in constant memory: the rows are read in id
+order from a server-side cursor batch_size at a time, and every batch is
+appended to its file as soon as it is encoded.
+
+A checkpoint file next to the exported files records the last id, the row
+count and the size of each file after every batch, so an interrupted export
+resumes after the last batch it wrote instead of starting over. A gzip file
+is written as one gzip member per batch, so it can be cut back to any
+checkpoint and still be read with gzip or zcat.
+
+Imports read the same files back, or any rows with the same fields, and
+validate every row with the same rules as the API before writing them with
+multi-row INSERTs, one batch per transaction. The rows that are not valid
+are rejected one by one and do not stop the rest of the file.
+"""
+import csv
+import functools
+import gzip
+import io
+import itertools
+import json
+import os
+from datetime import datetime
+import orjson
+from sqlalchemy import text
+from service import serializers
+from service.models import DataValidationError, Item, Wishlist, db
+
+FORMATS = ("ndjson", "csv")
+CHECKPOINT = "export.checkpoint.json"
+
+# explicit ids do not advance the sequences of the ids, so an import moves
+# them past the largest id for the ids of the API to keep working
+SEQUENCES = {
+    "postgresql": [
+        "SELECT setval(pg_get_serial_sequence('wishlist', 'id'), max(id)) FROM wishlist HAVING max(id) IS NOT NULL",
+        "SELECT setval(pg_get_serial_sequence('item', 'id'), max(id)) FROM item HAVING max(id) IS NOT NULL",
+    ],
+}
+
+# the wishlists are exported without their items, which have their own file
+WISHLIST_ROW = serializers.Projection(items=False)
+
+# the tables in the order they are exported: every item follows its wishlist
+TABLES = {
+    "wishlists": (Wishlist, serializers.WISHLIST_FIELDS, lambda row: serializers.wishlist_dict(row, WISHLIST_ROW)),
+    "items": (Item, serializers.ITEM_FIELDS, serializers.item_dict),
+}
+
+
+def file_name(table: str, fmt: str, compress: bool) -> str:
+    """Returns the name of the file a table is exported to"""
+    return f"{table}.{fmt}" + (".gz" if compress else "")
+
+
+def csv_value(value):
+    """Returns a value as it is written to a CSV file: None as an empty field,
+    booleans as true or false and datetimes in ISO 8601 like the JSON"""
+    if value is None:
+        return ""
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    return value
+
+
+def encode(rows: list, fields: tuple, fmt: str) -> bytes:
+    """Encodes the representations of a batch of rows in a format"""
+    if fmt == "ndjson":
+        return b"".join(serializers.dumps(row) + b"\n" for row in rows)
+    buffer = io.StringIO()
+    csv.writer(buffer, lineterminator="\n").writerows([csv_value(row[field]) for field in fields] for row in rows)
+    return buffer.getvalue().encode("utf-8")
+
+
+def load_checkpoint(path: str):
+    """Returns the checkpoint saved at path, None if there is none"""
+    try:
+        with open(path, encoding="utf-8") as checkpoint:
+            return json.load(checkpoint)
+    except FileNotFoundError:
+        return None
+
+
+def save_checkpoint(path: str, checkpoint: dict):
+    """Replaces the checkpoint at path in one step, so a crash leaves either the old or the new one"""
+    with open(path + ".tmp", "w", encoding="utf-8") as temporary:
+        json.dump(checkpoint, temporary)
+    os.replace(path + ".tmp", path)
+
+
+def batches(rows, size: int):
+    """Iterates over the rows in lists of at most size rows"""
+    rows = iter(rows)
+    while True:
+        batch = list(itertools.islice(rows, size))
+        if not batch:
+            return
+        yield batch
+
+
+def write(output, data: bytes, compress: bool):
+    """Appends data to an export file and makes sure it is on disk"""
+    output.write(gzip.compress(data) if compress else data)
+    output.flush()
+    os.fsync(output.fileno())
+
+
+def export(directory: str, fmt: str = "ndjson", compress: bool = False, batch_size: int = 1000, resume: bool = False):
+    """Exports all wishlists and items to one file per table in directory
+
+    Args:
+        directory (string): where to write the files and the checkpoint
+        fmt (string): "ndjson" or "csv"
+        compress (bool): whether to gzip the files
+        batch_size (int): the number of rows to fetch and write at a time
+        resume (bool): whether to continue from the checkpoint in directory
+
+    Yields:
+        the name of a table and its progress after every batch and once it is done
+
+    Raises:
+        ValueError: if the checkpoint is of an export with another format
+    """
+    path = os.path.join(directory, CHECKPOINT)
+    checkpoint = load_checkpoint(path) if resume else None
+    if checkpoint is None:
+        checkpoint = {"format": fmt, "gzip": compress, "tables": {}}
+    elif (checkpoint["format"], checkpoint["gzip"]) != (fmt, compress):
+        raise ValueError(f"The checkpoint in {directory} is of a {checkpoint['format']} export "
+                         f"{'with' if checkpoint['gzip'] else 'without'} gzip")
+    os.makedirs(directory, exist_ok=True)
+
+    for table, (model, fields, to_dict) in TABLES.items():
+        state = checkpoint["tables"].setdefault(table, {"last_id": None, "rows": 0, "offset": 0, "done": False})
+        if state["done"]:
+            continue
+        query = db.session.query(*(getattr(model, field) for field in fields))
+        if model is Item:
+            # leave out the items of wishlists created since their export
+            query = query.filter(Item.wishlist_id <= (checkpoint["tables"]["wishlists"]["last_id"] or 0))
+        with open(os.path.join(directory, file_name(table, fmt, compress)), "r+b" if state["offset"] else "wb") as output:
+            # drop whatever was written after the last checkpoint
+            output.truncate(state["offset"])
+            output.seek(state["offset"])
+            if fmt == "csv" and not state["offset"]:
+                write(output, ",".join(fields).encode("utf-8") + b"\n", compress)
+            for batch in batches(model.stream(query, batch_size, state["last_id"]), batch_size):
+                write(output, encode([to_dict(row) for row in batch], fields, fmt), compress)
+                state.update(last_id=batch[-1].id, rows=state["rows"] + len(batch), offset=output.tell())
+                save_checkpoint(path, checkpoint)
+                yield table, dict(state)
+        state["done"] = True
+        save_checkpoint(path, checkpoint)
+        yield table, dict(state)
+    db.session.remove()
+
+
+def boolean(value: str) -> bool:
+    """Reads a boolean written as true or false"""
+    if value.lower() in ("true", "1"):
+        return True
+    if value.lower() in ("false", "0"):
+        return False
+    raise ValueError(value)
+
+
+# how the datetimes are read from text, which they are in JSON as well
+DATETIMES = {
+    "created_at": datetime.fromisoformat,
+    "last_updated": datetime.fromisoformat,
+}
+
+# how the values of the typed fields are read from the text of a CSV file
+CONVERTERS = {
+    "id": int,
+    "wishlist_id": int,
+    "user_id": int,
+    "price": float,
+    "is_enabled": boolean,
+    **DATETIMES,
+}
+
+
+def file_table(path: str) -> tuple:
+    """Returns the table, the format and whether it is compressed of a file named like an export"""
+    name = os.path.basename(path)
+    compress = name.endswith(".gz")
+    name = name[:-3] if compress else name
+    table = next((table for table in TABLES if name.startswith(table)), None)
+    fmt = "csv" if name.endswith(".csv") else "ndjson"
+    return table, fmt, compress
+
+
+def read_rows(path: str, fmt: str, compress: bool):
+    """Iterates over the line numbers and rows of a file, NDJSON rows as their undecoded text"""
+    opener = gzip.open if compress else open
+    with opener(path, "rt", encoding="utf-8", newline="") as source:
+        if fmt == "csv":
+            reader = csv.DictReader(source)
+            for row in reader:
+                # CSV writes None as an empty field
+                yield reader.line_num, {field: value if value != "" else None for field, value in row.items()}
+            return
+        for line, row in enumerate(source, 1):
+            if row.strip():
+                yield line, row
+
+
+def parse(row, converters: dict = None) -> dict:
+    """Returns the fields of a row with the values read from text converted
+
+    The values of an NDJSON row keep their JSON types, which deserialize()
+    checks like those of the API, and only its datetimes are converted; the
+    values of a CSV row are all text and every typed field is converted
+
+    Raises:
+        DataValidationError: if the row is not an object or a value cannot be converted
+    """
+    if isinstance(row, str):
+        try:
+            row = orjson.loads(row)
+        except orjson.JSONDecodeError as error:
+            raise DataValidationError(f"Invalid JSON: {error}") from error
+        converters = DATETIMES
+    if not isinstance(row, dict):
+        raise DataValidationError("Invalid row: not an object")
+    data = dict(row)
+    for field, convert in (converters or CONVERTERS).items():
+        if data.get(field) is not None:
+            try:
+                data[field] = convert(data[field])
+            except (TypeError, ValueError) as error:
+                raise DataValidationError(f"Invalid {field}: {data[field]!r}") from error
+    return data
+
+
+def parse_wishlist(row) -> Wishlist:
+    """Returns the Wishlist of a row, with the Items it holds if it was exported by the API"""
+    data = parse(row)
+    # the items of a wishlist are JSON objects, in NDJSON and CSV alike
+    items = [parse(item, DATETIMES) for item in data.get("items") or []]
+    if items and data.get("id") is None:
+        raise DataValidationError("Invalid Wishlist: the id is missing for its items")
+    wishlist = Wishlist().deserialize(dict(data, items=[dict(item, wishlist_id=data.get("id")) for item in items]))
+    if data.get("created_at") is not None:
+        wishlist.created_at = data["created_at"]
+    if data.get("last_updated") is not None:
+        wishlist.last_updated = data["last_updated"]
+    return wishlist
+
+
+def parse_item(row) -> Item:
+    """Returns the Item of a row"""
+    return Item().deserialize(parse(row))
+
+
+def unique(entities: list, ids_of, taken: set, kind: str, rejected: list) -> list:
+    """Returns the (line, entity) pairs whose ids are not taken yet, in the database
+    or by an earlier entity, and adds the line numbers and errors of the others to rejected"""
+    kept = []
+    for line, entity in entities:
+        ids = ids_of(entity)
+        clash = next((entity_id for entity_id in ids if entity_id in taken), None)
+        if clash is None and len(set(ids)) < len(ids):
+            clash = next(entity_id for entity_id in ids if ids.count(entity_id) > 1)
+        if clash is None:
+            taken.update(ids)
+            kept.append((line, entity))
+        else:
+            rejected.append((line, f"{kind} with id '{clash}' already exists"))
+    return kept
+
+
+def wishlist_ids(wishlist) -> list:
+    """Returns the id of a Wishlist, if it has one, as a list"""
+    return [wishlist.id] if wishlist.id is not None else []
+
+
+def item_ids(entity) -> list:
+    """Returns the ids of the Items a Wishlist holds, or the id of an Item"""
+    return [item.id for item in entity.items] if isinstance(entity, Wishlist) else [entity.id]
+
+
+def validate(table: str, batch: list) -> tuple:
+    """Deserializes the rows of a batch and rejects the invalid ones
+
+    A row is rejected if the API would reject it, if an id is taken, or if
+    it is an item of a wishlist that does not exist
+
+    Returns:
+        the (line, entity) pairs to insert and the (line, error) pairs of the rejected rows
+    """
+    parse_row = parse_wishlist if table == "wishlists" else parse_item
+    entities, rejected = [], []
+    for line, row in batch:
+        try:
+            entities.append((line, parse_row(row)))
+        except DataValidationError as error:
+            rejected.append((line, str(error)))
+
+    if table == "wishlists":
+        taken = Wishlist.find_existing_ids([wishlist.id for _, wishlist in entities if wishlist.id is not None])
+        entities = unique(entities, wishlist_ids, taken, "Wishlist", rejected)
+    else:
+        known = Wishlist.find_existing_ids(list({item.wishlist_id for _, item in entities}))
+        rejected += [(line, f"Wishlist with id '{item.wishlist_id}' was not found")
+                     for line, item in entities if item.wishlist_id not in known]
+        entities = [(line, item) for line, item in entities if item.wishlist_id in known]
+    taken = Item.find_existing_ids([item_id for _, entity in entities for item_id in item_ids(entity)])
+    entities = unique(entities, item_ids, taken, "Item", rejected)
+    return entities, sorted(rejected)
+
+
+def import_file(path: str, table: str = None, batch_size: int = 5000):
+    """Imports the wishlists or the items of a file, one batch per transaction
+
+    Args:
+        path (string): a file named like an export, e.g. items.csv.gz
+        table (string): "wishlists" or "items", when the name does not tell
+        batch_size (int): the number of rows to insert at a time
+
+    Yields:
+        the number of rows read and imported and the (line, error) pairs of
+        the rejected rows of every batch
+
+    Raises:
+        ValueError: if the table of the file is unknown
+    """
+    named_table, fmt, compress = file_table(path)
+    table = table or named_table
+    if table not in TABLES:
+        raise ValueError(f"Cannot tell whether {path} holds wishlists or items, name it after one")
+    # the wishlists keep the last_updated of their export when their items are imported
+    create_many = Wishlist.create_many if table == "wishlists" else functools.partial(Item.create_many, touch=False)
+    for batch in batches(read_rows(path, fmt, compress), batch_size):
+        entities, rejected = validate(table, batch)
+        if entities:
+            try:
+                create_many([entity for _, entity in entities])
+            except DataValidationError as error:
+                # another writer took an id or removed a wishlist meanwhile
+                rejected = sorted(rejected + [(line, str(error)) for line, _ in entities])
+        yield len(batch), len(batch) - len(rejected), rejected
+    with db.engine.begin() as connection:
+        for statement in SEQUENCES.get(connection.dialect.name, []):
+            connection.execute(text(statement))
+    db.session.remove()
@@ -0,0 +1,324 @@
+"""
+Caches
+
+This module contains the bounded in-process cache used to serve repeated
+lookups from memory, and the cache of serialized payloads that can be shared
+by all workers and pods through a Redis compatible server
+"""
+import logging
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+import redis
+import redis.asyncio
+from sqlalchemy.util import await_only
+
+logger = logging.getLogger("flask.app")
+
+
+class TTLCache():
+    """
+    Least recently used cache whose entries also expire after ttl seconds
+
+    A maxsize or ttl of 0 turns the cache off
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 5, clock=time.monotonic):
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._clock = clock
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def enabled(self) -> bool:
+        """Returns True if the cache stores anything"""
+        return self.maxsize > 0 and self.ttl > 0
+
+    def configure(self, maxsize: int, ttl: float):
+        """Changes the bounds of the cache and empties it"""
+        with self._lock:
+            self.maxsize = maxsize
+            self.ttl = ttl
+            self._entries.clear()
+
+    def get(self, key):
+        """Returns the value cached for a key, or None"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] <= self._clock():
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key, value):
+        """Caches a value, evicting the least recently used entries when full"""
+        if not self.enabled:
+            return
+        with self._lock:
+            self._entries[key] = (self._clock() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, key):
+        """Removes the value cached for a key"""
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def delete_where(self, predicate):
+        """Removes the values cached for the keys and values matching predicate(key, value)"""
+        with self._lock:
+            for key in [key for key, (_, value) in self._entries.items() if predicate(key, value)]:
+                del self._entries[key]
+
+    def clear(self):
+        """Removes all cached values"""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        """Returns the size and the hit, miss and eviction counters"""
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+
+######################################################################
+#  S H A R E D   P A Y L O A D   C A C H E
+######################################################################
+class CacheBackend(ABC):
+    """
+    Stores byte strings by key for a limited time
+
+    Backends raise CacheError when the store cannot be reached
+    """
+
+    @abstractmethod
+    def get(self, key: str):
+        """Returns the bytes stored for a key, or None"""
+
+    @abstractmethod
+    def set(self, key: str, value: bytes, ttl: float):
+        """Stores bytes for a key for ttl seconds"""
+
+    @abstractmethod
+    def delete(self, *keys: str):
+        """Removes the given keys"""
+
+    @abstractmethod
+    def clear(self, prefix: str):
+        """Removes every key that starts with prefix"""
+
+
+class CacheError(Exception):
+    """Used when a cache backend cannot be reached"""
+
+
+class NullCache(CacheBackend):
+    """Backend that stores nothing"""
+
+    def get(self, key):
+        return None
+
+    def set(self, key, value, ttl):
+        pass
+
+    def delete(self, *keys):
+        pass
+
+    def clear(self, prefix):
+        pass
+
+
+class MemoryCache(CacheBackend):
+    """Backend that keeps the payloads in the memory of this worker"""
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 60, clock=time.monotonic):
+        self.entries = TTLCache(maxsize, ttl, clock)
+
+    def get(self, key):
+        return self.entries.get(key)
+
+    def set(self, key, value, ttl):
+        # the entries all live for the ttl the cache was created with
+        self.entries.set(key, value)
+
+    def delete(self, *keys):
+        for key in keys:
+            self.entries.delete(key)
+
+    def clear(self, prefix):
+        self.entries.clear()
+
+
+class RedisCache(CacheBackend):
+    """Backend that shares the payloads through a Redis compatible server"""
+
+    def __init__(self, client):
+        self.client = client
+
+    @classmethod
+    def from_url(cls, url: str, timeout: float = 0.5):
+        """Connects lazily to the server at a redis:// url"""
+        return cls(redis.Redis.from_url(url, socket_timeout=timeout, socket_connect_timeout=timeout))
+
+    def wait(self, reply):
+        """Returns the reply to a command of the client"""
+        return reply
+
+    def scan(self, prefix: str) -> list:
+        """Returns the keys that start with prefix"""
+        return list(self.client.scan_iter(match=prefix + "*", count=1000))
+
+    def get(self, key):
+        try:
+            return self.wait(self.client.get(key))
+        except redis.RedisError as error:
+            raise CacheError(str(error)) from error
+
+    def set(self, key, value, ttl):
+        try:
+            self.wait(self.client.set(key, value, px=max(int(ttl * 1000), 1)))
+        except redis.RedisError as error:
+            raise CacheError(str(error)) from error
+
+    def delete(self, *keys):
+        if not keys:
+            return
+        try:
+            self.wait(self.client.delete(*keys))
+        except redis.RedisError as error:
+            raise CacheError(str(error)) from error
+
+    def clear(self, prefix):
+        try:
+            keys = self.scan(prefix)
+            for start in range(0, len(keys), 1000):
+                self.wait(self.client.delete(*keys[start:start + 1000]))
+        except redis.RedisError as error:
+            raise CacheError(str(error)) from error
+
+
+class AsyncRedisCache(RedisCache):
+    """Backend of the ASGI app that talks to the server with the asyncio client
+
+    Commands are awaited with await_only(), so the greenlet of the request
+    yields to the event loop while it waits on the server, like it does on
+    the database, and must run in a greenlet started by greenlet_spawn()
+    """
+
+    @classmethod
+    def from_url(cls, url: str, timeout: float = 0.5):
+        """Connects lazily to the server at a redis:// url"""
+        return cls(redis.asyncio.Redis.from_url(url, socket_timeout=timeout, socket_connect_timeout=timeout))
+
+    def wait(self, reply):
+        return await_only(reply)
+
+    def scan(self, prefix):
+        async def scan_keys():
+            return [key async for key in self.client.scan_iter(match=prefix + "*", count=1000)]
+        return await_only(scan_keys())
+
+
+def cache_backend(config, asynchronous: bool = False) -> CacheBackend:
+    """Creates the backend named by CACHE_BACKEND in the app config, for
+    the event loop of the ASGI app if asynchronous is True"""
+    name = config["CACHE_BACKEND"]
+    if name == "redis":
+        backend = AsyncRedisCache if asynchronous else RedisCache
+        return backend.from_url(config["CACHE_REDIS_URL"])
+    if name == "memory":
+        return MemoryCache(config["CACHE_SIZE"], config["CACHE_TTL"])
+    if name == "none":
+        return NullCache()
+    raise ValueError(f"Unknown CACHE_BACKEND '{name}', use memory, redis or none")
+
+
+class PayloadCache():
+    """
+    Cache of serialized responses stored as a tag (an ETag or a cursor)
+    and a body
+
+    A backend that cannot be reached counts as a miss, so an outage of the
+    cache server slows the service down but never breaks it
+    """
+
+    def __init__(self, backend: CacheBackend = None, ttl: float = 60, prefix: str = ""):
+        self.backend = backend or NullCache()
+        self.ttl = ttl
+        self.prefix = prefix
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+
+    def configure(self, config, asynchronous: bool = False):
+        """Creates the backend from the app config"""
+        self.backend = cache_backend(config, asynchronous)
+        self.ttl = config["CACHE_TTL"]
+        self.prefix = config["CACHE_PREFIX"]
+
+    def get(self, key: str):
+        """Returns the (tag, body) cached for a key, or None"""
+        try:
+            value = self.backend.get(self.prefix + key)
+        except CacheError as error:
+            self.errors += 1
+            logger.warning("Cache get failed: %s", error)
+            value = None
+        if value is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        tag, _, body = value.partition(b"\n")
+        return tag.decode("utf-8"), body
+
+    def set(self, key: str, tag: str, body: bytes):
+        """Caches a body and its tag, which must not contain a newline"""
+        try:
+            self.backend.set(self.prefix + key, tag.encode("utf-8") + b"\n" + body, self.ttl)
+        except CacheError as error:
+            self.errors += 1
+            logger.warning("Cache set failed: %s", error)
+
+    def delete(self, *keys: str):
+        """Removes the payloads cached for the given keys"""
+        try:
+            self.backend.delete(*(self.prefix + key for key in keys))
+        except CacheError as error:
+            self.errors += 1
+            logger.warning("Cache delete failed: %s", error)
+
+    def clear(self):
+        """Removes every payload of this service"""
+        try:
+            self.backend.clear(self.prefix)
+        except CacheError as error:
+            self.errors += 1
+            logger.warning("Cache clear failed: %s", error)
+
+    def stats(self) -> dict:
+        """Returns the backend and the hit, miss and error counters of this worker"""
+        return {
+            "backend": type(self.backend).__name__,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "errors": self.errors,
+        }
@@ -1,8 +1,17 @@
 """
 Flask CLI Command Extensions
 """
-from service import app
-from service.models import db
+import json
+import time
+import click
+from service import app, migrations
+from service.common import bulk
+from service.models import db, Wishlist
+
+# seconds between two progress reports of a long running command
+PROGRESS_INTERVAL = 10.0
+# rejected rows printed before the rest are only counted, unless --rejects is given
+MAX_REPORTED_REJECTS = 20
 
 
 ######################################################################
@@ -19,3 +28,110 @@ def db_create():
     db.drop_all()
     db.create_all()
     db.session.commit()
+    migrations.stamp(db.engine)
+
+
+######################################################################
+# Command to apply the missing schema migrations
+# Usage:
+#   flask db-upgrade
+######################################################################
+@app.cli.command("db-upgrade")
+@click.option("--to", "target", type=int, default=None, help="Version to upgrade to (default: newest)")
+def db_upgrade(target):
+    """
+    Applies the schema migrations that the database is missing. Safe to
+    run on every deploy and from several processes at once.
+    """
+    applied = migrations.upgrade(db.engine, target)
+    for version in applied:
+        click.echo(f"Applied migration {version:04d}")
+    if not applied:
+        click.echo("Database is up to date")
+
+
+######################################################################
+# Command to recompute the item totals of every wishlist
+# Usage:
+#   flask recompute-totals
+######################################################################
+@app.cli.command("recompute-totals")
+@click.option("--batch-size", type=int, default=1000, help="Wishlists per transaction")
+def recompute_totals(batch_size):
+    """
+    Recomputes item_count and total_price of all wishlists from their items,
+    one batch per transaction. Safe to run while the service is serving.
+    """
+    after_id, fixed = 0, 0
+    while after_id is not None:
+        after_id, count = Wishlist.recompute_totals(batch_size, after_id)
+        fixed += count
+    click.echo(f"Fixed the totals of {fixed} wishlists")
+
+
+######################################################################
+# Command to export all wishlists and items to files
+# Usage:
+#   flask export DIRECTORY [--format csv] [--gzip] [--resume]
+######################################################################
+@app.cli.command("export")
+@click.argument("directory", type=click.Path(file_okay=False))
+@click.option("--format", "fmt", type=click.Choice(bulk.FORMATS), default="ndjson", help="Format of the files")
+@click.option("--gzip", "compress", is_flag=True, help="Compress the files with gzip")
+@click.option("--batch-size", type=int, default=1000, help="Rows per round trip and write")
+@click.option("--resume", is_flag=True, help="Continue an interrupted export from its checkpoint")
+def export(directory, fmt, compress, batch_size, resume):
+    """
+    Exports all wishlists and items to one file per table in DIRECTORY, in
+    constant memory, with a checkpoint after every batch to resume from.
+    """
+    started = reported = time.monotonic()
+    try:
+        for table, state in bulk.export(directory, fmt, compress, batch_size, resume):
+            now = time.monotonic()
+            if state["done"] or now - reported >= PROGRESS_INTERVAL:
+                reported = now
+                click.echo(f"{table}: {state['rows']} rows exported up to id {state['last_id']}"
+                           + (" (done)" if state["done"] else ""))
+    except ValueError as error:
+        raise click.UsageError(str(error)) from error
+    click.echo(f"Exported to {directory} in {time.monotonic() - started:.1f}s")
+
+
+######################################################################
+# Command to import wishlists and items from files
+# Usage:
+#   flask import wishlists.ndjson items.ndjson [--rejects rejects.ndjson]
+######################################################################
+@app.cli.command("import")
+@click.argument("paths", nargs=-1, required=True, type=click.Path(exists=True, dir_okay=False))
+@click.option("--table", type=click.Choice(tuple(bulk.TABLES)), default=None,
+              help="What the files hold, when their names do not start with wishlists or items")
+@click.option("--batch-size", type=int, default=5000, help="Rows per transaction")
+@click.option("--rejects", type=click.File("w"), default=None, help="File to write the rejected rows to as NDJSON")
+def import_files(paths, table, batch_size, rejects):
+    """
+    Imports wishlists and items from NDJSON or CSV files, optionally gzipped,
+    such as the ones flask export writes. Import the wishlists first.
+    """
+    for path in paths:
+        started = reported = time.monotonic()
+        read = imported = rejected = 0
+        try:
+            for count, created, errors in bulk.import_file(path, table, batch_size):
+                read, imported, rejected = read + count, imported + created, rejected + len(errors)
+                for position, (line, error) in enumerate(errors, rejected - len(errors)):
+                    if rejects:
+                        rejects.write(json.dumps({"file": path, "line": line, "error": error}) + "\n")
+                    elif position < MAX_REPORTED_REJECTS:
+                        click.echo(f"{path}:{line}: {error}", err=True)
+                now = time.monotonic()
+                if now - reported >= PROGRESS_INTERVAL:
+                    reported = now
+                    click.echo(f"{path}: {read} rows read, {imported} imported, {rejected} rejected, "
+                               f"{read / (now - started):.0f} rows/s")
+        except ValueError as error:
+            raise click.UsageError(str(error)) from error
+        elapsed = time.monotonic() - started
+        click.echo(f"{path}: {imported} rows imported, {rejected} rejected in {elapsed:.1f}s "
+                   f"({read / max(elapsed, 1e-6):.0f} rows/s)")
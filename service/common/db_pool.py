@@ -0,0 +1,112 @@
+"""
+Database Connection Pool
+
+This module contains the instrumented connection pool used for the
+service database engines and the helpers that configure and report it
+"""
+import threading
+import time
+from sqlalchemy import event
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+
+class PoolStats():
+    """Counters of one connection pool, safe to update from many threads"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.invalidations = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+
+    def record_checkout(self, wait: float, timed_out: bool = False):
+        """Records how long a checkout waited for a connection"""
+        with self._lock:
+            if timed_out:
+                self.timeouts += 1
+            else:
+                self.checkouts += 1
+            self.wait_seconds_total += wait
+            self.wait_seconds_max = max(self.wait_seconds_max, wait)
+
+    def increment(self, counter: str):
+        """Adds one to a counter"""
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def as_dict(self) -> dict:
+        """Returns a snapshot of the counters"""
+        with self._lock:
+            return {
+                "checkouts": self.checkouts,
+                "timeouts": self.timeouts,
+                "invalidations": self.invalidations,
+                "wait_seconds_total": round(self.wait_seconds_total, 6),
+                "wait_seconds_max": round(self.wait_seconds_max, 6),
+            }
+
+
+class InstrumentedQueuePool(QueuePool):
+    """A QueuePool that measures how long checkouts wait for a connection"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.stats = PoolStats()
+        event.listen(self, "invalidate", self._count_invalidation)
+
+    def _count_invalidation(self, *args):  # pylint: disable=unused-argument
+        """Counts connections discarded because they were found to be broken"""
+        self.stats.increment("invalidations")
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except PoolTimeoutError:
+            self.stats.record_checkout(time.perf_counter() - start, timed_out=True)
+            raise
+        self.stats.record_checkout(time.perf_counter() - start)
+        return connection
+
+    def recreate(self):
+        # the new pool inherits our event listeners, so it keeps our counters
+        pool = super().recreate()
+        event.remove(pool, "invalidate", pool._count_invalidation)  # pylint: disable=protected-access
+        pool.stats = self.stats
+        return pool
+
+
+class InstrumentedAsyncQueuePool(InstrumentedQueuePool, AsyncAdaptedQueuePool):
+    """An InstrumentedQueuePool for engines with an asyncio driver"""
+
+
+def pool_options(config, is_async: bool = False) -> dict:
+    """Returns the create_engine() pool options from the app configuration"""
+    return {
+        "poolclass": InstrumentedAsyncQueuePool if is_async else InstrumentedQueuePool,
+        "pool_size": config["DB_POOL_SIZE"],
+        "max_overflow": config["DB_MAX_OVERFLOW"],
+        "pool_timeout": config["DB_POOL_TIMEOUT"],
+        "pool_recycle": config["DB_POOL_RECYCLE"],
+        "pool_pre_ping": config["DB_POOL_PRE_PING"],
+    }
+
+
+def pool_status(engine) -> dict:
+    """Returns the saturation and counters of the pool of an engine"""
+    pool = engine.pool
+    status = {"pool": type(pool).__name__}
+    if isinstance(pool, QueuePool):
+        status.update({
+            "size": pool.size(),
+            "checked_out": pool.checkedout(),
+            "checked_in": pool.checkedin(),
+            "overflow": pool.overflow(),
+            "max_overflow": pool._max_overflow,  # pylint: disable=protected-access
+        })
+    if isinstance(pool, InstrumentedQueuePool):
+        status.update(pool.stats.as_dict())
+    return status
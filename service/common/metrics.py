@@ -0,0 +1,125 @@
+"""
+Metrics
+
+This module records the request counts, status codes and latencies of every
+resource and method, and the number and duration of the database queries
+they run, and renders them in the Prometheus text exposition format.
+
+It also adds up the queries of every request: with DB_DEBUG_HEADERS on the
+response carries them in X-DB-Queries and X-DB-Time-ms, and a request that
+runs more than DB_QUERY_BUDGET queries is logged as a likely N+1 pattern.
+
+Under gunicorn every worker writes its samples to files in
+PROMETHEUS_MULTIPROC_DIR (see gunicorn.conf.py) and exposition() adds up
+the files of all workers, so /metrics reports the whole server no matter
+which worker answers it.
+"""
+import logging
+import os
+import time
+from flask import current_app, g, has_request_context, request
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Histogram
+from prometheus_client import generate_latest, multiprocess
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger("flask.app")
+
+MULTIPROC_DIR = "PROMETHEUS_MULTIPROC_DIR"
+CONTENT_TYPE = CONTENT_TYPE_LATEST
+STATEMENTS = ("SELECT", "INSERT", "UPDATE", "DELETE")
+
+REQUESTS = Counter(
+    "wishlist_http_requests_total",
+    "HTTP requests answered, by resource, method and status code",
+    ["resource", "method", "status"],
+)
+REQUEST_LATENCY = Histogram(
+    "wishlist_http_request_duration_seconds",
+    "Time spent handling HTTP requests, by resource and method",
+    ["resource", "method"],
+)
+QUERY_LATENCY = Histogram(
+    "wishlist_db_query_duration_seconds",
+    "Time spent in database queries, by the resource that ran them and statement",
+    ["resource", "statement"],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, float("inf")),
+)
+
+
+def resource_name() -> str:
+    """Returns the flask_restx Resource class or view function of the current request"""
+    view = current_app.view_functions.get(request.endpoint)
+    if view is None:
+        return "unmatched"
+    return getattr(view, "view_class", view).__name__
+
+
+def start_timer():
+    """before_request hook that remembers when the request started"""
+    g.request_started = time.perf_counter()
+    g.db_queries = 0
+    g.db_time = 0.0
+
+
+def record_request(response):
+    """after_request hook that counts the request and observes its latency"""
+    started = g.pop("request_started", None)
+    resource = resource_name()
+    REQUESTS.labels(resource, request.method, str(response.status_code)).inc()
+    if started is not None:
+        REQUEST_LATENCY.labels(resource, request.method).observe(time.perf_counter() - started)
+    check_query_budget(response)
+    return response
+
+
+def check_query_budget(response):
+    """Reports the queries the request ran so far, and warns when they exceed the budget
+
+    Queries run while a streamed response is sent come after this and are not included
+    """
+    queries, db_time = g.get("db_queries", 0), g.get("db_time", 0.0)
+    config = current_app.config
+    if config["DB_DEBUG_HEADERS"]:
+        response.headers["X-DB-Queries"] = str(queries)
+        response.headers["X-DB-Time-ms"] = f"{db_time * 1000:.2f}"
+    budget = config["DB_QUERY_BUDGET"]
+    if budget and queries > budget:
+        logger.warning(
+            "%s %s ran %d queries in %.1f ms, over the budget of %d",
+            request.method, request.path, queries, db_time * 1000, budget,
+        )
+
+
+# pylint: disable=unused-argument,too-many-arguments
+@event.listens_for(Engine, "before_cursor_execute")
+def start_query_timer(conn, cursor, statement, parameters, context, executemany):
+    """Remembers when a query was sent to the database"""
+    context.query_started = time.perf_counter()
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def record_query(conn, cursor, statement, parameters, context, executemany):
+    """Observes the duration of a query under the resource that ran it"""
+    started = getattr(context, "query_started", None)
+    if started is None:
+        return
+    elapsed = time.perf_counter() - started
+    verb = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else ""
+    resource = "none"
+    if has_request_context():
+        resource = resource_name()
+        g.db_queries = g.get("db_queries", 0) + 1
+        g.db_time = g.get("db_time", 0.0) + elapsed
+    QUERY_LATENCY.labels(resource, verb if verb in STATEMENTS else "OTHER").observe(elapsed)
+# pylint: enable=unused-argument,too-many-arguments
+
+
+def exposition() -> bytes:
+    """Returns the metrics of all workers in the text exposition format"""
+    path = os.environ.get(MULTIPROC_DIR)
+    if not path:
+        return generate_latest(REGISTRY)
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry, path=path)
+    return generate_latest(registry)
@@ -0,0 +1,83 @@
+"""
+Pagination Helpers
+
+This module contains utility functions to build and read the opaque
+cursors used by the keyset paginated list endpoints
+"""
+import base64
+import binascii
+import json
+from urllib.parse import urlencode
+from service.models import DataValidationError
+
+
+def encode_cursor(*values) -> str:
+    """Encodes the sort key of the last row of a page into an opaque cursor"""
+    raw = json.dumps(list(values), separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> list:
+    """Decodes a cursor created by encode_cursor() back into its sort key
+
+    Raises:
+        DataValidationError: if the cursor was not created by this service
+    """
+    try:
+        padding = "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(cursor + padding))
+    except (binascii.Error, UnicodeDecodeError, ValueError) as error:
+        raise DataValidationError(f"Invalid cursor: {cursor}") from error
+    if not isinstance(values, list) or not values:
+        raise DataValidationError(f"Invalid cursor: {cursor}")
+    return values
+
+
+def decode_id_cursor(cursor: str) -> int:
+    """Decodes a cursor whose sort key is just the id of the last row"""
+    values = decode_cursor(cursor)
+    if len(values) != 1 or not isinstance(values[0], int) or isinstance(values[0], bool):
+        raise DataValidationError(f"Invalid cursor: {cursor}")
+    return values[0]
+
+
+def decode_score_cursor(cursor: str) -> tuple:
+    """Decodes a cursor whose sort key is the score and the id of the last row"""
+    values = decode_cursor(cursor)
+    if len(values) != 2 or not all(isinstance(value, (int, float)) and not isinstance(value, bool) for value in values):
+        raise DataValidationError(f"Invalid cursor: {cursor}")
+    if not isinstance(values[1], int):
+        raise DataValidationError(f"Invalid cursor: {cursor}")
+    return tuple(values)
+
+
+def decode_key_cursor(cursor: str) -> tuple:
+    """Decodes a cursor whose sort key is a column value, possibly null, and the id of the last row"""
+    values = decode_cursor(cursor)
+    if len(values) != 2 or not isinstance(values[1], int) or isinstance(values[1], bool):
+        raise DataValidationError(f"Invalid cursor: {cursor}")
+    if values[0] is not None and not isinstance(values[0], (str, int, float)):
+        raise DataValidationError(f"Invalid cursor: {cursor}")
+    return tuple(values)
+
+
+def page_size(limit, default: int, maximum: int) -> int:
+    """Returns the requested page size clamped to the configured bounds"""
+    if limit is None:
+        return default
+    if limit < 1:
+        raise DataValidationError("Invalid limit: must be a positive integer")
+    return min(limit, maximum)
+
+
+def next_link(base_url: str, args: dict, cursor: str) -> str:
+    """Returns an RFC 8288 Link header value pointing at the next page
+
+    Args:
+        base_url (string): the url of the list endpoint without query string
+        args (dict): the query string arguments of the current request
+        cursor (string): the cursor of the next page
+    """
+    query = {key: value for key, value in args.items() if key != "cursor"}
+    query["cursor"] = cursor
+    return f'<{base_url}?{urlencode(query)}>; rel="next"'
@@ -0,0 +1,72 @@
+"""
+Read Replica Routing
+
+This module decides when the database session reads from a replica.
+Read-only handlers are decorated with read_only(); while they run the
+session sends its queries to one of the replica binds. A client that wrote
+recently gets a cookie and keeps reading from the primary until it
+expires, so it always reads its own writes.
+"""
+import random
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+from flask import current_app, request
+
+REPLICA_PREFIX = "replica_"
+LAST_WRITE_COOKIE = "wishlist_last_write"
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+
+# the bind key of the replica the current request reads from, if any
+_replica = ContextVar("replica", default=None)
+
+
+def replica_binds(config) -> list:
+    """Returns the bind keys of the configured replicas"""
+    return sorted(key for key in config.get("SQLALCHEMY_BINDS") or {} if key.startswith(REPLICA_PREFIX))
+
+
+def current_replica():
+    """Returns the bind key of the replica to read from, None for the primary"""
+    return _replica.get()
+
+
+@contextmanager
+def replica_reads(bind_key):
+    """Sends the reads of the session to the given replica while active"""
+    token = _replica.set(bind_key)
+    try:
+        yield
+    finally:
+        _replica.reset(token)
+
+
+def wrote_recently() -> bool:
+    """Returns True if the client wrote within the sticky window"""
+    try:
+        last_write = float(request.cookies.get(LAST_WRITE_COOKIE, ""))
+    except ValueError:
+        return False
+    return time.time() - last_write < current_app.config["REPLICA_STICKY_SECONDS"]
+
+
+def read_only(func):
+    """Runs a read-only handler against a randomly chosen replica"""
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        binds = replica_binds(current_app.config)
+        if not binds or wrote_recently():
+            return func(*args, **kwargs)
+        with replica_reads(random.choice(binds)):
+            return func(*args, **kwargs)
+    return wrapper
+
+
+def remember_write(response):
+    """Keeps a client on the primary for a while after a successful write"""
+    sticky_seconds = current_app.config["REPLICA_STICKY_SECONDS"]
+    if (request.method not in SAFE_METHODS and response.status_code < 400
+            and sticky_seconds > 0 and replica_binds(current_app.config)):
+        response.set_cookie(LAST_WRITE_COOKIE, str(time.time()), max_age=sticky_seconds, httponly=True)
+    return response
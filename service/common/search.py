@@ -0,0 +1,129 @@
+"""
+Search
+
+The names and descriptions of the items are indexed for full-text search:
+Postgres uses a GIN index over their tsvector, SQLite an external content
+FTS5 table that triggers keep in sync with the item table. Both stem English
+words and match the items that contain all of them.
+
+The names of the wishlists are indexed for case-insensitive substring
+search with a trigram index on Postgres, and for prefix search with an
+ordinary index on both Postgres and SQLite.
+
+This module holds the schema of these indexes and builds the dialect
+specific criteria that use them.
+"""
+import re
+from sqlalchemy import Float, and_, cast, column, false, func, literal, literal_column, table, text, true
+
+# must be the expression of ix_item_search for Postgres to use the index
+DOCUMENT = "to_tsvector('english', coalesce(item.name, '') || ' ' || coalesce(item.description, ''))"
+
+ITEM_SCHEMA = {
+    "postgresql": [
+        "CREATE INDEX IF NOT EXISTS ix_item_search ON item "
+        "USING GIN (to_tsvector('english', coalesce(name, '') || ' ' || coalesce(description, '')))",
+    ],
+    "sqlite": [
+        "CREATE VIRTUAL TABLE IF NOT EXISTS item_search USING fts5("
+        "name, description, content='item', content_rowid='id', tokenize='porter unicode61')",
+        "CREATE TRIGGER IF NOT EXISTS item_search_insert AFTER INSERT ON item BEGIN "
+        "INSERT INTO item_search (rowid, name, description) VALUES (new.id, new.name, new.description); END",
+        "CREATE TRIGGER IF NOT EXISTS item_search_delete AFTER DELETE ON item BEGIN "
+        "INSERT INTO item_search (item_search, rowid, name, description) "
+        "VALUES ('delete', old.id, old.name, old.description); END",
+        "CREATE TRIGGER IF NOT EXISTS item_search_update AFTER UPDATE ON item BEGIN "
+        "INSERT INTO item_search (item_search, rowid, name, description) "
+        "VALUES ('delete', old.id, old.name, old.description); "
+        "INSERT INTO item_search (rowid, name, description) VALUES (new.id, new.name, new.description); END",
+        # index the items that existed before the table
+        "INSERT INTO item_search (item_search) VALUES ('rebuild')",
+    ],
+}
+
+ITEM_DROP = {
+    "sqlite": ["DROP TABLE IF EXISTS item_search"],
+}
+
+NAME_SCHEMA = {
+    "postgresql": [
+        "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+        "CREATE INDEX IF NOT EXISTS ix_wishlist_name_trgm ON wishlist USING GIN (lower(name) gin_trgm_ops)",
+        "CREATE INDEX IF NOT EXISTS ix_wishlist_name_prefix ON wishlist (lower(name) text_pattern_ops)",
+    ],
+    "sqlite": [
+        "CREATE INDEX IF NOT EXISTS ix_wishlist_name_prefix ON wishlist (lower(name))",
+    ],
+}
+
+# how find_by_name() matches names, the first one is the default
+NAME_MODES = ("contains", "prefix")
+
+item_search = table("item_search", column("rowid"))
+
+
+def execute_schema(connection, schema: dict):
+    """Runs the statements of a schema for the dialect of the connection, if it has any"""
+    for statement in schema.get(connection.dialect.name, []):
+        connection.execute(text(statement))
+
+
+def words_of(terms: str) -> list:
+    """Returns the words of a search, without any search syntax"""
+    return re.findall(r"\w+", terms or "")
+
+
+def match(query, item_id, terms: str) -> tuple:
+    """Restricts a query of items to the ones that contain all of the words of terms
+
+    Args:
+        query (Query): the query of items
+        item_id (Column): the id column of the items of the query
+        terms (string): the words to search for
+
+    Returns:
+        the restricted query and the expression of the score of each item,
+        higher scores are better matches
+    """
+    words = words_of(terms)
+    if not words:
+        return query.filter(false()), literal(0.0)
+    dialect = query.session.get_bind().dialect.name
+    if dialect == "postgresql":
+        document = literal_column(DOCUMENT)
+        tsquery = func.plainto_tsquery(literal_column("'english'::regconfig"), " ".join(words))
+        # ts_rank() is a real, compare the cursors of pages in double precision
+        score = cast(func.ts_rank(document, tsquery), Float(53))
+        return query.filter(document.op("@@")(tsquery)), score
+
+    # every word is quoted so that FTS5 does not read any of it as syntax
+    score = -func.bm25(literal_column("item_search"))
+    phrases = " ".join(f'"{word}"' for word in words)
+    query = query.join(item_search, item_search.c.rowid == item_id)
+    return query.filter(literal_column("item_search").op("MATCH")(phrases)), score
+
+
+def escape_like(value: str) -> str:
+    """Escapes the wildcards of a LIKE pattern with backslashes"""
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def name_matches(name_column, name: str, mode: str, dialect: str):
+    """Returns the criterion of a case-insensitive search of a name
+
+    Args:
+        name_column (Column): the column to search
+        name (string): the text to look for
+        mode (string): "contains" to find it anywhere, "prefix" at the start only
+        dialect (string): the name of the dialect of the database
+    """
+    lowered, name = func.lower(name_column), name.lower()
+    if mode == "prefix":
+        if dialect == "postgresql":
+            return lowered.like(escape_like(name) + "%", escape="\\")
+        # SQLite only uses an index on an expression for comparisons, so
+        # look for the range of the names that start with the prefix
+        if not name:
+            return true()
+        return and_(lowered >= name, lowered < name[:-1] + chr(ord(name[-1]) + 1))
+    return lowered.like("%" + escape_like(name) + "%", escape="\\")
@@ -14,3 +14,52 @@ SQLALCHEMY_TRACK_MODIFICATIONS = False
 
 # Secret for session management
 SECRET_KEY = os.getenv("SECRET_KEY", "s3cr3t-key-shhhh")
+
+# Keyset pagination for list endpoints
+DEFAULT_PAGE_SIZE = int(os.getenv("DEFAULT_PAGE_SIZE", "100"))
+MAX_PAGE_SIZE = int(os.getenv("MAX_PAGE_SIZE", "1000"))
+
+# Whether wishlist reads include the items when the request asks for
+# neither ?fields= nor ?include=items
+WISHLIST_INCLUDE_ITEMS = os.getenv("WISHLIST_INCLUDE_ITEMS", "true").lower() == "true"
+
+# Number of rows fetched per round trip when streaming NDJSON lists
+STREAM_BATCH_SIZE = int(os.getenv("STREAM_BATCH_SIZE", "500"))
+
+# Connection pool of each gunicorn worker (not used for SQLite). Size it so
+# that workers * (DB_POOL_SIZE + DB_MAX_OVERFLOW) stays below the
+# max_connections of Postgres
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() == "true"
+
+# Optional read replicas (comma separated URIs). GET requests read from a
+# replica unless the client wrote within the last REPLICA_STICKY_SECONDS
+DATABASE_REPLICA_URIS = [uri for uri in os.getenv("DATABASE_REPLICA_URIS", "").split(",") if uri]
+SQLALCHEMY_BINDS = {f"replica_{n}": uri for n, uri in enumerate(DATABASE_REPLICA_URIS)}
+REPLICA_STICKY_SECONDS = int(os.getenv("REPLICA_STICKY_SECONDS", "5"))
+
+# In-process read-through cache of Wishlist.find() and Item.find(). Entries
+# are dropped when this worker writes them; other workers may serve an old
+# version for up to FIND_CACHE_TTL seconds. A size or ttl of 0 disables it
+FIND_CACHE_SIZE = int(os.getenv("FIND_CACHE_SIZE", "1024"))
+FIND_CACHE_TTL = float(os.getenv("FIND_CACHE_TTL", "5"))
+
+# Cache of serialized wishlist payloads by id and by user. "redis" shares it
+# between all workers and pods through the Redis compatible server at
+# CACHE_REDIS_URL, "none" turns it off. "memory" keeps one cache per process
+# that only the writes of that process expire, so it is only safe with a
+# single worker
+CACHE_BACKEND = os.getenv("CACHE_BACKEND", "none")
+CACHE_REDIS_URL = os.getenv("CACHE_REDIS_URL", "redis://localhost:6379/0")
+CACHE_TTL = float(os.getenv("CACHE_TTL", "60"))
+CACHE_SIZE = int(os.getenv("CACHE_SIZE", "1024"))
+CACHE_PREFIX = os.getenv("CACHE_PREFIX", "wishlist-service:")
+
+# Report the number and time of the queries of each request in the
+# X-DB-Queries and X-DB-Time-ms response headers, and log a warning for
+# requests that run more than DB_QUERY_BUDGET queries (0 turns it off)
+DB_DEBUG_HEADERS = os.getenv("DB_DEBUG_HEADERS", "false").lower() == "true"
+DB_QUERY_BUDGET = int(os.getenv("DB_QUERY_BUDGET", "20"))
@@ -0,0 +1,103 @@
+"""
+Package: service.migrations
+Versioned schema migrations
+
+Every module in service/migrations/versions is one migration. It defines a
+VERSION number, a DESCRIPTION and an upgrade(connection) function that
+changes the schema. The versions that have been applied are recorded in the
+schema_version table, so upgrade() only runs the migrations a database is
+missing. Each migration runs in its own transaction while holding a lock,
+so concurrent upgrades (e.g. from several pods starting at once) are safe.
+"""
+import importlib
+import logging
+import pkgutil
+from datetime import datetime, timezone
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, func, select, text
+from service.migrations import versions
+
+logger = logging.getLogger("flask.app")
+
+# Arbitrary key for the Postgres advisory lock held while migrating
+MIGRATION_LOCK_ID = 2820003
+
+schema_version = Table(
+    "schema_version",
+    MetaData(),
+    Column("version", Integer, primary_key=True),
+    Column("description", String(255)),
+    Column("applied_at", DateTime(timezone=True)),
+)
+
+
+def migrations() -> list:
+    """Returns all of the migration modules ordered by VERSION"""
+    modules = [
+        importlib.import_module(f"{versions.__name__}.{name}")
+        for _, name, _ in pkgutil.iter_modules(versions.__path__)
+    ]
+    return sorted(modules, key=lambda module: module.VERSION)
+
+
+def head() -> int:
+    """Returns the VERSION of the newest migration"""
+    return migrations()[-1].VERSION
+
+
+def current_version(connection) -> int:
+    """Returns the newest VERSION applied to the database, 0 if none"""
+    schema_version.create(connection, checkfirst=True)
+    return connection.execute(select(func.coalesce(func.max(schema_version.c.version), 0))).scalar()
+
+
+def lock(connection):
+    """Serializes migrations across processes until the transaction ends"""
+    if connection.dialect.name == "postgresql":
+        connection.execute(text("SELECT pg_advisory_xact_lock(:id)"), {"id": MIGRATION_LOCK_ID})
+
+
+def upgrade(engine, target: int = None) -> list:
+    """Applies every missing migration up to target (default: the newest)
+
+    Returns:
+        the VERSION numbers that were applied
+    """
+    applied = []
+    for migration in migrations():
+        if target is not None and migration.VERSION > target:
+            break
+        with engine.begin() as connection:
+            lock(connection)
+            if current_version(connection) >= migration.VERSION:
+                continue
+            logger.info("Applying migration %04d: %s", migration.VERSION, migration.DESCRIPTION)
+            migration.upgrade(connection)
+            record(connection, migration)
+            applied.append(migration.VERSION)
+    return applied
+
+
+def stamp(engine, version: int = None):
+    """Marks the database as migrated to version (default: the newest)
+
+    Used after the schema was created directly from the models
+    """
+    version = head() if version is None else version
+    with engine.begin() as connection:
+        lock(connection)
+        schema_version.create(connection, checkfirst=True)
+        connection.execute(schema_version.delete())
+        for migration in migrations():
+            if migration.VERSION <= version:
+                record(connection, migration)
+
+
+def record(connection, migration):
+    """Records that a migration was applied"""
+    connection.execute(
+        schema_version.insert().values(
+            version=migration.VERSION,
+            description=migration.DESCRIPTION,
+            applied_at=datetime.now(timezone.utc),
+        )
+    )
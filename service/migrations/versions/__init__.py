@@ -0,0 +1,4 @@
+"""
+Package: service.migrations.versions
+One module per schema migration, applied in VERSION order
+"""
@@ -0,0 +1,41 @@
+"""
+Creates the wishlist and item tables as they were before migrations existed
+
+Databases that were created by db.create_all() already have these tables,
+so they are only created if they are missing
+"""
+from sqlalchemy import (
+    Boolean, Column, DateTime, Float, ForeignKey, Integer, MetaData, String, Table, func
+)
+
+VERSION = 1
+DESCRIPTION = "Create wishlist and item tables"
+
+metadata = MetaData()
+
+Table(
+    "wishlist",
+    metadata,
+    Column("id", Integer, primary_key=True),
+    Column("user_id", Integer),
+    Column("name", String(64)),
+    Column("is_enabled", Boolean),
+    Column("created_at", DateTime(timezone=True), server_default=func.now()),
+    Column("last_updated", DateTime(timezone=True), server_default=func.now()),
+)
+
+Table(
+    "item",
+    metadata,
+    Column("id", Integer, primary_key=True),
+    Column("wishlist_id", Integer, ForeignKey("wishlist.id", ondelete="CASCADE"), nullable=False),
+    Column("name", String(64)),
+    Column("category", String(64)),
+    Column("price", Float),
+    Column("description", String(100)),
+)
+
+
+def upgrade(connection):
+    """Creates the tables that do not exist yet"""
+    metadata.create_all(connection, checkfirst=True)
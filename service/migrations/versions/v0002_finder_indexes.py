@@ -0,0 +1,25 @@
+"""
+Adds the secondary indexes used by the finders
+
+Wishlist.find_by_user_id() and find_by_enabled() filter on user_id and
+is_enabled, the items relationship loads by item.wishlist_id (which
+Postgres does not index for a foreign key) and Item.find_by_category()
+filters on category
+"""
+from sqlalchemy import text
+
+VERSION = 2
+DESCRIPTION = "Add finder indexes"
+
+INDEXES = {
+    "ix_wishlist_user_id": "wishlist (user_id)",
+    "ix_wishlist_is_enabled": "wishlist (is_enabled)",
+    "ix_item_wishlist_id": "item (wishlist_id)",
+    "ix_item_category": "item (category)",
+}
+
+
+def upgrade(connection):
+    """Creates the indexes"""
+    for name, columns in INDEXES.items():
+        connection.execute(text(f"CREATE INDEX IF NOT EXISTS {name} ON {columns}"))
@@ -0,0 +1,14 @@
+"""
+Adds the version of a wishlist used for its entity tag
+
+The version is incremented whenever the wishlist or any of its items change
+"""
+from sqlalchemy import text
+
+VERSION = 3
+DESCRIPTION = "Add wishlist.version"
+
+
+def upgrade(connection):
+    """Adds the column, existing wishlists start at version 1"""
+    connection.execute(text("ALTER TABLE wishlist ADD COLUMN version INTEGER NOT NULL DEFAULT 1"))
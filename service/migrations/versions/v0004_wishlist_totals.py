@@ -0,0 +1,16 @@
+"""
+Adds the number of items and their total price to every wishlist
+
+The totals of existing wishlists start at 0, they are filled in by
+flask recompute-totals after the upgrade
+"""
+from sqlalchemy import text
+
+VERSION = 4
+DESCRIPTION = "Add wishlist.item_count and wishlist.total_price"
+
+
+def upgrade(connection):
+    """Adds the columns"""
+    connection.execute(text("ALTER TABLE wishlist ADD COLUMN item_count INTEGER NOT NULL DEFAULT 0"))
+    connection.execute(text("ALTER TABLE wishlist ADD COLUMN total_price FLOAT NOT NULL DEFAULT 0"))
@@ -0,0 +1,38 @@
+"""
+Adds the full-text index of the names and descriptions of the items
+
+Postgres gets a GIN index over their tsvector. SQLite gets an FTS5 table
+with the triggers that keep it in sync with the item table; it indexes the
+existing items when it is created
+"""
+from sqlalchemy import text
+
+VERSION = 5
+DESCRIPTION = "Add item full-text search index"
+
+STATEMENTS = {
+    "postgresql": [
+        "CREATE INDEX IF NOT EXISTS ix_item_search ON item "
+        "USING GIN (to_tsvector('english', coalesce(name, '') || ' ' || coalesce(description, '')))",
+    ],
+    "sqlite": [
+        "CREATE VIRTUAL TABLE IF NOT EXISTS item_search USING fts5("
+        "name, description, content='item', content_rowid='id', tokenize='porter unicode61')",
+        "CREATE TRIGGER IF NOT EXISTS item_search_insert AFTER INSERT ON item BEGIN "
+        "INSERT INTO item_search (rowid, name, description) VALUES (new.id, new.name, new.description); END",
+        "CREATE TRIGGER IF NOT EXISTS item_search_delete AFTER DELETE ON item BEGIN "
+        "INSERT INTO item_search (item_search, rowid, name, description) "
+        "VALUES ('delete', old.id, old.name, old.description); END",
+        "CREATE TRIGGER IF NOT EXISTS item_search_update AFTER UPDATE ON item BEGIN "
+        "INSERT INTO item_search (item_search, rowid, name, description) "
+        "VALUES ('delete', old.id, old.name, old.description); "
+        "INSERT INTO item_search (rowid, name, description) VALUES (new.id, new.name, new.description); END",
+        "INSERT INTO item_search (item_search) VALUES ('rebuild')",
+    ],
+}
+
+
+def upgrade(connection):
+    """Creates the index of the dialect"""
+    for statement in STATEMENTS.get(connection.dialect.name, []):
+        connection.execute(text(statement))
@@ -0,0 +1,29 @@
+"""
+Adds the indexes of the case-insensitive searches of wishlist names
+
+On Postgres a trigram index over lower(name) serves substring searches
+(LIKE '%x%') and a text_pattern_ops index prefix searches (LIKE 'x%'); the
+pg_trgm extension is created if it is missing. SQLite gets an index over
+lower(name) for prefix searches
+"""
+from sqlalchemy import text
+
+VERSION = 6
+DESCRIPTION = "Add wishlist name search indexes"
+
+STATEMENTS = {
+    "postgresql": [
+        "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+        "CREATE INDEX IF NOT EXISTS ix_wishlist_name_trgm ON wishlist USING GIN (lower(name) gin_trgm_ops)",
+        "CREATE INDEX IF NOT EXISTS ix_wishlist_name_prefix ON wishlist (lower(name) text_pattern_ops)",
+    ],
+    "sqlite": [
+        "CREATE INDEX IF NOT EXISTS ix_wishlist_name_prefix ON wishlist (lower(name))",
+    ],
+}
+
+
+def upgrade(connection):
+    """Creates the indexes of the dialect"""
+    for statement in STATEMENTS.get(connection.dialect.name, []):
+        connection.execute(text(statement))
@@ -0,0 +1,25 @@
+"""
+Replaces the item indexes with composite ones for filtered keyset pages
+
+Item.find_by_filters() pages through the items of a wishlist or a category
+in id order: (wishlist_id, id, price) and (category, id, price) return them
+in that order and let the price range be checked on the index entries. They
+make the single column indexes on wishlist_id and category redundant
+"""
+from sqlalchemy import text
+
+VERSION = 7
+DESCRIPTION = "Add composite item filter indexes"
+
+STATEMENTS = [
+    "CREATE INDEX IF NOT EXISTS ix_item_wishlist_id_price ON item (wishlist_id, id, price)",
+    "CREATE INDEX IF NOT EXISTS ix_item_category_id_price ON item (category, id, price)",
+    "DROP INDEX IF EXISTS ix_item_wishlist_id",
+    "DROP INDEX IF EXISTS ix_item_category",
+]
+
+
+def upgrade(connection):
+    """Creates the composite indexes and drops the ones they replace"""
+    for statement in STATEMENTS:
+        connection.execute(text(statement))
@@ -0,0 +1,23 @@
+"""
+Adds the indexes that sort the items of a wishlist by name and by price
+
+Item.sorted_page() pages through the items of a wishlist ordered by name or
+price and then id: (wishlist_id, name, id) and (wishlist_id, price, id)
+return them in that order in either direction, so a page costs the same
+however many items the wishlist has
+"""
+from sqlalchemy import text
+
+VERSION = 8
+DESCRIPTION = "Add item sort indexes"
+
+STATEMENTS = [
+    "CREATE INDEX IF NOT EXISTS ix_item_wishlist_by_name ON item (wishlist_id, name, id)",
+    "CREATE INDEX IF NOT EXISTS ix_item_wishlist_by_price ON item (wishlist_id, price, id)",
+]
+
+
+def upgrade(connection):
+    """Creates the indexes"""
+    for statement in STATEMENTS:
+        connection.execute(text(statement))
@@ -3,14 +3,82 @@ Models for YourResourceModel
 
 All of the models are stored in this module
 """
+# pylint: disable=too-many-lines
+import hashlib
 import logging
-from flask_sqlalchemy import SQLAlchemy
+import operator
+import sqlite3
+from flask_sqlalchemy import SignallingSession, SQLAlchemy
+from sqlalchemy import and_, bindparam, delete, event, inspect, or_, orm, select
+from sqlalchemy.dialects.sqlite.aiosqlite import AsyncAdapt_aiosqlite_connection
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import DataError, IntegrityError
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.orm import load_only, make_transient_to_detached, object_session, selectinload
+from sqlalchemy.orm.attributes import set_committed_value
 from sqlalchemy.sql import func
+from service.common import search
+from service.common.cache import PayloadCache, TTLCache
+from service.common.db_pool import pool_options
+from service.common.replicas import current_replica
 
 logger = logging.getLogger("flask.app")
 
+
+class RoutingSession(SignallingSession):  # pylint: disable=too-few-public-methods
+    """Session that sends reads to a replica inside read-only handlers"""
+
+    # scoped_session.get_bind() passes more arguments that the parent ignores too
+    def get_bind(self, mapper=None, clause=None, **kw):  # pylint: disable=unused-argument
+        bind_key = current_replica()
+        if bind_key and not self._flushing:
+            return self.app.extensions["sqlalchemy"].db.get_engine(self.app, bind=bind_key)
+        return super().get_bind(mapper, clause)
+
+
+class ServiceSQLAlchemy(SQLAlchemy):
+    """SQLAlchemy integration that configures the connection pool from the app
+    config, routes the reads of read-only handlers to replicas and supports
+    the asyncio drivers used by the ASGI entry point (service.asgi)"""
+
+    def create_session(self, options):
+        return orm.sessionmaker(class_=RoutingSession, db=self, **options)
+
+    def apply_driver_hacks(self, app, sa_url, options):
+        sa_url, options = super().apply_driver_hacks(app, sa_url, options)
+        if not sa_url.drivername.startswith("sqlite"):
+            options.update(pool_options(app.config, sa_url.get_dialect().is_async))
+        return sa_url, options
+
+    def create_engine(self, sa_url, engine_opts):
+        # The ORM stays synchronous: the requests of the ASGI entry point run
+        # in greenlets that yield to the event loop on every driver call
+        if sa_url.get_dialect().is_async:
+            return create_async_engine(sa_url, **engine_opts).sync_engine
+        return super().create_engine(sa_url, engine_opts)
+
+
 # Create the SQLAlchemy object to be initialized later in init_db()
-db = SQLAlchemy()
+db = ServiceSQLAlchemy()
+
+# Read-through cache of the column values of entities found by id
+find_cache = TTLCache()
+STALE_KEYS = "find_cache_stale_keys"
+STALE_ITEM_WISHLISTS = "find_cache_stale_item_wishlists"
+
+# Serialized wishlists by id and by user, shared between workers when the
+# backend is Redis
+payload_cache = PayloadCache()
+STALE_PAYLOADS = "payload_cache_stale_keys"
+
+
+@event.listens_for(Engine, "connect")
+def enable_sqlite_foreign_keys(dbapi_connection, connection_record):  # pylint: disable=unused-argument
+    """SQLite only enforces ON DELETE CASCADE when foreign keys are turned on"""
+    if isinstance(dbapi_connection, (sqlite3.Connection, AsyncAdapt_aiosqlite_connection)):
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA foreign_keys=ON")
+        cursor.close()
 
 
 # Function to initialize the database
@@ -28,6 +96,24 @@ class DataValidationError(Exception):
     """ Used for an data validation errors when deserializing """
 
 
+# the range of the 4 byte integer columns
+INTEGER_RANGE = range(-2 ** 31, 2 ** 31)
+
+
+def fits_column(column_type, value) -> bool:
+    """Returns True if a value can be stored in a column of the given type
+    without the database rejecting it, as Postgres does with a DataError"""
+    if isinstance(column_type, db.String):
+        return isinstance(value, str) and (column_type.length is None or len(value) <= column_type.length)
+    if isinstance(column_type, db.Boolean) or isinstance(value, bool):
+        return isinstance(column_type, db.Boolean) and isinstance(value, bool)
+    if isinstance(column_type, db.Integer):
+        return isinstance(value, int) and value in INTEGER_RANGE
+    if isinstance(column_type, db.Float):
+        return isinstance(value, (int, float))
+    return True
+
+
 class PersistentBase():
     """
     Class that represents a PersistentBase
@@ -61,21 +147,83 @@ class PersistentBase():
         db.session.delete(self)
         db.session.commit()
 
+    def check_columns(self, *fields):
+        """Raises a DataValidationError for the first of the fields whose
+        value does not fit its column, null values always fit"""
+        columns = self.__table__.columns
+        for field in fields:
+            value = getattr(self, field)
+            if value is not None and not fits_column(columns[field].type, value):
+                raise DataValidationError(f"Invalid {type(self).__name__}: bad value for {field}: {value!r}")
+
     @classmethod
     def init_db(cls, app):
         """ Initializes the database session """
         logger.info("Initializing database")
         cls.app = app
+        find_cache.configure(app.config["FIND_CACHE_SIZE"], app.config["FIND_CACHE_TTL"])
+        payload_cache.configure(app.config)
         # This is where we initialize SQLAlchemy from the Flask app
+        # The schema itself is managed by migrations: flask db-upgrade
         db.init_app(app)
         app.app_context().push()
-        db.create_all()  # make our sqlalchemy tables
+
+    @classmethod
+    def eager(cls, query):
+        """Adds the loader options that batch-load the children of an entity
+
+        Entities without child collections return the query unchanged
+        """
+        return query
 
     @classmethod
     def all(cls):
         """ Returns all of the entities in the database """
         logger.info("Processing all entities")
-        return cls.query.all()
+        return cls.eager(cls.query).all()
+
+    @classmethod
+    def paginate(cls, query, limit: int, after_id=None) -> tuple:
+        """Returns one keyset page of a query ordered by id
+
+        Args:
+            query (Query): the query to page through, e.g. from find_by_name()
+            limit (int): the maximum number of entities on the page
+            after_id (int): the id of the last entity of the previous page
+
+        Returns:
+            a tuple of the entities on the page and whether more pages follow
+        """
+        logger.info("Processing page of %s after id %s ...", limit, after_id)
+        if after_id is not None:
+            query = query.filter(cls.id > after_id)
+        # fetch one extra row to learn whether there is a next page
+        entities = query.order_by(cls.id).limit(limit + 1).all()
+        return entities[:limit], len(entities) > limit
+
+    @classmethod
+    def stream(cls, query, batch_size: int, after_id=None):
+        """Iterates over a query ordered by id without materializing it
+
+        Rows are fetched from a server-side cursor batch_size at a time
+
+        Args:
+            query (Query): the query to iterate, e.g. from find_by_name()
+            batch_size (int): the number of rows to fetch per round trip
+            after_id (int): only return entities with a greater id
+        """
+        logger.info("Processing stream in batches of %s after id %s ...", batch_size, after_id)
+        if after_id is not None:
+            query = query.filter(cls.id > after_id)
+        return query.order_by(cls.id).yield_per(batch_size)
+
+    @classmethod
+    def find_existing_ids(cls, ids: list) -> set:
+        """Returns which of the given ids are already used by an entity"""
+        logger.info("Processing id lookup for %d entities ...", len(ids))
+        if not ids:
+            return set()
+        return {row.id for row in db.session.query(cls.id).filter(cls.id.in_(ids))}
 
     @classmethod
     def find(cls, by_id):
@@ -84,14 +232,40 @@ class PersistentBase():
         return cls.query.get(by_id)
 
     @classmethod
-    def find_by_name(cls, name):
-        """Returns all entities with the given name
+    def find_cached(cls, by_id):
+        """ Finds an entity by it's ID, serving recently found entities
+        from the find cache
+
+        The cached copy may lag behind the database for up to the cache TTL,
+        so only read-only handlers should use it, writes load with find().
+        Entities read from a replica are never cached, it may lag further
+        """
+        logger.info("Processing cached lookup for id %s ...", by_id)
+        key = cache_key(cls, by_id)
+        values = find_cache.get(key) if key else None
+        if values is not None:
+            entity = cls(**values)
+            make_transient_to_detached(entity)
+            return db.session.merge(entity, load=False)
+
+        entity = cls.query.get(by_id)
+        if entity is not None and key and current_replica() is None:
+            find_cache.set(key, {attr.key: getattr(entity, attr.key) for attr in inspect(cls).column_attrs})
+        return entity
+
+    @classmethod
+    def find_by_name(cls, name, mode: str = search.NAME_MODES[0]):
+        """Returns all entities whose name contains or starts with the given name,
+        ignoring case
 
         Args:
             name (string): the name of the entity you want to match
+            mode (string): "contains" to match anywhere in the name, "prefix"
+                to match the start of the name only
         """
-        logger.info("Processing name query for %s ...", name)
-        return cls.query.filter(cls.name.contains(name))
+        logger.info("Processing name query for %s (%s) ...", name, mode)
+        dialect = db.session.get_bind().dialect.name
+        return cls.eager(cls.query.filter(search.name_matches(cls.name, name, mode, dialect)))
 
     @classmethod
     def find_by_user_id(cls, user_id: str) -> list:
@@ -101,7 +275,7 @@ class PersistentBase():
             user_id (string): the user_id of the entity you want to match
         """
         logger.info("Processing user_id query for %s ...", user_id)
-        return cls.query.filter(cls.user_id == user_id)
+        return cls.eager(cls.query.filter(cls.user_id == user_id))
 
     @classmethod
     def find_by_enabled(cls, is_enabled: bool) -> list:
@@ -114,7 +288,7 @@ class PersistentBase():
             logger.info("Processing enabled query")
         else:
             logger.info("Processing non-enabled query")
-        return cls.query.filter(cls.is_enabled == is_enabled)
+        return cls.eager(cls.query.filter(cls.is_enabled == is_enabled))
 
 ######################################################################
 #  I T E M   M O D E L
@@ -136,6 +310,19 @@ class Item(db.Model, PersistentBase):
     price = db.Column(db.Float)
     description = db.Column(db.String(100))
 
+    # find_by_filters() pages by id within a wishlist or a category, with
+    # the price range checked on the index entries before the rows are read;
+    # sorted_page() pages through the items of a wishlist by name or price
+    __table_args__ = (
+        db.Index("ix_item_wishlist_id_price", "wishlist_id", "id", "price"),
+        db.Index("ix_item_category_id_price", "category", "id", "price"),
+        db.Index("ix_item_wishlist_by_name", "wishlist_id", "name", "id"),
+        db.Index("ix_item_wishlist_by_price", "wishlist_id", "price", "id"),
+    )
+
+    # the columns sorted_page() can sort by and the types of their values
+    SORT_KEYS = {"id": (int,), "name": (str,), "price": (int, float)}
+
     def __repr__(self):
         return f"<Item {self.name} id=[{self.id}] Wishlist[{self.wishlist_id}]>"
 
@@ -165,6 +352,7 @@ class Item(db.Model, PersistentBase):
             self.description = data["description"]
             if not (self.name and self.id):
                 raise DataValidationError("Invalid Item Request: Check Details")
+            self.check_columns("id", "wishlist_id", "name", "category", "price", "description")
         except KeyError as error:
             raise DataValidationError("Invalid Item: missing " + error.args[0]) from error
         except TypeError as error:
@@ -174,6 +362,49 @@ class Item(db.Model, PersistentBase):
             ) from error
         return self
 
+    @classmethod
+    def create_many(cls, items: list, touch: bool = True):
+        """
+        Creates many Items with one multi-row INSERT in a single transaction
+        Args:
+            items (list): the deserialized Items to insert
+            touch (bool): whether to set last_updated of their wishlists
+        """
+        logger.info("Creating %d items", len(items))
+        try:
+            cls.insert_many(items, touch=touch)
+            db.session.commit()
+        except (DataError, IntegrityError) as error:
+            db.session.rollback()
+            raise DataValidationError("Invalid Items: " + str(error.orig)) from error
+
+    @classmethod
+    def insert_many(cls, items: list, counted: bool = False, touch: bool = True):
+        """Inserts many Items with one multi-row INSERT and adds them to the
+        totals of their wishlists, without committing
+
+        Args:
+            items (list): the deserialized Items to insert
+            counted (bool): whether the totals of their wishlists include them already
+            touch (bool): whether to set last_updated of their wishlists
+        """
+        if not items:
+            return
+        db.session.execute(cls.__table__.insert(), [item.serialize() for item in items])
+        if counted:
+            return
+        totals = {}
+        for item in items:
+            count, price = totals.get(item.wishlist_id, (0, 0.0))
+            totals[item.wishlist_id] = (count + 1, price + (item.price or 0.0))
+        # one executemany for all of the wishlists, an import keeps their last_updated
+        db.session.execute(
+            Wishlist.add_items(bindparam("wishlist_id"), bindparam("count"), bindparam("price"),
+                               **({} if touch else {"last_updated": Wishlist.last_updated})),
+            [{"wishlist_id": wishlist_id, "count": count, "price": price} for wishlist_id, (count, price) in totals.items()],
+        )
+        expire_wishlists(db.session, db.session.connection(), list(totals))
+
     @classmethod
     def find_by_category(cls, category):
         """Returns all items with the given category
@@ -184,6 +415,115 @@ class Item(db.Model, PersistentBase):
         logger.info("Processing category query for %s ...", category)
         return cls.query.filter(cls.category == category)
 
+    @classmethod
+    def find_by_filters(  # pylint: disable=too-many-arguments
+        cls, category=None, min_price=None, max_price=None, wishlist_id=None, user_id=None
+    ):
+        """Returns all items that match every one of the given filters
+
+        Page through the result with paginate()
+
+        Args:
+            category (string): the category of the items
+            min_price (float): the lowest price of the items, inclusive
+            max_price (float): the highest price of the items, inclusive
+            wishlist_id (int): only the items of this wishlist
+            user_id (int): only the items of the wishlists of this user
+        """
+        logger.info("Processing item query for category %s, price %s-%s, wishlist %s, user %s ...",
+                    category, min_price, max_price, wishlist_id, user_id)
+        if min_price is not None and max_price is not None and min_price > max_price:
+            raise DataValidationError("Invalid price range: min_price is greater than max_price")
+        query = cls.query
+        if category is not None:
+            query = query.filter(cls.category == category)
+        if min_price is not None:
+            query = query.filter(cls.price >= min_price)
+        if max_price is not None:
+            query = query.filter(cls.price <= max_price)
+        if wishlist_id is not None:
+            query = query.filter(cls.wishlist_id == wishlist_id)
+        if user_id is not None:
+            query = query.join(Wishlist, Wishlist.id == cls.wishlist_id).filter(Wishlist.user_id == user_id)
+        return query
+
+    @classmethod
+    def sorted_page(  # pylint: disable=too-many-arguments
+        cls, query, sort: str, limit: int, after=None, descending: bool = False
+    ) -> tuple:
+        """Returns one keyset page of a query of items ordered by a column and then by id
+
+        The items without a value in the column follow all of the others, in
+        id order, whichever the direction
+
+        Args:
+            query (Query): the query to page through, e.g. from find_by_filters()
+            sort (string): the column to sort by, one of SORT_KEYS
+            limit (int): the maximum number of items on the page
+            after (tuple): the value and id of the last item of the previous page
+            descending (bool): whether the largest values come first
+
+        Returns:
+            a tuple of the items on the page and whether more pages follow
+
+        Raises:
+            DataValidationError: if after does not match the column
+        """
+        logger.info("Processing page of %s by %s after %s ...", limit, sort, after)
+        value, last_id = after if after is not None else (None, None)
+        if (value is not None and not isinstance(value, cls.SORT_KEYS[sort])) or isinstance(value, bool):
+            raise DataValidationError(f"Invalid cursor: it does not sort by {sort}")
+        column = getattr(cls, sort)
+        order = [column.desc(), cls.id.desc()] if descending else [column, cls.id]
+        beyond = operator.lt if descending else operator.gt
+
+        items = []
+        if after is None or value is not None:
+            query_valued = query.filter(column.isnot(None)) if column.nullable else query
+            if after is not None:
+                query_valued = query_valued.filter(
+                    or_(beyond(column, value), and_(column == value, beyond(cls.id, last_id)))
+                )
+            # fetch one extra row to learn whether there is a next page
+            items = query_valued.order_by(*order).limit(limit + 1).all()
+        if column.nullable and len(items) <= limit:
+            query_null = query.filter(column.is_(None))
+            if after is not None and value is None:
+                query_null = query_null.filter(beyond(cls.id, last_id))
+            items += query_null.order_by(order[-1]).limit(limit + 1 - len(items)).all()
+        return items[:limit], len(items) > limit
+
+    @classmethod
+    def search(  # pylint: disable=too-many-arguments
+        cls, terms: str, limit: int, after=None, wishlist_id=None, user_id=None
+    ) -> tuple:
+        """Returns one page of the items whose name or description contain all of the words
+
+        Items are ranked by how well they match, best first, and then by id
+
+        Args:
+            terms (string): the words to search for
+            limit (int): the maximum number of items on the page
+            after (tuple): the score and id of the last item of the previous page
+            wishlist_id (int): only search the items of this wishlist
+            user_id (int): only search the items of the wishlists of this user
+
+        Returns:
+            a tuple of the (Item, score) rows on the page and whether more pages follow
+        """
+        logger.info("Processing search for %s after %s ...", terms, after)
+        query = db.session.query(cls)
+        if wishlist_id is not None:
+            query = query.filter(cls.wishlist_id == wishlist_id)
+        if user_id is not None:
+            query = query.join(Wishlist, Wishlist.id == cls.wishlist_id).filter(Wishlist.user_id == user_id)
+        query, score = search.match(query, cls.id, terms)
+        if after is not None:
+            last_score, last_id = after
+            query = query.filter(or_(score < last_score, and_(score == last_score, cls.id > last_id)))
+        rows = query.add_columns(score.label("score")).order_by(score.desc(), cls.id).limit(limit + 1).all()
+        return rows[:limit], len(rows) > limit
+
 
 ######################################################################
 #  W I S H L I S T   M O D E L
@@ -194,16 +534,207 @@ class Wishlist(db.Model, PersistentBase):
     """
 
     id = db.Column(db.Integer, primary_key=True)
-    user_id = db.Column(db.Integer)
+    user_id = db.Column(db.Integer, index=True)
     name = db.Column(db.String(64))
-    is_enabled = db.Column(db.Boolean, default=True)
+    is_enabled = db.Column(db.Boolean, default=True, index=True)
     created_at = db.Column(db.DateTime(timezone=True), server_default=func.now())
     last_updated = db.Column(db.DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
-    items = db.relationship("Item", backref="wishlist", passive_deletes=True)
+    # incremented whenever the wishlist or any of its items change
+    version = db.Column(db.Integer, nullable=False, default=1, server_default="1")
+    # kept up to date by every change of the items, see add_items()
+    item_count = db.Column(db.Integer, nullable=False, default=0, server_default="0")
+    total_price = db.Column(db.Float, nullable=False, default=0.0, server_default="0")
+    # items are removed by the ON DELETE CASCADE of item.wishlist_id,
+    # so deleting a wishlist never loads or deletes its items one by one
+    items = db.relationship("Item", backref="wishlist", cascade="all, delete-orphan", passive_deletes=True)
+
+    # the columns create_many() takes from the Wishlists
+    INSERT_COLUMNS = ("id", "user_id", "name", "is_enabled", "created_at", "last_updated")
 
     def __repr__(self):
         return f"<Wishlist {self.name} id=[{self.id}]>"
 
+    @classmethod
+    def eager(cls, query):
+        """Loads the items of all wishlists in the result with one IN query"""
+        return query.options(selectinload(cls.items))
+
+    @classmethod
+    def project(cls, query, fields, items: bool = True):
+        """Restricts a query of wishlists to some of their columns
+
+        Args:
+            query (Query): the query of wishlists, e.g. from find_by_user_id()
+            fields (tuple): the names of the columns to load, the id is always loaded
+            items (bool): whether the items of the wishlists are needed
+
+        Returns:
+            a query of wishlists that only load these columns, or of rows of
+            just these columns that never load the items when they are not needed
+        """
+        columns = [getattr(cls, name) for name in dict.fromkeys(("id",) + tuple(fields))]
+        if items:
+            return query.options(load_only(*columns))
+        return query.with_entities(*columns)
+
+    @classmethod
+    def bump_version(cls, wishlist_ids, **values):
+        """Returns the UPDATE that marks the given wishlists as changed
+
+        Args:
+            values: other columns to change in the same statement
+        """
+        table = cls.__table__
+        return (
+            table.update()
+            .where(table.c.id.in_(list(wishlist_ids)))
+            .values(version=table.c.version + 1, **values)
+            # the callers expire what they changed in the caches themselves
+            .execution_options(cache_expired=True)
+        )
+
+    @classmethod
+    def add_items(cls, wishlist_id, count: int, price: float, **values):
+        """Returns the UPDATE that adds count items worth price in total to
+        the totals of a wishlist, negative ones to remove them
+
+        Args:
+            values: other columns to change in the same statement
+        """
+        table = cls.__table__
+        return cls.bump_version(
+            [wishlist_id], item_count=table.c.item_count + count, total_price=table.c.total_price + price, **values
+        )
+
+    @classmethod
+    def recount(cls, wishlist_ids):
+        """Returns the UPDATE that recomputes the totals of wishlists from
+        their items, it only changes the wishlists whose totals were wrong"""
+        table, items = cls.__table__, Item.__table__
+        count = select(func.count(items.c.id)).where(items.c.wishlist_id == table.c.id).scalar_subquery()
+        total = select(func.coalesce(func.sum(items.c.price), 0.0)).where(items.c.wishlist_id == table.c.id).scalar_subquery()
+        return cls.bump_version(wishlist_ids, item_count=count, total_price=total).where(
+            or_(table.c.item_count != count, table.c.total_price != total)
+        )
+
+    @classmethod
+    def recompute_totals(cls, batch_size: int, after_id: int = 0) -> tuple:
+        """Recomputes item_count and total_price of the next batch of wishlists
+
+        The wishlists of the batch are locked until it is committed, so the
+        items cannot change while their totals are computed
+
+        Args:
+            batch_size (int): the number of wishlists to check
+            after_id (int): the id of the last wishlist of the previous batch
+
+        Returns:
+            the id of the last wishlist checked (None when there were none left)
+            and the number of wishlists whose totals were fixed
+        """
+        logger.info("Processing totals of %s wishlists after id %s ...", batch_size, after_id)
+        query = db.session.query(cls.id).filter(cls.id > after_id).order_by(cls.id).limit(batch_size)
+        wishlist_ids = [row.id for row in query.with_for_update()]
+        if not wishlist_ids:
+            db.session.commit()
+            return None, 0
+        fixed = db.session.execute(cls.recount(wishlist_ids)).rowcount
+        if fixed:
+            expire_wishlists(db.session, db.session.connection(), wishlist_ids)
+        db.session.commit()
+        return wishlist_ids[-1], fixed
+
+    @staticmethod
+    def payload_key(wishlist_id) -> str:
+        """Returns the payload cache key of a serialized wishlist"""
+        return f"wishlists/{wishlist_id}"
+
+    @staticmethod
+    def user_payload_key(user_id) -> str:
+        """Returns the payload cache key of the first page of wishlists of a user"""
+        return f"users/{user_id}/wishlists"
+
+    @staticmethod
+    def make_etag(wishlist_id, last_updated, version, *parts) -> str:
+        """Returns a strong entity tag for a version of a wishlist
+
+        Args:
+            parts: anything else the tagged representation depends on
+        """
+        key = ":".join(str(value) for value in (wishlist_id, last_updated, version) + parts)
+        return hashlib.sha1(key.encode("utf-8")).hexdigest()
+
+    def etag(self, *parts) -> str:
+        """Returns the entity tag of this wishlist"""
+        return self.make_etag(self.id, self.last_updated, self.version, *parts)
+
+    @classmethod
+    def find_etag(cls, by_id, *parts):
+        """Returns the entity tag of a wishlist without loading it or its items
+
+        Returns:
+            the entity tag, or None if there is no wishlist with that id
+        """
+        logger.info("Processing etag lookup for id %s ...", by_id)
+        row = db.session.query(cls.id, cls.last_updated, cls.version).filter(cls.id == by_id).first()
+        return cls.make_etag(*row, *parts) if row else None
+
+    @classmethod
+    def find_item_etag(cls, by_id, item_id):
+        """Returns the entity tag of an item of a wishlist without loading either
+
+        Returns:
+            the entity tag, or None if the wishlist has no item with that id
+        """
+        logger.info("Processing etag lookup for item %s of id %s ...", item_id, by_id)
+        row = (
+            db.session.query(cls.id, cls.last_updated, cls.version)
+            .join(Item, Item.wishlist_id == cls.id)
+            .filter(cls.id == by_id, Item.id == item_id)
+            .first()
+        )
+        return cls.make_etag(*row, "item", item_id) if row else None
+
+    def clear(self):
+        """Removes all of the Items of a Wishlist with a single DELETE"""
+        logger.info("Clearing %s", self.name)
+        db.session.execute(delete(Item).where(Item.wishlist_id == self.id).execution_options(cache_expired=True))
+        db.session.execute(Wishlist.bump_version([self.id], item_count=0, total_price=0.0))
+        expire_cached_items(db.session, [self.id])
+        expire_wishlists(db.session, db.session.connection(), [self.id])
+        db.session.commit()
+        # the wishlist is known to be empty, so skip reloading its items
+        set_committed_value(self, "items", [])
+
+    @classmethod
+    def create_many(cls, wishlists: list):
+        """
+        Creates many Wishlists and their Items with multi-row INSERTs in a single transaction
+
+        The columns left empty get their defaults, the totals are computed
+        from the Items and inserted with the Wishlists
+        Args:
+            wishlists (list): the deserialized Wishlists to insert
+        """
+        logger.info("Creating %d wishlists", len(wishlists))
+        # the rows of one INSERT must all have the same columns
+        inserts = {}
+        for wishlist in wishlists:
+            row = {column: getattr(wishlist, column) for column in cls.INSERT_COLUMNS}
+            row = {column: value for column, value in row.items() if value is not None}
+            row["item_count"] = len(wishlist.items)
+            row["total_price"] = sum((item.price or 0.0 for item in wishlist.items), 0.0)
+            inserts.setdefault(tuple(row), []).append(row)
+        try:
+            for rows in inserts.values():
+                db.session.execute(cls.__table__.insert(), rows)
+            Item.insert_many([item for wishlist in wishlists for item in wishlist.items], counted=True)
+            expire_payloads(db.session, [cls.user_payload_key(wishlist.user_id) for wishlist in wishlists])
+            db.session.commit()
+        except (DataError, IntegrityError) as error:
+            db.session.rollback()
+            raise DataValidationError("Invalid Wishlists: " + str(error.orig)) from error
+
     def serialize(self):
         """Serializes a Wishlist into a dictionary"""
         wishlist = {
@@ -211,6 +742,8 @@ class Wishlist(db.Model, PersistentBase):
             "user_id": self.user_id,
             "name": self.name,
             "is_enabled": self.is_enabled,
+            "item_count": self.item_count,
+            "total_price": self.total_price,
             "created_at": str(self.created_at).replace(' ', 'T'),
             "last_updated": str(self.last_updated).replace(' ', 'T'),
             "items": [],
@@ -233,6 +766,7 @@ class Wishlist(db.Model, PersistentBase):
 
             if (not (self.name and self.user_id)) or (self.is_enabled is None):
                 raise DataValidationError("Invalid Wishlist")
+            self.check_columns("id", "user_id", "name", "is_enabled")
 
             # handle inner list of items
             items_list = data.get("items")
@@ -250,6 +784,186 @@ class Wishlist(db.Model, PersistentBase):
             ) from error
         return self
 
+
+@event.listens_for(Wishlist, "before_update")
+def bump_wishlist_version(mapper, connection, target):  # pylint: disable=unused-argument
+    """Increments the version of a wishlist whose columns changed"""
+    if object_session(target).is_modified(target, include_collections=False):
+        target.version = Wishlist.version + 1
+
+
+def committed_value(target, key):
+    """Returns the value of an attribute as it is in the database"""
+    history = inspect(target).attrs[key].history
+    return history.deleted[0] if history.deleted else getattr(target, key)
+
+
+@event.listens_for(Item, "after_insert")
+def add_item_to_wishlist(mapper, connection, target):  # pylint: disable=unused-argument
+    """Counts a new item in the totals and the version of its wishlist"""
+    connection.execute(Wishlist.add_items(target.wishlist_id, 1, target.price or 0.0))
+    expire_wishlists(object_session(target), connection, [target.wishlist_id])
+
+
+@event.listens_for(Item, "before_delete")
+def remove_item_from_wishlist(mapper, connection, target):  # pylint: disable=unused-argument
+    """Takes a deleted item out of the totals and the version of its wishlist"""
+    wishlist_id = committed_value(target, "wishlist_id")
+    connection.execute(Wishlist.add_items(wishlist_id, -1, -(committed_value(target, "price") or 0.0)))
+    expire_wishlists(object_session(target), connection, [wishlist_id])
+
+
+@event.listens_for(Item, "after_update")
+def bump_updated_item_wishlist_version(mapper, connection, target):  # pylint: disable=unused-argument
+    """Updates the totals and the versions of the wishlists of a changed item"""
+    if not object_session(target).is_modified(target):
+        return
+    old_wishlist_id, old_price = committed_value(target, "wishlist_id"), committed_value(target, "price") or 0.0
+    price = target.price or 0.0
+    if old_wishlist_id == target.wishlist_id:
+        connection.execute(Wishlist.add_items(target.wishlist_id, 0, price - old_price))
+    else:
+        # the item moved to another wishlist
+        connection.execute(Wishlist.add_items(old_wishlist_id, -1, -old_price))
+        connection.execute(Wishlist.add_items(target.wishlist_id, 1, price))
+    expire_wishlists(object_session(target), connection, {old_wishlist_id, target.wishlist_id})
+
+
+@event.listens_for(Item.__table__, "after_create")
+def create_search_index(target, connection, **kw):  # pylint: disable=unused-argument
+    """Creates the full-text index of the items with their table"""
+    search.execute_schema(connection, search.ITEM_SCHEMA)
+
+
+@event.listens_for(Item.__table__, "before_drop")
+def drop_search_index(target, connection, **kw):  # pylint: disable=unused-argument
+    """Drops the full-text index of the items with their table"""
+    search.execute_schema(connection, search.ITEM_DROP)
+
+
+@event.listens_for(Wishlist.__table__, "after_create")
+def create_name_indexes(target, connection, **kw):  # pylint: disable=unused-argument
+    """Creates the indexes of the name searches with the wishlist table"""
+    search.execute_schema(connection, search.NAME_SCHEMA)
+
+
+######################################################################
+#  C A C H E   I N V A L I D A T I O N
+######################################################################
+def cache_key(cls, by_id):
+    """Returns the find cache key of an entity, None for ids that are not integers"""
+    try:
+        return (cls.__tablename__, int(by_id))
+    except (TypeError, ValueError):
+        return None
+
+
+def expire_cached(session, cls, ids):
+    """Drops cached entities now and again when the transaction commits,
+    so that other requests cannot cache them again from before the commit"""
+    keys = {cache_key(cls, by_id) for by_id in ids} - {None}
+    for key in keys:
+        find_cache.delete(key)
+    session.info.setdefault(STALE_KEYS, set()).update(keys)
+
+
+def drop_cached_items(wishlist_ids):
+    """Removes the cached items of the given wishlists from the find cache"""
+    find_cache.delete_where(
+        lambda key, values: key[0] == Item.__tablename__ and values["wishlist_id"] in wishlist_ids
+    )
+
+
+def expire_cached_items(session, wishlist_ids):
+    """Drops the cached items of wishlists now and again when the transaction
+    ends, for deletes the database cascades without any ORM events"""
+    wishlist_ids = {int(wishlist_id) for wishlist_id in wishlist_ids}
+    drop_cached_items(wishlist_ids)
+    session.info.setdefault(STALE_ITEM_WISHLISTS, set()).update(wishlist_ids)
+
+
+@event.listens_for(PersistentBase, "after_update", propagate=True)
+@event.listens_for(PersistentBase, "after_delete", propagate=True)
+def expire_changed_entity(mapper, connection, target):  # pylint: disable=unused-argument
+    """Drops the cached copy of a changed or deleted entity"""
+    expire_cached(object_session(target), type(target), [target.id])
+
+
+def expire_payloads(session, keys):
+    """Drops cached payloads now and again when the transaction commits"""
+    keys = set(keys)
+    payload_cache.delete(*keys)
+    session.info.setdefault(STALE_PAYLOADS, set()).update(keys)
+
+
+def wishlist_owners(session, connection, wishlist_ids) -> set:
+    """Returns the user ids of wishlists, looking up the ones not in the session"""
+    owners, missing = set(), []
+    mapper = inspect(Wishlist)
+    for wishlist_id in wishlist_ids:
+        wishlist = session.identity_map.get(mapper.identity_key_from_primary_key((int(wishlist_id),)))
+        user_id = inspect(wishlist).dict.get("user_id") if wishlist is not None else None
+        if user_id is None:
+            missing.append(wishlist_id)
+        else:
+            owners.add(user_id)
+    if missing:
+        owners.update(connection.execute(select(Wishlist.user_id).where(Wishlist.id.in_(missing))).scalars())
+    return owners
+
+
+def expire_wishlists(session, connection, wishlist_ids):
+    """Drops everything cached about wishlists whose items changed"""
+    expire_cached(session, Wishlist, wishlist_ids)
+    expire_payloads(
+        session,
+        [Wishlist.payload_key(wishlist_id) for wishlist_id in wishlist_ids]
+        + [Wishlist.user_payload_key(user_id) for user_id in wishlist_owners(session, connection, wishlist_ids)],
+    )
+
+
+@event.listens_for(Wishlist, "after_insert")
+@event.listens_for(Wishlist, "after_update")
+@event.listens_for(Wishlist, "after_delete")
+def expire_changed_wishlist(mapper, connection, target):  # pylint: disable=unused-argument
+    """Drops the cached payloads of a wishlist and of the lists of its old and new owner"""
+    user_ids = {target.user_id, *inspect(target).attrs.user_id.history.deleted}
+    expire_payloads(
+        object_session(target),
+        [Wishlist.payload_key(target.id)] + [Wishlist.user_payload_key(user_id) for user_id in user_ids],
+    )
+
+
+@event.listens_for(Wishlist, "after_delete")
+def expire_deleted_wishlist_items(mapper, connection, target):  # pylint: disable=unused-argument
+    """Drops the cached items of a deleted wishlist, which the database deletes with it"""
+    expire_cached_items(object_session(target), [target.id])
+
+
+@event.listens_for(RoutingSession, "after_commit")
+@event.listens_for(RoutingSession, "after_rollback")
+def expire_stale_entities(session):
+    """Drops the entities changed by the transaction once it ended"""
+    for key in session.info.pop(STALE_KEYS, ()):
+        find_cache.delete(key)
+    stale_item_wishlists = session.info.pop(STALE_ITEM_WISHLISTS, None)
+    if stale_item_wishlists:
+        drop_cached_items(stale_item_wishlists)
+    stale_payloads = session.info.pop(STALE_PAYLOADS, ())
+    if stale_payloads:
+        payload_cache.delete(*stale_payloads)
+
+
+@event.listens_for(RoutingSession, "do_orm_execute")
+def expire_bulk_changes(orm_execute_state):
+    """Bulk UPDATE and DELETE statements may change any entity, unless the
+    caller expired the entities and payloads it changed itself (cache_expired=True)"""
+    if orm_execute_state.is_update or orm_execute_state.is_delete:
+        if not orm_execute_state.execution_options.get("cache_expired"):
+            find_cache.clear()
+            payload_cache.clear()
+
+
 # ######################################################################
 # #  U S E R   M O D E L
 # ######################################################################
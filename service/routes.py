@@ -5,20 +5,76 @@ Wishlist Service
 This microservice handles the collection of products of a user wants
 """
 import logging
-from flask import jsonify, request, abort
+from flask import Response, jsonify, request, abort, stream_with_context
 from flask_restx import Resource, fields, reqparse
+from werkzeug.http import quote_etag
 from service.common import status  # HTTP Status Codes
-from service.models import Wishlist, Item
+from service.models import db, Wishlist, Item, DataValidationError, find_cache, payload_cache
+from service.common import metrics, search
+from service import serializers
+from service.common.db_pool import pool_status
+from service.common.replicas import current_replica, read_only, remember_write, replica_binds, replica_reads
+from service.common.pagination import (
+    encode_cursor, decode_id_cursor, decode_key_cursor, decode_score_cursor, page_size, next_link
+)
 
 # Import Flask application
 from . import app, api
 
 logger = logging.getLogger("flask.app")
 
+# keep clients that wrote on the primary for a while to read their writes
+app.after_request(remember_write)
+
+# count and time every request for /metrics
+app.before_request(metrics.start_timer)
+app.after_request(metrics.record_request)
+
+NDJSON = "application/x-ndjson"
+
 # query string arguments
-wishlist_args = reqparse.RequestParser()
+projection_args = reqparse.RequestParser()
+projection_args.add_argument(
+    'fields', type=str, required=False, location='args', help='Comma separated Wishlist fields to return, e.g. id,name'
+)
+projection_args.add_argument('include', type=str, required=False, location='args', help='Set to items to return the Items')
+
+wishlist_args = projection_args.copy()
 wishlist_args.add_argument('name', type=str, required=False, location='args', help='Find the Product by name')
+wishlist_args.add_argument(
+    'match', type=str, required=False, location='args', choices=search.NAME_MODES,
+    help='How name matches: contains (default) or prefix, both ignore case'
+)
 wishlist_args.add_argument('user_id', type=str, required=False, location='args', help='List Products by user id')
+wishlist_args.add_argument('limit', type=int, required=False, location='args', help='Maximum number of Wishlists per page')
+wishlist_args.add_argument('cursor', type=str, required=False, location='args', help='Cursor of the page to return')
+
+search_args = reqparse.RequestParser()
+search_args.add_argument('q', type=str, required=True, location='args', help='The words to search for')
+search_args.add_argument('wishlist_id', type=int, required=False, location='args', help='Only search this Wishlist')
+search_args.add_argument('user_id', type=int, required=False, location='args', help='Only search the Wishlists of this user')
+search_args.add_argument('limit', type=int, required=False, location='args', help='Maximum number of Items per page')
+search_args.add_argument('cursor', type=str, required=False, location='args', help='Cursor of the page to return')
+
+wishlist_item_args = reqparse.RequestParser()
+wishlist_item_args.add_argument('sort', type=str, required=False, location='args', choices=tuple(Item.SORT_KEYS),
+                                help='Column to sort the Items by')
+wishlist_item_args.add_argument('order', type=str, required=False, location='args', choices=('asc', 'desc'),
+                                help='Direction of the sort')
+wishlist_item_args.add_argument('category', type=str, required=False, location='args', help='Only Items of this category')
+wishlist_item_args.add_argument('min_price', type=float, required=False, location='args', help='Lowest price of the Items')
+wishlist_item_args.add_argument('max_price', type=float, required=False, location='args', help='Highest price of the Items')
+wishlist_item_args.add_argument('limit', type=int, required=False, location='args', help='Maximum number of Items per page')
+wishlist_item_args.add_argument('cursor', type=str, required=False, location='args', help='Cursor of the page to return')
+
+item_args = reqparse.RequestParser()
+item_args.add_argument('category', type=str, required=False, location='args', help='Only Items of this category')
+item_args.add_argument('min_price', type=float, required=False, location='args', help='Lowest price of the Items')
+item_args.add_argument('max_price', type=float, required=False, location='args', help='Highest price of the Items')
+item_args.add_argument('wishlist_id', type=int, required=False, location='args', help='Only Items of this Wishlist')
+item_args.add_argument('user_id', type=int, required=False, location='args', help='Only Items of the Wishlists of this user')
+item_args.add_argument('limit', type=int, required=False, location='args', help='Maximum number of Items per page')
+item_args.add_argument('cursor', type=str, required=False, location='args', help='Cursor of the page to return')
 
 
 ############################################################
@@ -30,6 +86,27 @@ def health():
     return jsonify(dict(status="OK")), status.HTTP_200_OK
 
 
+@app.route("/metrics")
+def metrics_endpoint():
+    """Request and database metrics of all workers in the Prometheus text format"""
+    return Response(metrics.exposition(), status.HTTP_200_OK, content_type=metrics.CONTENT_TYPE)
+
+
+@app.route("/health/pool")
+def pool_health():
+    """Connection pool saturation and counters of this worker"""
+    pools = {"primary": pool_status(db.engine)}
+    for bind_key in replica_binds(app.config):
+        pools[bind_key] = pool_status(db.get_engine(app, bind=bind_key))
+    return jsonify(pools), status.HTTP_200_OK
+
+
+@app.route("/health/cache")
+def cache_health():
+    """Hit ratio and size of the find() and payload caches of this worker"""
+    return jsonify(find=find_cache.stats(), payload=payload_cache.stats()), status.HTTP_200_OK
+
+
 ############################################################
 # Test Endpoint
 ############################################################
@@ -64,6 +141,25 @@ item_model = api.inherit(
     }
 )
 
+item_search_model = api.inherit(
+    'ItemSearchResult',
+    item_model,
+    {
+        'score': fields.Float(readOnly=True, description='How well the Item matches, higher is better'),
+    }
+)
+
+item_batch_model = api.model('ItemBatchResult', {
+    'items': fields.List(fields.Nested(api.model('ItemBatchCreated', {
+        'index': fields.Integer(description='The position of the item in the posted array'),
+        'id': fields.Integer(description='The id of the created item'),
+    }))),
+    'errors': fields.List(fields.Nested(api.model('ItemBatchError', {
+        'index': fields.Integer(description='The position of the item in the posted array'),
+        'message': fields.String(description='Why the item was rejected'),
+    }))),
+})
+
 create_model = api.model('Wishlist', {
     'name': fields.String(required=True, description='The name of the Wishlist'),
     'created_at': fields.DateTime(required=True, description='Creation time of the wishlist'),
@@ -78,6 +174,8 @@ wishlist_model = api.inherit(
     create_model,
     {
         'id': fields.Integer(readOnly=True, description='The unique id assigned internally by service'),
+        'item_count': fields.Integer(readOnly=True, description='The number of items in the wishlist'),
+        'total_price': fields.Float(readOnly=True, description='The sum of the prices of the items'),
     }
 )
 
@@ -98,24 +196,57 @@ class WishlistResource(Resource):
     # RETRIEVE A WISHLIST
     # ------------------------------------------------------------------
     @api.doc('get_wishlist')
+    @api.response(200, 'Success', wishlist_model)
+    @api.response(304, 'Wishlist not modified since the ETag in If-None-Match')
     @api.response(404, 'Wishlist not found')
-    @api.marshal_with(wishlist_model)
+    @api.expect(projection_args, validate=True)
+    @read_only
     def get(self, wishlist_id):
         """
         Retrieve a single Wishlist
-        This endpoint will return a Wishlist based on it's id
+        This endpoint will return a Wishlist based on it's id. With fields it only returns
+        those fields, but it still reads the whole wishlist row, from the find cache when
+        it can; only the items are not loaded unless they are asked for.
         """
         app.logger.info("Request for Wishlist with id: %s", wishlist_id)
-
-        # See if the wishlist exists and abort if it doesn't
-        wishlist = Wishlist.find(wishlist_id)
+        projection = request_projection(projection_args.parse_args())
+
+        # Answer from the payload cache shared by the workers when possible,
+        # it only holds the full representation
+        key = payload_key(Wishlist.payload_key, wishlist_id) if projection == serializers.FULL else None
+        cached = payload_cache.get(key) if key else None
+        if cached:
+            etag, body = cached
+            if is_fresh(etag):
+                return not_modified(etag)
+            return json_response(body, etag_header(etag))
+
+        # Answer conditional requests without loading the wishlist
+        if request.if_none_match:
+            etag = Wishlist.find_etag(wishlist_id, *projection.etag_parts)
+            if is_fresh(etag):
+                return not_modified(etag)
+
+        # Only a fresh row from the primary may fill the shared payload cache:
+        # the find cache of this worker and a lagging replica can both be
+        # behind the writes of other workers
+        fill = key is not None and current_replica() is None
+        # See if the wishlist exists and abort if it doesn't, its items
+        # are only loaded when the projection includes them
+        wishlist = Wishlist.find(wishlist_id) if fill else Wishlist.find_cached(wishlist_id)
         if not wishlist:
             abort(
                 status.HTTP_404_NOT_FOUND,
                 f"Wishlist with id '{wishlist_id}' could not be found.",
             )
 
-        return wishlist.serialize(), status.HTTP_200_OK
+        etag = wishlist.etag(*projection.etag_parts)
+        body = serializers.dump_wishlist(wishlist, projection)
+        # a write that committed since the wishlist was read has already
+        # expired the key, so caching the old body now would outlive it
+        if fill and Wishlist.find_etag(wishlist_id, *projection.etag_parts) == etag:
+            payload_cache.set(key, etag, body)
+        return json_response(body, etag_header(etag))
 
     # ------------------------------------------------------------------
     # UPDATE AN EXISTING WISHLIST
@@ -124,7 +255,7 @@ class WishlistResource(Resource):
     @api.response(400, 'The posted Wishlist data was not valid')
     @api.response(404, 'Wishlist not found')
     @api.expect(wishlist_model)
-    @api.marshal_with(wishlist_model)
+    @api.response(200, 'Success', wishlist_model)
     def put(self, wishlist_id):
         """
         Update a Wishlist
@@ -147,7 +278,7 @@ class WishlistResource(Resource):
         wishlist.deserialize(request.get_json())
         wishlist.id = wishlist_id
         wishlist.update()
-        return wishlist.serialize(), status.HTTP_200_OK
+        return json_response(serializers.dump_wishlist(wishlist))
 
     # ------------------------------------------------------------------
     # DELETE AN WISHLIST
@@ -162,11 +293,10 @@ class WishlistResource(Resource):
         """
         app.logger.info("Request to delete wishlist with id: %s", wishlist_id)
 
-        # Retrieve the wishlist to delete and delete it if it exists
+        # Retrieve the wishlist to delete and delete it if it exists,
+        # the database cascades the delete to its items in the same statement
         wishlist = Wishlist.find(wishlist_id)
         if wishlist:
-            for item in wishlist.items:
-                item.delete()
             wishlist.delete()
 
         return '', status.HTTP_204_NO_CONTENT
@@ -183,9 +313,15 @@ class WishlistCollection(Resource):
     # ------------------------------------------------------------------
     @api.doc('list_wishlists')
     @api.expect(wishlist_args, validate=True)
-    @api.marshal_list_with(wishlist_model)
+    @api.produces(["application/json", NDJSON])
+    @api.response(200, 'Success', [wishlist_model])
+    @read_only
     def get(self):
-        """ Returns all of the Wishlists """
+        """
+        Returns all of the Wishlists
+        Send Accept: application/x-ndjson to stream every matching Wishlist
+        as one JSON document per line instead of returning a single page
+        """
         app.logger.info('Request to list Wishlists...')
 
         wishlists = []
@@ -196,17 +332,42 @@ class WishlistCollection(Resource):
         # name = request.args.get("name")
         app.logger.info("Request for all Wishlists")
 
+        projection = request_projection(args)
+        limit = page_size(args['limit'], app.config['DEFAULT_PAGE_SIZE'], app.config['MAX_PAGE_SIZE'])
+        after_id = decode_id_cursor(args['cursor']) if args['cursor'] else None
+
         if user_id:
-            wishlists = Wishlist.find_by_user_id(user_id)
+            query = Wishlist.find_by_user_id(user_id)
         elif name:
-            wishlists = Wishlist.find_by_name(name)
+            query = Wishlist.find_by_name(name, args['match'] or search.NAME_MODES[0])
         else:
-            wishlists = Wishlist.all()
-
-        result = [wishlist.serialize() for wishlist in wishlists]
-        result = sorted(result, key=lambda wishlist: wishlist['id'])
-        app.logger.info(f"Returning {result}")
-        return result, status.HTTP_200_OK
+            query = Wishlist.eager(Wishlist.query)
+        if projection != serializers.FULL:
+            query = Wishlist.project(query, projection.fields, projection.items)
+
+        if request.accept_mimetypes.best_match(["application/json", NDJSON]) == NDJSON:
+            return stream_wishlists(query, after_id, projection)
+
+        # The first page of the wishlists of a user is cached as a whole
+        key = None
+        if user_id and not args['cursor'] and not args['limit'] and projection == serializers.FULL:
+            key = payload_key(Wishlist.user_payload_key, user_id)
+        cached = payload_cache.get(key) if key else None
+        if cached:
+            cursor, body = cached
+        else:
+            wishlists, has_more = Wishlist.paginate(query, limit, after_id)
+            app.logger.info("Returning %d Wishlists", len(wishlists))
+            cursor = encode_cursor(wishlists[-1].id) if has_more else ""
+            body = serializers.dump_wishlists(wishlists, projection)
+            if key and current_replica() is None:
+                payload_cache.set(key, cursor, body)
+
+        headers = {}
+        if cursor:
+            headers['X-Next-Cursor'] = cursor
+            headers['Link'] = next_link(request.base_url, request.args, cursor)
+        return json_response(body, headers)
 
     # ------------------------------------------------------------------
     # ADD A NEW WISHLIST
@@ -214,7 +375,7 @@ class WishlistCollection(Resource):
     @api.doc('create_wishlists')
     @api.response(400, 'The posted data was not valid')
     @api.expect(create_model)
-    @api.marshal_with(wishlist_model, code=201)
+    @api.response(201, 'Wishlist created', wishlist_model)
     def post(self):
         """
         Creates a Wishlist
@@ -232,10 +393,10 @@ class WishlistCollection(Resource):
         wishlist.create()
 
         # Create a message to return
-        message = wishlist.serialize()
+        message = serializers.dump_wishlist(wishlist)
         location_url = api.url_for(WishlistResource, wishlist_id=wishlist.id, _external=True)
-        app.logger.info(f"Created Wishlist: {message}")
-        return wishlist.serialize(), status.HTTP_201_CREATED, {'Location': location_url}
+        app.logger.info("Created Wishlist: %s", message.decode("utf-8"))
+        return json_response(message, {'Location': location_url}, status.HTTP_201_CREATED)
 
 
 ######################################################################
@@ -249,19 +410,42 @@ class ItemCollection(Resource):
     # LIST ALL ITEMS
     # ------------------------------------------------------------------
     @api.doc('list_items')
-    @api.marshal_list_with(item_model)
+    @api.expect(wishlist_item_args, validate=True)
+    @api.response(200, 'Success', [item_model])
+    @api.response(304, 'Items not modified since the ETag in If-None-Match')
+    @api.response(400, 'The query was not valid')
+    @read_only
     def get(self, wishlist_id):
         """
         List all items
-        This endpoint will list all items in the wishlist
+        This endpoint will list the items in the wishlist that match every
+        filter given, sorted by id, name or price, one page at a time
         """
         app.logger.info("Request for all Items for Wishlist with id: %s", wishlist_id)
-        wishlist = Wishlist.find(wishlist_id)
+        args = wishlist_item_args.parse_args()
+        # every page of every query of the items has its own representation
+        parts = ("items", *(f"{key}={value}" for key, value in sorted(request.args.items())))
+        if request.if_none_match:
+            etag = Wishlist.find_etag(wishlist_id, *parts)
+            if is_fresh(etag):
+                return not_modified(etag)
+
+        sort = args['sort'] or "id"
+        limit = page_size(args['limit'], app.config['DEFAULT_PAGE_SIZE'], app.config['MAX_PAGE_SIZE'])
+        after = decode_key_cursor(args['cursor']) if args['cursor'] else None
+
+        wishlist = Wishlist.find_cached(wishlist_id)
         if not wishlist:
             abort(status.HTTP_404_NOT_FOUND, f"Wishlist with id '{wishlist_id}' was not found.")
 
-        results = [item.serialize() for item in wishlist.items]
-        return results, status.HTTP_200_OK
+        query = Item.find_by_filters(args['category'], args['min_price'], args['max_price'], wishlist_id=wishlist.id)
+        items, has_more = Item.sorted_page(query, sort, limit, after, args['order'] == 'desc')
+        app.logger.info("Returning %d Items", len(items))
+        headers = etag_header(wishlist.etag(*parts))
+        if has_more:
+            headers['X-Next-Cursor'] = encode_cursor(getattr(items[-1], sort), items[-1].id)
+            headers['Link'] = next_link(request.base_url, request.args, headers['X-Next-Cursor'])
+        return json_response(serializers.dump_items(items), headers)
 
     # ------------------------------------------------------------------
     # ADD A NEW ITEM
@@ -269,7 +453,7 @@ class ItemCollection(Resource):
     @api.doc('create_items')
     @api.response(400, 'The posted data was not valid')
     @api.expect(create_item_model)
-    @api.marshal_with(item_model, code=201)
+    @api.response(201, 'Item created', item_model)
     def post(self, wishlist_id):
         """
         Adds an item to a wishlist
@@ -300,7 +484,53 @@ class ItemCollection(Resource):
         location_url = api.url_for(ItemResource, item_id=item.id, wishlist_id=wishlist.id, _external=True)
         app.logger.info("Item for wishlist ID [%s] created.", id)
 
-        return item.serialize(), status.HTTP_201_CREATED, {'Location': location_url}
+        return json_response(serializers.dump_item(item), {'Location': location_url}, status.HTTP_201_CREATED)
+
+
+######################################################################
+#  PATH: /wishlists/<wishlist_id>/items:batch
+######################################################################
+@api.route('/wishlists/<wishlist_id>/items:batch')
+@api.param('wishlist_id', 'The Wishlist identifier')
+class ItemBatchCollection(Resource):
+    """ Handles bulk interactions with collections of Items"""
+    # ------------------------------------------------------------------
+    # ADD MANY NEW ITEMS
+    # ------------------------------------------------------------------
+    @api.doc('create_items_batch')
+    @api.response(400, 'None of the posted items were valid')
+    @api.response(404, 'Wishlist not found')
+    @api.expect([create_item_model])
+    @api.marshal_with(item_batch_model, code=201)
+    def post(self, wishlist_id):
+        """
+        Adds many items to a wishlist
+        This endpoint will add every valid Item of the posted array in one
+        transaction and report the id or the error of each Item
+        """
+        app.logger.info(
+            "Request to add a batch of Items for Wishlist with id: %s", wishlist_id)
+        check_content_type("application/json")
+
+        wishlist = Wishlist.find(wishlist_id)
+        if not wishlist:
+            abort(
+                status.HTTP_404_NOT_FOUND,
+                f"Wishlist with id '{wishlist_id}' could not be found.",
+            )
+
+        data = request.get_json()
+        if not isinstance(data, list):
+            abort(status.HTTP_400_BAD_REQUEST, "Request body must be an array of Items")
+
+        items, errors = validate_items(data, wishlist.id)
+        if not items:
+            return {'items': [], 'errors': errors}, status.HTTP_400_BAD_REQUEST
+
+        Item.create_many([item for _, item in items])
+        created = [{'index': position, 'id': item.id} for position, item in items]
+        app.logger.info("Added %d Items to Wishlist [%s].", len(created), wishlist.id)
+        return {'items': created, 'errors': errors}, status.HTTP_201_CREATED
 
 
 ######################################################################
@@ -318,8 +548,10 @@ class ItemResource(Resource):
     # RETRIEVE A ITEM
     # ------------------------------------------------------------------
     @api.doc('get_item')
+    @api.response(200, 'Success', item_model)
+    @api.response(304, 'Item not modified since the ETag in If-None-Match')
     @api.response(404, 'Item not found')
-    @api.marshal_with(item_model)
+    @read_only
     def get(self, wishlist_id, item_id):
         """
         Get an Item
@@ -327,16 +559,22 @@ class ItemResource(Resource):
         This endpoint returns just an Item
         """
         app.logger.info("Request for item with id [%s]", item_id)
-        wishlist = Wishlist.find(wishlist_id)
+        # items are versioned together with their wishlist
+        if request.if_none_match:
+            etag = Wishlist.find_item_etag(wishlist_id, item_id)
+            if is_fresh(etag):
+                return not_modified(etag)
+
+        wishlist = Wishlist.find_cached(wishlist_id)
         if not wishlist:
             abort(status.HTTP_404_NOT_FOUND, f"Wishlist with id '{wishlist_id}' was not found.")
         app.logger.info(item_id)
-        item = Item.find(item_id)
-        if not item:
+        item = Item.find_cached(item_id)
+        if not item or item.wishlist_id != wishlist.id:
             abort(status.HTTP_404_NOT_FOUND, f"Item with id '{item_id}' was not found.")
 
         app.logger.info("Get item details successful")
-        return item.serialize(), status.HTTP_200_OK
+        return json_response(serializers.dump_item(item), etag_header(wishlist.etag("item", item_id)))
 
     # ------------------------------------------------------------------
     # UPDATE AN EXISTING ITEM
@@ -345,7 +583,7 @@ class ItemResource(Resource):
     @api.response(404, 'Item not found')
     @api.response(400, 'The posted Item data was not valid')
     @api.expect(item_model)
-    @api.marshal_with(item_model)
+    @api.response(200, 'Success', item_model)
     def put(self, wishlist_id, item_id):
         """
         Update an Item
@@ -368,7 +606,7 @@ class ItemResource(Resource):
 
         # See if the item exists and abort if it doesn't
         item = Item.find(item_id)
-        if not item:
+        if not item or item.wishlist_id != wishlist.id:
             abort(
                 status.HTTP_404_NOT_FOUND,
                 f"Wishlist with id '{item_id}' could not be found.",
@@ -378,7 +616,7 @@ class ItemResource(Resource):
         item.deserialize(api.payload)
         item.id = item_id
         item.update()
-        return item.serialize(), status.HTTP_200_OK
+        return json_response(serializers.dump_item(item))
 
     # ------------------------------------------------------------------
     # DELETE AN ITEM
@@ -399,11 +637,84 @@ class ItemResource(Resource):
         if not wishlist:
             abort(status.HTTP_404_NOT_FOUND, f"Wishlist with id '{wishlist_id}' was not found.")
         item = Item.find(item_id)
-        if item:
+        # an item of another wishlist is not found in this one
+        if item and item.wishlist_id == wishlist.id:
             item.delete()
         return "", status.HTTP_204_NO_CONTENT
 
 
+######################################################################
+#  PATH: /items
+######################################################################
+@api.route('/items', strict_slashes=False)
+class ItemQuery(Resource):
+    """ Handles the queries of Items across Wishlists """
+    # ------------------------------------------------------------------
+    # QUERY ITEMS
+    # ------------------------------------------------------------------
+    @api.doc('query_items')
+    @api.expect(item_args, validate=True)
+    @api.response(200, 'Success', [item_model])
+    @api.response(400, 'The query was not valid')
+    @read_only
+    def get(self):
+        """
+        Query Items
+        This endpoint returns the Items of all Wishlists that match every
+        filter given, in id order, one page at a time
+        """
+        args = item_args.parse_args()
+        app.logger.info("Request to query Items with: %s", args)
+        limit = page_size(args['limit'], app.config['DEFAULT_PAGE_SIZE'], app.config['MAX_PAGE_SIZE'])
+        after_id = decode_id_cursor(args['cursor']) if args['cursor'] else None
+
+        query = Item.find_by_filters(
+            args['category'], args['min_price'], args['max_price'], args['wishlist_id'], args['user_id']
+        )
+        items, has_more = Item.paginate(query, limit, after_id)
+        app.logger.info("Returning %d Items", len(items))
+        headers = {}
+        if has_more:
+            headers['X-Next-Cursor'] = encode_cursor(items[-1].id)
+            headers['Link'] = next_link(request.base_url, request.args, headers['X-Next-Cursor'])
+        return json_response(serializers.dump_items(items), headers)
+
+
+######################################################################
+#  PATH: /items/search
+######################################################################
+@api.route('/items/search')
+class ItemSearch(Resource):
+    """ Handles the full-text search of Items """
+    # ------------------------------------------------------------------
+    # SEARCH ITEMS
+    # ------------------------------------------------------------------
+    @api.doc('search_items')
+    @api.expect(search_args, validate=True)
+    @api.response(200, 'Success', [item_search_model])
+    @api.response(400, 'The search was not valid')
+    @read_only
+    def get(self):
+        """
+        Search Items
+        This endpoint returns the Items whose name or description contain all
+        of the words of q, best matches first, one page at a time
+        """
+        args = search_args.parse_args()
+        app.logger.info("Request to search Items for: %s", args['q'])
+        limit = page_size(args['limit'], app.config['DEFAULT_PAGE_SIZE'], app.config['MAX_PAGE_SIZE'])
+        after = decode_score_cursor(args['cursor']) if args['cursor'] else None
+
+        rows, has_more = Item.search(args['q'], limit, after, args['wishlist_id'], args['user_id'])
+        app.logger.info("Returning %d Items", len(rows))
+        headers = {}
+        if has_more:
+            item, score = rows[-1]
+            headers['X-Next-Cursor'] = encode_cursor(score, item.id)
+            headers['Link'] = next_link(request.base_url, request.args, headers['X-Next-Cursor'])
+        return json_response(serializers.dump_search_results(rows), headers)
+
+
 ######################################################################
 #  PATH: /wishlists/<wishlist_id>/clear
 ######################################################################
@@ -415,7 +726,7 @@ class WishlistUtilsCollection(Resource):
     # ------------------------------------------------------------------
     @api.doc('clear_wishlist')
     @api.response(404, 'Wishlist not found')
-    @api.marshal_with(wishlist_model)
+    @api.response(200, 'Success', wishlist_model)
     def put(self, wishlist_id):
         """
         Clear a Wishlist
@@ -427,18 +738,94 @@ class WishlistUtilsCollection(Resource):
         if not wishlist:
             abort(status.HTTP_404_NOT_FOUND,
                   f"Wishlist with id '{wishlist_id}' was not found.")
-        wishlist.id = wishlist_id
-        wishlist_data = wishlist.serialize()
-        for item_data in wishlist_data["items"]:
-            Item.find(item_data["id"]).delete()
-        wishlist = Wishlist.find(wishlist_id)
-        return wishlist.serialize(), status.HTTP_200_OK
+        wishlist.clear()
+        return json_response(serializers.dump_wishlist(wishlist))
 
 ######################################################################
 #  U T I L I T Y   F U N C T I O N S
 ######################################################################
 
 
+def stream_wishlists(query, after_id=None, projection=serializers.FULL):
+    """Streams the Wishlists of a query as newline delimited JSON"""
+    # the generator runs after the handler returned, so it reselects the replica
+    bind_key = current_replica()
+
+    def generate():
+        count = 0
+        with replica_reads(bind_key):
+            for wishlist in Wishlist.stream(query, app.config["STREAM_BATCH_SIZE"], after_id):
+                yield serializers.dump_wishlist(wishlist, projection) + b"\n"
+                count += 1
+        app.logger.info("Streamed %d Wishlists", count)
+
+    return Response(stream_with_context(generate()), status.HTTP_200_OK, mimetype=NDJSON)
+
+
+def validate_items(data, wishlist_id):
+    """Deserializes posted Items and collects the errors of invalid ones
+
+    Returns:
+        the (position, Item) pairs that can be inserted and the per-position errors
+    """
+    items, errors = [], []
+    seen = set()
+    for position, json_item in enumerate(data):
+        if isinstance(json_item, dict):
+            json_item = dict(json_item, wishlist_id=wishlist_id)
+        try:
+            item = Item().deserialize(json_item)
+        except DataValidationError as error:
+            errors.append({'index': position, 'message': str(error)})
+            continue
+        if item.id in seen:
+            errors.append({'index': position, 'message': f"Duplicate Item id '{item.id}' in batch"})
+            continue
+        seen.add(item.id)
+        items.append((position, item))
+
+    existing = Item.find_existing_ids(list(seen))
+    for position, item in items:
+        if item.id in existing:
+            errors.append({'index': position, 'message': f"Item with id '{item.id}' already exists"})
+    errors.sort(key=lambda error: error['index'])
+    return [(position, item) for position, item in items if item.id not in existing], errors
+
+
+def request_projection(args):
+    """Returns the Wishlist fields and relationships asked for by a request"""
+    return serializers.parse_projection(args['fields'], args['include'], app.config['WISHLIST_INCLUDE_ITEMS'])
+
+
+def payload_key(make_key, by_id):
+    """Returns the payload cache key of an id, None for ids that are not integers"""
+    try:
+        return make_key(int(by_id))
+    except ValueError:
+        return None
+
+
+def json_response(body, headers=None, code=status.HTTP_200_OK):
+    """Returns a response with an already serialized JSON body"""
+    return Response(body, code, headers=headers, mimetype="application/json")
+
+
+def etag_header(etag):
+    """Returns the response headers that carry an entity tag"""
+    return {"ETag": quote_etag(etag)}
+
+
+def is_fresh(etag):
+    """Returns True if the client already has the representation with this entity tag"""
+    return etag is not None and request.if_none_match.contains(etag)
+
+
+def not_modified(etag):
+    """Returns a 304 Not Modified response for a matching entity tag"""
+    app.logger.info("Not modified: %s", etag)
+    return Response(status=status.HTTP_304_NOT_MODIFIED, headers=etag_header(etag))
+
+
 def check_content_type(media_type):
     """Checks that the media type is correct"""
 
@@ -0,0 +1,114 @@
+"""
+Fast JSON serializers for the Wishlist and Item models
+
+The representations are built in one pass straight from the ORM objects,
+or from column rows with the same attribute names, and encoded with orjson.
+They produce the same documents as marshalling the result of serialize()
+with the Swagger models, which only document the API.
+"""
+from operator import attrgetter
+from typing import NamedTuple
+import orjson
+from service.models import DataValidationError
+
+ITEM_FIELDS = ("id", "wishlist_id", "name", "category", "price", "description")
+WISHLIST_FIELDS = (
+    "id", "name", "created_at", "last_updated", "user_id", "is_enabled", "item_count", "total_price"
+)
+
+item_values = attrgetter(*ITEM_FIELDS)
+wishlist_values = attrgetter(*WISHLIST_FIELDS)
+
+
+class Projection(NamedTuple):
+    """The sparse fieldset of a Wishlist representation"""
+
+    fields: tuple = WISHLIST_FIELDS
+    items: bool = True
+
+    @property
+    def etag_parts(self) -> tuple:
+        """Returns what the entity tag of this representation depends on besides the wishlist"""
+        if self == FULL:
+            return ()
+        return (",".join(self.fields), "items" if self.items else "")
+
+
+FULL = Projection()
+
+
+def parse_projection(fields, include, include_items: bool = True) -> Projection:
+    """Returns the Projection asked for by the fields and include query arguments
+
+    Args:
+        fields (string): comma separated Wishlist fields, "items" included
+        include (string): comma separated relationships, only "items"
+        include_items (bool): whether to include the items when neither is given
+
+    Raises:
+        DataValidationError: for unknown fields or relationships, or fields without any
+    """
+    if fields is None and include is None:
+        return Projection(items=include_items)
+    names = [name.strip() for name in (fields or "").split(",") if name.strip()]
+    if fields is not None and not names:
+        raise DataValidationError("Invalid fields: none given")
+    relations = {name.strip() for name in (include or "").split(",") if name.strip()}
+    unknown = [name for name in names if name not in WISHLIST_FIELDS + ("items",)] + sorted(relations - {"items"})
+    if unknown:
+        raise DataValidationError("Invalid fields: " + ", ".join(unknown))
+    items = "items" in names or "items" in relations
+    if fields is None:
+        return Projection(items=items)
+    # keep the order of the full representation
+    return Projection(tuple(name for name in WISHLIST_FIELDS if name in names), items)
+
+
+def item_dict(item) -> dict:
+    """Returns the representation of an Item"""
+    data = dict(zip(ITEM_FIELDS, item_values(item)))
+    # a price posted as an integer is still a Float field
+    if data["price"] is not None:
+        data["price"] = float(data["price"])
+    return data
+
+
+def wishlist_dict(wishlist, projection: Projection = FULL) -> dict:
+    """Returns the representation of a Wishlist, with its Items unless the projection leaves them out"""
+    if projection.fields is WISHLIST_FIELDS:
+        data = dict(zip(WISHLIST_FIELDS, wishlist_values(wishlist)))
+    else:
+        data = {field: getattr(wishlist, field) for field in projection.fields}
+    if projection.items:
+        data["items"] = [item_dict(item) for item in wishlist.items]
+    return data
+
+
+def dumps(data) -> bytes:
+    """Encodes a representation as JSON, datetimes in ISO 8601 like the Swagger models"""
+    return orjson.dumps(data)
+
+
+def dump_item(item) -> bytes:
+    """Returns the JSON body of an Item"""
+    return orjson.dumps(item_dict(item))
+
+
+def dump_items(items) -> bytes:
+    """Returns the JSON body of a list of Items"""
+    return orjson.dumps([item_dict(item) for item in items])
+
+
+def dump_wishlist(wishlist, projection: Projection = FULL) -> bytes:
+    """Returns the JSON body of a Wishlist"""
+    return orjson.dumps(wishlist_dict(wishlist, projection))
+
+
+def dump_wishlists(wishlists, projection: Projection = FULL) -> bytes:
+    """Returns the JSON body of a list of Wishlists"""
+    return orjson.dumps([wishlist_dict(wishlist, projection) for wishlist in wishlists])
+
+
+def dump_search_results(rows) -> bytes:
+    """Returns the JSON body of (Item, score) search results"""
+    return orjson.dumps([dict(item_dict(item), score=score) for item, score in rows])
@@ -0,0 +1,81 @@
+"""
+Test client for the ASGI entry point
+
+Offers the parts of the Flask test client that the route tests use. It must
+be called from a greenlet started by greenlet_spawn(), like the requests of
+the ASGI app themselves
+"""
+from sqlalchemy.util import await_only
+from werkzeug.test import EnvironBuilder
+
+
+class AsgiTestClient():
+    """Sends requests to an ASGI app and returns Flask responses"""
+
+    def __init__(self, asgi_app, flask_app):
+        self.asgi_app = asgi_app
+        self.flask_app = flask_app
+
+    def open(self, path, method="GET", **kwargs):
+        """Sends a request built like the Flask test client builds it"""
+        return await_only(self.request(path, method, **kwargs))
+
+    async def request(self, path, method="GET", **kwargs):
+        """Sends a request from the event loop, so that many can run at once"""
+        builder = EnvironBuilder(path=path, method=method, **kwargs)
+        try:
+            environ = builder.get_environ()
+        finally:
+            builder.close()
+        request = [{"type": "http.request", "body": environ["wsgi.input"].read()}]
+        messages = []
+
+        async def receive():
+            return request.pop(0) if request else {"type": "http.disconnect"}
+
+        async def send(message):
+            messages.append(message)
+
+        await self.asgi_app(asgi_scope(environ), receive, send)
+        start, body = messages[0], b"".join(message.get("body", b"") for message in messages[1:])
+        headers = [(name.decode("latin-1"), value.decode("latin-1")) for name, value in start["headers"]]
+        return self.flask_app.response_class(body, status=start["status"], headers=headers)
+
+    def get(self, *args, **kwargs):
+        """Sends a GET request"""
+        return self.open(*args, method="GET", **kwargs)
+
+    def post(self, *args, **kwargs):
+        """Sends a POST request"""
+        return self.open(*args, method="POST", **kwargs)
+
+    def put(self, *args, **kwargs):
+        """Sends a PUT request"""
+        return self.open(*args, method="PUT", **kwargs)
+
+    def delete(self, *args, **kwargs):
+        """Sends a DELETE request"""
+        return self.open(*args, method="DELETE", **kwargs)
+
+
+def asgi_scope(environ) -> dict:
+    """Returns the ASGI http scope of a WSGI environ"""
+    headers = [
+        (name[5:].replace("_", "-").lower().encode("latin-1"), value.encode("latin-1"))
+        for name, value in environ.items() if name.startswith("HTTP_")
+    ]
+    for name in ("CONTENT_TYPE", "CONTENT_LENGTH"):
+        if environ.get(name):
+            headers.append((name.replace("_", "-").lower().encode("latin-1"), environ[name].encode("latin-1")))
+    return {
+        "type": "http",
+        "http_version": "1.1",
+        "method": environ["REQUEST_METHOD"],
+        "scheme": environ["wsgi.url_scheme"],
+        "path": environ["PATH_INFO"].encode("latin-1").decode("utf-8"),
+        "root_path": environ["SCRIPT_NAME"],
+        "query_string": environ["QUERY_STRING"].encode("latin-1"),
+        "headers": headers,
+        "server": (environ["SERVER_NAME"], int(environ["SERVER_PORT"])),
+        "client": ("127.0.0.1", 0),
+    }
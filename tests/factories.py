@@ -41,7 +41,8 @@ class ItemFactory(factory.Factory):
         """Persistent class"""
         model = Item
 
-    id = factory.Sequence(lambda n: n)
+    # Item ids are given by the client and must not be 0
+    id = factory.Sequence(lambda n: n + 1)
     wishlist_id = None
     name = FuzzyChoice(
         choices=["grocery item", "electronic item", "home-care product", "miscellaneous"]
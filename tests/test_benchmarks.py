@@ -0,0 +1,44 @@
+"""
+Test cases for the benchmark reports
+
+"""
+import unittest
+from benchmarks.compare import compare
+from benchmarks.load import percentile, summarize
+
+RESULT = {"requests": 100, "errors": 0, "rps": 200.0, "p50_ms": 5.0, "p95_ms": 10.0, "p99_ms": 20.0, "peak_rss_mb": 90.0}
+
+
+######################################################################
+#  B E N C H M A R K   T E S T   C A S E S
+######################################################################
+class TestBenchmarks(unittest.TestCase):
+    """ Test Cases for the benchmark statistics and comparison """
+
+    def test_percentile(self):
+        """It should return nearest-rank percentiles"""
+        latencies = [n / 1000 for n in range(1, 101)]
+        self.assertEqual(percentile(latencies, 0.50), 0.05)
+        self.assertEqual(percentile(latencies, 0.99), 0.099)
+        self.assertEqual(percentile([0.2], 0.95), 0.2)
+        self.assertEqual(percentile([], 0.5), 0.0)
+
+    def test_summarize(self):
+        """It should report throughput, latency in ms and RSS in MB"""
+        summary = summarize([0.01] * 50, 1, 0.5, 100 * 2 ** 20)
+        self.assertEqual(summary["requests"], 50)
+        self.assertEqual(summary["errors"], 1)
+        self.assertEqual(summary["rps"], 100.0)
+        self.assertEqual(summary["p95_ms"], 10.0)
+        self.assertEqual(summary["peak_rss_mb"], 100.0)
+
+    def test_compare(self):
+        """It should flag regressions beyond the threshold only"""
+        baseline = {"GET /wishlists": RESULT, "POST /wishlists": RESULT}
+        current = {"GET /wishlists": dict(RESULT, rps=190.0, p99_ms=30.0, errors=2)}
+        regressions = compare(baseline, current, 0.10)
+        self.assertEqual(len(regressions), 3)
+        self.assertIn("GET /wishlists: errors 0 -> 2", regressions)
+        self.assertIn("GET /wishlists: p99_ms 20.0 -> 30.0 (+50%)", regressions)
+        self.assertIn("POST /wishlists: missing from the current run", regressions)
+        self.assertEqual(compare(baseline, dict(baseline, **current), 0.60), ["GET /wishlists: errors 0 -> 2"])
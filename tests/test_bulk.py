@@ -0,0 +1,193 @@
+"""
+Test cases for the bulk export and import of wishlists and items
+
+"""
+import csv
+import gzip
+import json
+import os
+import shutil
+import tempfile
+from service.common import bulk
+from service.models import Wishlist, Item, db
+from tests.cases import DatabaseTestCase, recorded_statements
+from tests.factories import ItemFactory, WishlistFactory
+
+
+class TestBulk(DatabaseTestCase):
+    """ Test Cases for the bulk export and import """
+
+    def setUp(self):
+        """This runs before each test"""
+        super().setUp()
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        """This runs after each test"""
+        super().tearDown()
+        shutil.rmtree(self.directory)
+
+    def _create_wishlists(self, count, items=2):
+        """Creates wishlists with some items each"""
+        wishlists = []
+        for _ in range(count):
+            wishlist = WishlistFactory(id=None)
+            wishlist.create()
+            for _ in range(items):
+                ItemFactory(id=None, wishlist=wishlist, price=1.5)
+            wishlist.update()
+            wishlists.append(wishlist)
+        return wishlists
+
+    def _read(self, name):
+        """Returns the lines of an exported file"""
+        path = os.path.join(self.directory, name)
+        opener = gzip.open if name.endswith(".gz") else open
+        with opener(path, "rt", encoding="utf-8") as exported:
+            return exported.read().splitlines()
+
+    def test_export_ndjson(self):
+        """It should export every wishlist and item as newline delimited JSON"""
+        ids = sorted(wishlist.id for wishlist in self._create_wishlists(3))
+        progress = list(bulk.export(self.directory, batch_size=2))
+        self.assertEqual([table for table, _ in progress], ["wishlists"] * 3 + ["items"] * 4)
+        self.assertTrue(progress[-1][1]["done"])
+
+        rows = [json.loads(line) for line in self._read("wishlists.ndjson")]
+        self.assertEqual([row["id"] for row in rows], ids)
+        self.assertEqual(set(rows[0]), set(bulk.serializers.WISHLIST_FIELDS))
+        self.assertEqual(rows[0]["item_count"], 2)
+        items = [json.loads(line) for line in self._read("items.ndjson")]
+        self.assertEqual(len(items), 6)
+        self.assertEqual(items[0], Item.find(items[0]["id"]).serialize())
+
+    def test_export_csv_gzip(self):
+        """It should export every wishlist and item as gzip compressed CSV"""
+        self._create_wishlists(2, items=1)
+        list(bulk.export(self.directory, "csv", True, batch_size=1))
+        rows = list(csv.DictReader(self._read("wishlists.csv.gz")))
+        self.assertEqual(len(rows), 2)
+        self.assertEqual(rows[0]["is_enabled"], "true")
+        self.assertEqual(rows[0]["total_price"], "1.5")
+        items = list(csv.DictReader(self._read("items.csv.gz")))
+        self.assertEqual([item["wishlist_id"] for item in items], [row["id"] for row in rows])
+
+    def test_export_resume(self):
+        """It should resume an interrupted export after its last checkpoint"""
+        self._create_wishlists(4, items=1)
+        export = bulk.export(self.directory, "csv", True, batch_size=1)
+        next(export)
+        next(export)
+        export.close()
+        # rows written after the checkpoint are dropped on resume
+        with open(os.path.join(self.directory, "wishlists.csv.gz"), "ab") as exported:
+            exported.write(gzip.compress(b"999,partial\n"))
+        self._create_wishlists(1, items=1)
+
+        progress = list(bulk.export(self.directory, "csv", True, batch_size=1, resume=True))
+        self.assertEqual(progress[0][1]["rows"], 3)
+        rows = list(csv.DictReader(self._read("wishlists.csv.gz")))
+        self.assertEqual([int(row["id"]) for row in rows], sorted(wishlist.id for wishlist in Wishlist.all()))
+        self.assertEqual(len(list(csv.DictReader(self._read("items.csv.gz")))), 5)
+
+        self.assertRaises(ValueError, list, bulk.export(self.directory, "ndjson", resume=True))
+
+    def _write(self, name, lines):
+        """Writes the lines of a file to import and returns its path"""
+        path = os.path.join(self.directory, name)
+        with open(path, "w", encoding="utf-8") as source:
+            source.write("\n".join(lines) + "\n")
+        return path
+
+    def test_import_export_round_trip(self):
+        """It should import the wishlists and items of an export as they were"""
+        self._create_wishlists(3)
+        before = [wishlist.serialize() for wishlist in Wishlist.all()]
+        for fmt in bulk.FORMATS:
+            shutil.rmtree(self.directory)
+            list(bulk.export(self.directory, fmt, True))
+            db.session.query(Wishlist).delete()
+            db.session.commit()
+            for table in bulk.TABLES:
+                progress = list(bulk.import_file(os.path.join(self.directory, bulk.file_name(table, fmt, True))))
+                self.assertEqual([rejected for _, _, rejected in progress], [[]])
+            after = [wishlist.serialize() for wishlist in Wishlist.all()]
+            self.assertEqual(after, before, fmt)
+
+    def test_import_updates_totals_once_per_batch(self):
+        """It should add the imported items to the totals of their wishlists with one UPDATE"""
+        path = self._write("wishlists.ndjson", [
+            f'{{"id": {wishlist_id}, "name": "w", "user_id": 5, "is_enabled": true, "items": '
+            f'[{{"id": {wishlist_id}, "name": "a", "category": "b", "price": 2, "description": null}}]}}'
+            for wishlist_id in (9200, 9201)
+        ])
+        with recorded_statements(db.engine) as statements:
+            list(bulk.import_file(path))
+        self.assertFalse([statement for statement in statements if statement.startswith("UPDATE")])
+        self.assertEqual((Wishlist.find(9200).item_count, Wishlist.find(9201).total_price), (1, 2.0))
+
+        path = self._write("items.ndjson", [
+            f'{{"id": {item_id}, "wishlist_id": {wishlist_id}, "name": "a", "category": "b", "price": 1, "description": null}}'
+            for item_id, wishlist_id in ((9202, 9200), (9203, 9201), (9204, 9201))
+        ])
+        with recorded_statements(db.engine) as statements:
+            list(bulk.import_file(path))
+        self.assertEqual(len([statement for statement in statements if statement.startswith("UPDATE")]), 1)
+        self.assertEqual([Wishlist.find(9200).item_count, Wishlist.find(9201).item_count], [2, 3])
+
+    def test_import_rejects(self):
+        """It should import the valid rows and reject the others one by one"""
+        wishlist = self._create_wishlists(1, items=1)[0]
+        wishlist_id, item_id = wishlist.id, wishlist.items[0].id
+        path = self._write("wishlists.ndjson", [
+            '{"name": "new", "user_id": 5, "is_enabled": true}',
+            '{"name": "", "user_id": 5, "is_enabled": true}',
+            f'{{"id": {wishlist_id}, "name": "taken", "user_id": 5, "is_enabled": true}}',
+            '{"id": 9100, "name": "nested", "user_id": 5, "is_enabled": false, '
+            '"items": [{"id": 9101, "wishlist_id": 1, "name": "a", "category": "b", "price": 2, "description": "c"}]}',
+            '{"id": 9102, "name": "bad", "user_id": "five", "is_enabled": true}',
+            'not json',
+            '{"name": "number", "user_id": 5, "is_enabled": 1}',
+            '{"name": "text", "user_id": "12", "is_enabled": true}',
+        ])
+        progress = list(bulk.import_file(path, batch_size=4))
+        self.assertEqual([(read, imported) for read, imported, _ in progress], [(4, 2), (4, 0)])
+        self.assertEqual([line for _, _, rejected in progress for line, _ in rejected], [2, 3, 5, 6, 7, 8])
+        self.assertIn("already exists", progress[0][2][1][1])
+        nested = Wishlist.find(9100)
+        self.assertFalse(nested.is_enabled)
+        self.assertEqual((nested.item_count, nested.total_price), (1, 2.0))
+        self.assertEqual(Item.find(9101).wishlist_id, 9100)
+
+        path = self._write("items.csv", [
+            ",".join(bulk.serializers.ITEM_FIELDS),
+            f"9103,{wishlist_id},spoon,kitchen,1.25,",
+            f"{item_id},{wishlist_id},taken,kitchen,1,",
+            "9104,999999,orphan,kitchen,1,",
+            f"9103,{wishlist_id},again,kitchen,1,",
+            f"9105,{wishlist_id},,kitchen,1,",
+            f"9106,{wishlist_id},fork,kitchen,cheap,",
+        ])
+        progress = list(bulk.import_file(path))
+        self.assertEqual(progress[0][:2], (6, 1))
+        self.assertEqual([line for line, _ in progress[0][2]], [3, 4, 5, 6, 7])
+        self.assertIsNone(Item.find(9103).description)
+        wishlist = Wishlist.find(wishlist_id)
+        self.assertEqual((wishlist.item_count, wishlist.total_price), (2, 2.75))
+
+        # JSON values are not coerced, the API would reject them as well
+        row = f'"wishlist_id": {wishlist_id}, "name": "cup", "category": "kitchen", "description": null'
+        path = self._write("items.ndjson", [
+            f'{{"id": 9107, {row}, "price": 2}}',
+            f'{{"id": 9108, {row}, "price": true}}',
+            f'{{"id": 9.5, {row}, "price": 1}}',
+            f'{{"id": "9110", {row}, "price": 1}}',
+        ])
+        progress = list(bulk.import_file(path))
+        self.assertEqual(progress[0][:2], (4, 1))
+        self.assertEqual([line for line, _ in progress[0][2]], [2, 3, 4])
+        wishlist = Wishlist.find(wishlist_id)
+        self.assertEqual((wishlist.item_count, wishlist.total_price), (3, 4.75))
+
+        self.assertRaises(ValueError, list, bulk.import_file(self._write("rows.ndjson", ["{}"])))
+        self.assertEqual(list(bulk.import_file(self._write("rows.ndjson", ["{}"]), "items"))[0][:2], (1, 0))
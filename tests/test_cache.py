@@ -0,0 +1,166 @@
+"""
+Test cases for the in-process caches
+
+"""
+import asyncio
+import unittest
+import fakeredis
+import fakeredis.aioredis
+from sqlalchemy.util import greenlet_spawn
+from service.common.cache import (
+    AsyncRedisCache, CacheBackend, MemoryCache, NullCache, PayloadCache, RedisCache, TTLCache, cache_backend
+)
+
+
+class FakeClock():
+    """A clock that only moves when told to"""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    def advance(self, seconds: float):
+        """Moves the clock forward"""
+        self.now += seconds
+
+
+######################################################################
+#  T T L   C A C H E   T E S T   C A S E S
+######################################################################
+class TestTTLCache(unittest.TestCase):
+    """ Test Cases for the LRU + TTL cache """
+
+    def setUp(self):
+        """This runs before each test"""
+        self.clock = FakeClock()
+        self.cache = TTLCache(maxsize=2, ttl=10, clock=self.clock)
+
+    def test_get_and_set(self):
+        """It should return cached values and count hits and misses"""
+        self.assertIsNone(self.cache.get("a"))
+        self.cache.set("a", 1)
+        self.assertEqual(self.cache.get("a"), 1)
+        self.cache.delete("a")
+        self.assertIsNone(self.cache.get("a"))
+        stats = self.cache.stats()
+        self.assertEqual((stats["hits"], stats["misses"], stats["size"]), (1, 2, 0))
+
+    def test_evict_least_recently_used(self):
+        """It should evict the least recently used entry when full"""
+        self.cache.set("a", 1)
+        self.cache.set("b", 2)
+        self.cache.get("a")
+        self.cache.set("c", 3)
+        self.assertIsNone(self.cache.get("b"))
+        self.assertEqual(self.cache.get("a"), 1)
+        self.assertEqual(self.cache.get("c"), 3)
+        self.assertEqual(self.cache.stats()["evictions"], 1)
+
+    def test_expire_after_ttl(self):
+        """It should not return entries older than the ttl"""
+        self.cache.set("a", 1)
+        self.clock.advance(9.5)
+        self.assertEqual(self.cache.get("a"), 1)
+        self.clock.advance(0.5)
+        self.assertIsNone(self.cache.get("a"))
+        self.assertEqual(self.cache.stats()["size"], 0)
+
+    def test_disabled(self):
+        """It should not store anything when configured with size 0"""
+        self.cache.set("a", 1)
+        self.cache.configure(0, 10)
+        self.assertFalse(self.cache.enabled)
+        self.assertIsNone(self.cache.get("a"))
+        self.cache.set("a", 1)
+        self.assertIsNone(self.cache.get("a"))
+
+
+######################################################################
+#  P A Y L O A D   C A C H E   T E S T   C A S E S
+######################################################################
+class TestPayloadCache(unittest.TestCase):
+    """ Test Cases for the payload cache and its backends """
+
+    def setUp(self):
+        """This runs before each test"""
+        self.server = fakeredis.FakeServer()
+
+    def redis_cache(self):
+        """Returns a payload cache of one worker sharing the fake server"""
+        return PayloadCache(RedisCache(fakeredis.FakeRedis(server=self.server)), ttl=60, prefix="test:")
+
+    def test_memory_backend(self):
+        """It should cache tagged payloads in memory"""
+        cache = PayloadCache(MemoryCache(), ttl=60)
+        self.assertIsNone(cache.get("a"))
+        cache.set("a", "tag", b'{"id": 1}')
+        self.assertEqual(cache.get("a"), ("tag", b'{"id": 1}'))
+        cache.delete("a")
+        self.assertIsNone(cache.get("a"))
+        cache.set("b", "", b"[]")
+        cache.clear()
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.stats()["hits"], 1)
+        self.assertEqual(cache.stats()["misses"], 3)
+
+    def test_shared_between_workers(self):
+        """It should share the payloads of all workers through Redis"""
+        worker, other_worker = self.redis_cache(), self.redis_cache()
+        worker.set("wishlists/1", "tag", b"{}")
+        self.assertEqual(other_worker.get("wishlists/1"), ("tag", b"{}"))
+        self.assertLessEqual(self.server_client().pttl("test:wishlists/1"), 60000)
+        other_worker.delete("wishlists/1")
+        self.assertIsNone(worker.get("wishlists/1"))
+
+    def test_clear_only_own_prefix(self):
+        """It should only clear the keys of its own prefix"""
+        cache = self.redis_cache()
+        client = self.server_client()
+        client.set("other:key", b"1")
+        cache.set("a", "", b"1")
+        cache.set("b", "", b"2")
+        cache.clear()
+        self.assertIsNone(cache.get("a"))
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(client.get("other:key"), b"1")
+
+    def test_async_backend(self):
+        """It should share the payloads through the asyncio client from a greenlet"""
+        def use_cache():
+            cache = PayloadCache(AsyncRedisCache(fakeredis.aioredis.FakeRedis(server=self.server)), ttl=60, prefix="test:")
+            cache.set("a", "tag", b"{}")
+            self.assertEqual(self.redis_cache().get("a"), ("tag", b"{}"))
+            self.assertEqual(cache.get("a"), ("tag", b"{}"))
+            cache.clear()
+            self.assertIsNone(self.redis_cache().get("a"))
+            self.assertEqual(cache.stats()["errors"], 0)
+
+        asyncio.run(greenlet_spawn(use_cache))
+
+    def test_server_down(self):
+        """It should count an unreachable server as a miss"""
+        cache = self.redis_cache()
+        cache.set("a", "", b"1")
+        self.server.connected = False
+        self.assertIsNone(cache.get("a"))
+        cache.set("a", "", b"2")
+        cache.delete("a")
+        cache.clear()
+        self.assertEqual(cache.stats()["errors"], 4)
+
+    def test_cache_backend(self):
+        """It should create the configured backend"""
+        config = {"CACHE_BACKEND": "memory", "CACHE_SIZE": 10, "CACHE_TTL": 1, "CACHE_REDIS_URL": "redis://cache:6379/0"}
+        self.assertIsInstance(cache_backend(config), MemoryCache)
+        self.assertIsInstance(cache_backend(dict(config, CACHE_BACKEND="redis")), RedisCache)
+        self.assertIsInstance(cache_backend(dict(config, CACHE_BACKEND="redis"), asynchronous=True), AsyncRedisCache)
+        self.assertIsInstance(cache_backend(dict(config, CACHE_BACKEND="none")), NullCache)
+        self.assertRaises(ValueError, cache_backend, dict(config, CACHE_BACKEND="memcached"))
+        # a backend must implement every operation
+        self.assertRaises(TypeError, CacheBackend)
+
+    def server_client(self):
+        """Returns a client of the fake server without the cache prefix"""
+        return fakeredis.FakeRedis(server=self.server)
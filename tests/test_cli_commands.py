@@ -1,10 +1,13 @@
 """
 CLI Command Extensions for Flask
 """
+import json
+import os
+import tempfile
 from unittest import TestCase
 from unittest.mock import patch, MagicMock
 from click.testing import CliRunner
-from service.common.cli_commands import db_create
+from service.common.cli_commands import db_create, db_upgrade, recompute_totals, export, import_files
 from service import app
 from service.models import db
 
@@ -22,6 +25,62 @@ class TestFlaskCLI(TestCase):
         result = self.runner.invoke(db_create)
         self.assertEqual(result.exit_code, 0)
 
+    @patch('service.common.cli_commands.migrations')
+    @patch('service.common.cli_commands.db')
+    def test_db_upgrade(self, db_mock, migrations_mock):
+        """It should call the db-upgrade command"""
+        migrations_mock.upgrade.return_value = [1, 2]
+        result = self.runner.invoke(db_upgrade, ["--to", "2"])
+        self.assertEqual(result.exit_code, 0)
+        migrations_mock.upgrade.assert_called_once_with(db_mock.engine, 2)
+        self.assertIn("Applied migration 0002", result.output)
+
+    @patch('service.common.cli_commands.Wishlist')
+    def test_recompute_totals(self, wishlist_mock):
+        """It should recompute the totals batch by batch"""
+        wishlist_mock.recompute_totals.side_effect = [(10, 2), (20, 1), (None, 0)]
+        result = self.runner.invoke(recompute_totals, ["--batch-size", "10"])
+        self.assertEqual(result.exit_code, 0)
+        wishlist_mock.recompute_totals.assert_called_with(10, 20)
+        self.assertIn("Fixed the totals of 3 wishlists", result.output)
+
+    @patch('service.common.cli_commands.bulk')
+    def test_export(self, bulk_mock):
+        """It should export the tables and report their progress"""
+        bulk_mock.FORMATS = ("ndjson", "csv")
+        bulk_mock.export.return_value = [
+            ("wishlists", {"rows": 2, "last_id": 7, "done": True}),
+            ("items", {"rows": 5, "last_id": 9, "done": True}),
+        ]
+        result = self.runner.invoke(export, ["out", "--gzip", "--resume", "--batch-size", "10"])
+        self.assertEqual(result.exit_code, 0)
+        bulk_mock.export.assert_called_once_with("out", "ndjson", True, 10, True)
+        self.assertIn("items: 5 rows exported up to id 9 (done)", result.output)
+
+        bulk_mock.export.side_effect = ValueError("The checkpoint in out is of a csv export")
+        result = self.runner.invoke(export, ["out", "--resume"])
+        self.assertEqual(result.exit_code, 2)
+
+    @patch('service.common.cli_commands.bulk')
+    def test_import_files(self, bulk_mock):
+        """It should import the files and report the rejected rows"""
+        bulk_mock.TABLES = {"wishlists": None, "items": None}
+        bulk_mock.import_file.return_value = [(3, 2, [(2, "Invalid Wishlist")]), (1, 1, [])]
+        with tempfile.TemporaryDirectory() as directory:
+            path, rejects_path = os.path.join(directory, "wishlists.ndjson"), os.path.join(directory, "rejects.ndjson")
+            with open(path, "w", encoding="utf-8") as source:
+                source.write("{}\n")
+            result = self.runner.invoke(import_files, [path, "--batch-size", "3"])
+            self.assertEqual(result.exit_code, 0)
+            bulk_mock.import_file.assert_called_once_with(path, None, 3)
+            self.assertIn(f"{path}:2: Invalid Wishlist", result.output)
+            self.assertIn("3 rows imported, 1 rejected", result.output)
+
+            result = self.runner.invoke(import_files, [path, "--rejects", rejects_path])
+            self.assertEqual(result.exit_code, 0)
+            with open(rejects_path, encoding="utf-8") as rejects:
+                self.assertEqual(json.loads(rejects.read()), {"file": path, "line": 2, "error": "Invalid Wishlist"})
+
 
 ######################################################################
 # Command to force tables to be rebuilt
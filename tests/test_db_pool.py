@@ -0,0 +1,74 @@
+"""
+Test cases for the instrumented database connection pool
+
+"""
+import os
+import tempfile
+import unittest
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from service.common.db_pool import InstrumentedQueuePool, pool_options, pool_status
+from service import app
+
+######################################################################
+#  C O N N E C T I O N   P O O L   T E S T   C A S E S
+######################################################################
+
+
+class TestConnectionPool(unittest.TestCase):
+    """ Test Cases for the instrumented connection pool """
+
+    def setUp(self):
+        """This runs before each test"""
+        handle, self.path = tempfile.mkstemp(suffix=".db")
+        os.close(handle)
+        self.engine = create_engine(
+            f"sqlite:///{self.path}",
+            poolclass=InstrumentedQueuePool,
+            pool_size=1,
+            max_overflow=1,
+            pool_timeout=0.01,
+        )
+
+    def tearDown(self):
+        """This runs after each test"""
+        self.engine.dispose()
+        os.remove(self.path)
+
+    def test_pool_options(self):
+        """It should build the pool options from the configuration"""
+        options = pool_options(app.config)
+        self.assertIs(options["poolclass"], InstrumentedQueuePool)
+        self.assertEqual(options["pool_size"], app.config["DB_POOL_SIZE"])
+        self.assertEqual(options["max_overflow"], app.config["DB_MAX_OVERFLOW"])
+
+    def test_pool_saturation(self):
+        """It should report checked out connections, overflow and timeouts"""
+        first = self.engine.connect()
+        second = self.engine.connect()
+        status = pool_status(self.engine)
+        self.assertEqual(status["pool"], "InstrumentedQueuePool")
+        self.assertEqual(status["checked_out"], 2)
+        self.assertEqual(status["overflow"], 1)
+        self.assertEqual(status["checkouts"], 2)
+
+        self.assertRaises(PoolTimeoutError, self.engine.connect)
+        status = pool_status(self.engine)
+        self.assertEqual(status["timeouts"], 1)
+        self.assertGreaterEqual(status["wait_seconds_max"], 0.01)
+
+        second.close()
+        first.close()
+        self.assertEqual(pool_status(self.engine)["checked_out"], 0)
+
+    def test_pool_invalidations(self):
+        """It should count invalidated connections across a dispose"""
+        connection = self.engine.connect()
+        connection.execute(text("SELECT 1"))
+        connection.invalidate()
+        connection.close()
+        self.assertEqual(pool_status(self.engine)["invalidations"], 1)
+        self.engine.dispose()
+        with self.engine.connect() as connection:
+            connection.invalidate()
+        self.assertEqual(pool_status(self.engine)["invalidations"], 2)
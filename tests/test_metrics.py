@@ -0,0 +1,91 @@
+"""
+Test cases for the metrics of the service
+
+"""
+import os
+import subprocess
+import sys
+import tempfile
+from unittest.mock import patch
+from prometheus_client import REGISTRY
+from service import app
+from service.common import metrics, status
+from tests.cases import DATABASE_URI, RoutesTestCase
+from tests.factories import WishlistFactory
+
+# records one request in a worker process of its own
+RECORD_REQUEST = "from service.common import metrics; metrics.REQUESTS.labels('WishlistResource', 'GET', '200').inc()"
+
+
+def sample(name, **labels):
+    """Returns the value of a sample of this process, 0 if it was never recorded"""
+    return REGISTRY.get_sample_value(name, labels) or 0
+
+
+######################################################################
+#  M E T R I C S   T E S T   C A S E S
+######################################################################
+class TestMetrics(RoutesTestCase):
+    """ Test Cases for /metrics """
+
+    def test_count_requests_by_resource(self):
+        """It should count requests by resource, method and status"""
+        wishlist = WishlistFactory()
+        wishlist.create()
+        labels = {"resource": "WishlistResource", "method": "GET"}
+        found = sample("wishlist_http_requests_total", status="200", **labels)
+        missing = sample("wishlist_http_requests_total", status="404", **labels)
+        timed = sample("wishlist_http_request_duration_seconds_count", **labels)
+        queries = sample("wishlist_db_query_duration_seconds_count", resource="WishlistResource", statement="SELECT")
+
+        self.client.get(f"/api/wishlists/{wishlist.id}")
+        self.client.get("/api/wishlists/0")
+
+        self.assertEqual(sample("wishlist_http_requests_total", status="200", **labels), found + 1)
+        self.assertEqual(sample("wishlist_http_requests_total", status="404", **labels), missing + 1)
+        self.assertEqual(sample("wishlist_http_request_duration_seconds_count", **labels), timed + 2)
+        self.assertGreater(
+            sample("wishlist_db_query_duration_seconds_count", resource="WishlistResource", statement="SELECT"),
+            queries,
+        )
+
+    def test_metrics_endpoint(self):
+        """It should expose the metrics in the text exposition format"""
+        self.client.get("/api/wishlists")
+        resp = self.client.get("/metrics")
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+        self.assertTrue(resp.content_type.startswith("text/plain; version=0.0.4"))
+        text = resp.get_data(as_text=True)
+        self.assertIn('wishlist_http_requests_total{method="GET",resource="WishlistCollection",status="200"}', text)
+        self.assertIn(
+            'wishlist_http_request_duration_seconds_bucket{le="0.005",method="GET",resource="WishlistCollection"}', text
+        )
+        self.assertIn('wishlist_db_query_duration_seconds_count{resource="WishlistCollection",statement="SELECT"}', text)
+
+    def test_query_budget(self):
+        """It should report the queries of a request and warn when they exceed the budget"""
+        wishlist = WishlistFactory()
+        wishlist.create()
+        url = f"/api/wishlists/{wishlist.id}/items"
+        with patch.dict(app.config, {"DB_DEBUG_HEADERS": False, "DB_QUERY_BUDGET": 0}):
+            resp = self.client.get("/api/wishlists")
+        self.assertNotIn("X-DB-Queries", resp.headers)
+
+        with patch.dict(app.config, {"DB_DEBUG_HEADERS": True, "DB_QUERY_BUDGET": 1}):
+            resp = self.client.get(url)
+            self.assertGreater(int(resp.headers["X-DB-Queries"]), 0)
+            self.assertGreater(float(resp.headers["X-DB-Time-ms"]), 0)
+            with self.assertLogs("flask.app", "WARNING") as logs:
+                resp = self.client.put(f"/api/wishlists/{wishlist.id}/clear")
+            self.assertGreater(int(resp.headers["X-DB-Queries"]), 1)
+        self.assertIn("over the budget of 1", logs.output[0])
+
+    def test_add_up_workers(self):
+        """It should add up the metrics of all worker processes"""
+        with tempfile.TemporaryDirectory() as path:
+            env = dict(os.environ, PROMETHEUS_MULTIPROC_DIR=path, DATABASE_URI=DATABASE_URI)
+            for _ in range(2):
+                subprocess.run([sys.executable, "-c", RECORD_REQUEST], env=env, check=True)
+            with patch.dict(os.environ, {metrics.MULTIPROC_DIR: path}):
+                text = metrics.exposition().decode("utf-8")
+        self.assertIn('wishlist_http_requests_total{method="GET",resource="WishlistResource",status="200"} 2.0', text)
@@ -0,0 +1,59 @@
+"""
+Test cases for the versioned schema migrations
+
+"""
+import os
+import tempfile
+import unittest
+from sqlalchemy import create_engine, inspect
+from service import migrations
+from service.models import db
+
+######################################################################
+#  M I G R A T I O N   T E S T   C A S E S
+######################################################################
+
+
+class TestMigrations(unittest.TestCase):
+    """ Test Cases for the migration runner """
+
+    def setUp(self):
+        """This runs before each test"""
+        handle, self.path = tempfile.mkstemp(suffix=".db")
+        os.close(handle)
+        self.engine = create_engine(f"sqlite:///{self.path}")
+
+    def tearDown(self):
+        """This runs after each test"""
+        self.engine.dispose()
+        os.remove(self.path)
+
+    def test_upgrade_empty_database(self):
+        """It should migrate an empty database to the schema of the models"""
+        applied = migrations.upgrade(self.engine)
+        self.assertEqual(applied, [module.VERSION for module in migrations.migrations()])
+        self.assertEqual(applied[-1], migrations.head())
+
+        inspector = inspect(self.engine)
+        for table in db.metadata.sorted_tables:
+            columns = {column["name"] for column in inspector.get_columns(table.name)}
+            self.assertEqual(columns, set(table.columns.keys()), table.name)
+            indexes = {index["name"] for index in inspector.get_indexes(table.name)}
+            self.assertTrue({index.name for index in table.indexes} <= indexes, table.name)
+
+        # running it again is a no-op
+        self.assertEqual(migrations.upgrade(self.engine), [])
+
+    def test_upgrade_to_target(self):
+        """It should only apply migrations up to the target version"""
+        self.assertEqual(migrations.upgrade(self.engine, target=1), [1])
+        self.assertEqual(inspect(self.engine).get_indexes("wishlist"), [])
+        self.assertEqual(migrations.upgrade(self.engine, target=2), [2])
+
+    def test_stamp(self):
+        """It should mark a database created from the models as migrated"""
+        db.metadata.create_all(self.engine)
+        migrations.stamp(self.engine)
+        self.assertEqual(migrations.upgrade(self.engine), [])
+        with self.engine.begin() as connection:
+            self.assertEqual(migrations.current_version(connection), migrations.head())
@@ -0,0 +1,102 @@
+"""
+Read Replica Routing Test Suite
+
+Points a replica bind at the test database and checks which engine the
+queries of each request are sent to
+"""
+import tempfile
+import time
+from sqlalchemy import event
+from service import app
+from service.models import db, Wishlist, find_cache, payload_cache
+from service.common import status  # HTTP Status Codes
+from service.common.replicas import LAST_WRITE_COOKIE
+from tests.cases import BASE_URL, DATABASE_URI, RoutesTestCase
+from tests.factories import WishlistFactory
+
+######################################################################
+#  T E S T   C A S E S
+######################################################################
+
+
+class TestReplicaRouting(RoutesTestCase):
+    """ Read Replica Routing Tests """
+
+    def setUp(self):
+        """ This runs before each test """
+        app.config["SQLALCHEMY_BINDS"] = {"replica_0": DATABASE_URI}
+        db.session.remove()
+        super().setUp()
+        self.replica_statements = []
+        self.replica = db.get_engine(app, bind="replica_0")
+        event.listen(self.replica, "before_cursor_execute", self._count_replica_statement)
+
+    def tearDown(self):
+        """ This runs after each test """
+        event.remove(self.replica, "before_cursor_execute", self._count_replica_statement)
+        super().tearDown()
+        app.config["SQLALCHEMY_BINDS"] = {}
+
+    def _count_replica_statement(self, *args):
+        self.replica_statements.append(args[2])
+
+    def _create_wishlist(self):
+        wishlist = WishlistFactory()
+        resp = self.client.post(BASE_URL, json=wishlist.serialize())
+        self.assertEqual(resp.status_code, status.HTTP_201_CREATED)
+        return resp
+
+    def test_reads_go_to_replica(self):
+        """It should send the queries of GET requests to the replica"""
+        wishlist_id = self._create_wishlist().get_json()["id"]
+        self.assertEqual(self.replica_statements, [])
+        self.client.cookie_jar.clear()
+        db.session.expunge_all()
+
+        resp = self.client.get(f"{BASE_URL}/{wishlist_id}")
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+        resp = self.client.get(BASE_URL)
+        self.assertEqual(len(resp.get_json()), 1)
+        self.assertGreaterEqual(len(self.replica_statements), 2)
+
+    def test_reads_after_write_go_to_primary(self):
+        """It should read from the primary right after the client wrote"""
+        resp = self._create_wishlist()
+        self.assertIn(LAST_WRITE_COOKIE, resp.headers["Set-Cookie"])
+        db.session.expunge_all()
+
+        resp = self.client.get(BASE_URL)
+        self.assertEqual(len(resp.get_json()), 1)
+        self.assertEqual(self.replica_statements, [])
+
+    def test_no_replicas(self):
+        """It should not set the sticky cookie without replicas"""
+        app.config["SQLALCHEMY_BINDS"] = {}
+        resp = self._create_wishlist()
+        self.assertNotIn("Set-Cookie", resp.headers)
+
+    def test_stale_replica_is_not_cached(self):
+        """It should not cache what a lagging replica returns"""
+        wishlist = WishlistFactory()
+        wishlist.create()
+        with tempfile.TemporaryDirectory() as directory:
+            app.config["SQLALCHEMY_BINDS"] = {"replica_0": f"sqlite:///{directory}/replica.db"}
+            replica = db.get_engine(app, bind="replica_0")
+            db.Model.metadata.create_all(replica)
+            row = {column.key: getattr(wishlist, column.key) for column in Wishlist.__table__.columns}
+            with replica.begin() as connection:
+                connection.execute(Wishlist.__table__.insert(), dict(row, name="stale"))
+            db.session.remove()
+
+            url = f"{BASE_URL}/{wishlist.id}"
+            self.assertEqual(self.client.get(url).get_json()["name"], "stale")
+            resp = self.client.get(BASE_URL, query_string={"user_id": wishlist.user_id})
+            self.assertEqual(resp.get_json()[0]["name"], "stale")
+            self.assertIsNone(find_cache.get(("wishlist", wishlist.id)))
+            self.assertIsNone(payload_cache.get(Wishlist.payload_key(wishlist.id)))
+            self.assertIsNone(payload_cache.get(Wishlist.user_payload_key(wishlist.user_id)))
+
+            # a client that just wrote reads its own writes from the primary
+            self.client.set_cookie("localhost", LAST_WRITE_COOKIE, str(time.time()))
+            self.assertEqual(self.client.get(url).get_json()["name"], wishlist.name)
+            replica.dispose()
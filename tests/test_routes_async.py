@@ -0,0 +1,88 @@
+"""
+Wishlist API Service Test Suite for the ASGI entry point
+
+Runs every test of the route test suites against the ASGI app over the
+asyncio driver of the test database (aiosqlite or asyncpg)
+
+Test cases can be run with the following:
+  nosetests -v --with-spec --spec-color tests/test_routes_async.py
+"""
+import asyncio
+from sqlalchemy.util import await_only, greenlet_spawn
+from service import app
+from service.common import status
+from service.models import db
+from service.common.asgi import GreenletAsgiApp, use_async_drivers
+from tests import test_routes, test_routes_cache, test_routes_pagination, test_routes_queries, test_routes_search
+from tests.asgi_client import AsgiTestClient
+from tests.cases import BASE_URL, RoutesTestCase
+
+
+######################################################################
+#  T E S T   C A S E S
+######################################################################
+class AsyncRoutesTestCase(RoutesTestCase):
+    """ Test Cases whose requests are served by the ASGI app """
+
+    @classmethod
+    def setUpClass(cls):
+        """Run once before all tests"""
+        super().setUpClass()
+        cls.sync_config = {key: app.config[key] for key in ("SQLALCHEMY_DATABASE_URI", "SQLALCHEMY_BINDS")}
+        use_async_drivers(app.config)
+        cls.asgi_app = GreenletAsgiApp(app, teardown=db.session.remove)
+
+    @classmethod
+    def tearDownClass(cls):
+        """ This runs once after the entire test suite """
+        app.config.update(cls.sync_config)
+        super().tearDownClass()
+
+    def run(self, result=None):
+        """Runs every test in a greenlet on an event loop, like the requests"""
+        return asyncio.run(greenlet_spawn(super().run, result))
+
+    def setUp(self):
+        """ This runs before each test """
+        super().setUp()
+        self.client = AsgiTestClient(self.asgi_app, app)
+
+
+class TestAsyncCachedRoutes(AsyncRoutesTestCase, test_routes_cache.TestCachedRoutes):
+    """ REST API Server Tests of the caches served by the ASGI app """
+
+
+class TestAsyncPaginatedRoutes(AsyncRoutesTestCase, test_routes_pagination.TestPaginatedRoutes):
+    """ REST API Server Tests of pages served by the ASGI app """
+
+
+class TestAsyncQueryBudgets(AsyncRoutesTestCase, test_routes_queries.TestQueryBudgets):
+    """ REST API Server Tests of the queries of requests served by the ASGI app """
+
+
+class TestAsyncSearchRoutes(AsyncRoutesTestCase, test_routes_search.TestSearchRoutes):
+    """ REST API Server Tests of searches served by the ASGI app """
+
+
+class TestAsyncWishlistService(AsyncRoutesTestCase, test_routes.TestWishlistService):
+    """ REST API Server Tests served by the ASGI app """
+
+    def test_concurrent_requests(self):
+        """It should serve requests that wait on the database at the same time"""
+        wishlist = self._create_wishlists(1)[0]
+        in_flight, most_in_flight = 0, 0
+
+        async def counting_app(scope, receive, send):
+            nonlocal in_flight, most_in_flight
+            in_flight += 1
+            most_in_flight = max(most_in_flight, in_flight)
+            try:
+                await self.asgi_app(scope, receive, send)
+            finally:
+                in_flight -= 1
+
+        client = AsgiTestClient(counting_app, app)
+        url = f"{BASE_URL}/{wishlist.id}/items"
+        responses = await_only(asyncio.gather(*(client.request(url) for _ in range(20))))
+        self.assertEqual({resp.status_code for resp in responses}, {status.HTTP_200_OK})
+        self.assertGreater(most_in_flight, 1)
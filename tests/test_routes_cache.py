@@ -0,0 +1,151 @@
+"""
+Wishlist API Service Test Suite for the caches
+
+Checks that the find cache, the payload cache and conditional requests
+answer with the current data
+
+Test cases can be run with the following:
+  nosetests -v --with-spec --spec-color tests/test_routes_cache.py
+"""
+from unittest.mock import patch
+from service.models import db, Wishlist, find_cache, payload_cache
+from service.common import status  # HTTP Status Codes
+from tests.cases import BASE_URL, RoutesTestCase, recorded_statements
+from tests.factories import ItemFactory
+
+
+######################################################################
+#  T E S T   C A S E S
+######################################################################
+class TestCachedRoutes(RoutesTestCase):
+    """ REST API Server Tests of the caches and conditional requests """
+
+    def test_cache_health(self):
+        """ It should report the find cache """
+        resp = self.client.get("/health/cache")
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+        self.assertIn("hits", resp.get_json()["find"])
+
+    def test_get_cached_wishlists(self):
+        """It should serve cached Wishlists until they change"""
+        wishlist = self._create_wishlists(1, user_id=77)[0]
+        url = f"{BASE_URL}/{wishlist.id}"
+        by_user = f"{BASE_URL}?user_id=77"
+        first = self.client.get(url)
+        self.assertEqual(self.client.get(by_user).status_code, status.HTTP_200_OK)
+
+        with recorded_statements(db.engine) as statements:
+            resp = self.client.get(url)
+            self.assertEqual(resp.get_json(), first.get_json())
+            self.assertEqual(resp.headers["ETag"], first.headers["ETag"])
+            self.assertEqual(len(self.client.get(by_user).get_json()), 1)
+        self.assertEqual(statements, [])
+
+        # adding an item expires the wishlist and the list of its user
+        item = ItemFactory(id=4100, wishlist_id=wishlist.id)
+        resp = self.client.post(f"{url}/items", json=item.serialize())
+        self.assertEqual(resp.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(self.client.get(url).get_json()["items"]), 1)
+        self.assertEqual(len(self.client.get(by_user).get_json()[0]["items"]), 1)
+
+        # and so does moving the wishlist to another user
+        data = dict(self.client.get(url).get_json(), user_id=78, items=[])
+        resp = self.client.put(url, json=data)
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+        self.assertEqual(self.client.get(by_user).get_json(), [])
+        self.assertEqual(self.client.get(url).get_json()["user_id"], 78)
+
+    def test_get_wishlist_not_modified(self):
+        """It should answer conditional GETs of a Wishlist with 304 until it changes"""
+        wishlist = self._create_wishlists(1)[0]
+        url = f"{BASE_URL}/{wishlist.id}"
+        resp = self.client.get(url)
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+        etag = resp.headers["ETag"]
+
+        resp = self.client.get(url, headers={"If-None-Match": etag})
+        self.assertEqual(resp.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(resp.headers["ETag"], etag)
+        self.assertEqual(resp.data, b"")
+
+        # adding an item changes the wishlist
+        item = ItemFactory(id=4000, wishlist_id=wishlist.id)
+        resp = self.client.post(f"{url}/items", json=item.serialize())
+        self.assertEqual(resp.status_code, status.HTTP_201_CREATED)
+        resp = self.client.get(url, headers={"If-None-Match": etag})
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(resp.headers["ETag"], etag)
+        etag = resp.headers["ETag"]
+
+        # and so does clearing it
+        resp = self.client.put(f"{url}/clear")
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+        resp = self.client.get(url, headers={"If-None-Match": etag})
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+
+        resp = self.client.get(f"{BASE_URL}/0", headers={"If-None-Match": "*"})
+        self.assertEqual(resp.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_get_items_not_modified(self):
+        """It should answer conditional GETs of Items with 304 until they change"""
+        wishlist = self._create_wishlists(1)[0]
+        item = ItemFactory(id=4100, wishlist_id=wishlist.id)
+        resp = self.client.post(f"{BASE_URL}/{wishlist.id}/items", json=item.serialize())
+        self.assertEqual(resp.status_code, status.HTTP_201_CREATED)
+
+        for url in (f"{BASE_URL}/{wishlist.id}/items", f"{BASE_URL}/{wishlist.id}/items/{item.id}"):
+            resp = self.client.get(url)
+            self.assertEqual(resp.status_code, status.HTTP_200_OK)
+            etag = resp.headers["ETag"]
+            resp = self.client.get(url, headers={"If-None-Match": etag})
+            self.assertEqual(resp.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        item.price = 1.5
+        resp = self.client.put(f"{BASE_URL}/{wishlist.id}/items/{item.id}", json=item.serialize())
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+        resp = self.client.get(url, headers={"If-None-Match": etag})
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+        self.assertEqual(resp.get_json()["price"], 1.5)
+
+    def test_delete_wishlist_with_cached_items(self):
+        """It should not serve the cached Items of a deleted Wishlist"""
+        wishlists = self._create_wishlists(2)
+        wishlist, other = wishlists[0], wishlists[1]
+        item = ItemFactory(id=3100, wishlist_id=wishlist.id)
+        resp = self.client.post(f"{BASE_URL}/{wishlist.id}/items", json=item.serialize())
+        self.assertEqual(resp.status_code, status.HTTP_201_CREATED)
+        resp = self.client.get(f"{BASE_URL}/{wishlist.id}/items/{item.id}")
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+
+        # the database deletes the items with their wishlist
+        resp = self.client.delete(f"{BASE_URL}/{wishlist.id}")
+        self.assertEqual(resp.status_code, status.HTTP_204_NO_CONTENT)
+        url = f"{BASE_URL}/{other.id}/items/{item.id}"
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_404_NOT_FOUND)
+        resp = self.client.put(url, json=dict(item.serialize(), wishlist_id=other.id))
+        self.assertEqual(resp.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_write_from_another_worker(self):
+        """It should not cache a Wishlist that another worker changed since this one found it"""
+        wishlist = self._create_wishlists(1)[0]
+        url = f"{BASE_URL}/{wishlist.id}"
+        # listing its items puts the wishlist into the find cache of this worker
+        self.assertEqual(self.client.get(f"{url}/items").status_code, status.HTTP_200_OK)
+        self.assertIsNotNone(find_cache.get(("wishlist", wishlist.id)))
+
+        # the other worker writes and expires the shared payload, but not
+        # the find cache of this worker
+        with db.engine.begin() as connection:
+            connection.execute(
+                Wishlist.__table__.update().where(Wishlist.id == wishlist.id)
+                .values(name="renamed", version=Wishlist.version + 1)
+            )
+        payload_cache.delete(Wishlist.payload_key(wishlist.id))
+        self.assertEqual(self.client.get(url).get_json()["name"], "renamed")
+        self.assertEqual(payload_cache.get(Wishlist.payload_key(wishlist.id))[1], self.client.get(url).data)
+
+        # a write that commits while the wishlist is read keeps it out of the cache
+        payload_cache.delete(Wishlist.payload_key(wishlist.id))
+        with patch.object(Wishlist, "find_etag", return_value='"newer"'):
+            self.assertEqual(self.client.get(url).status_code, status.HTTP_200_OK)
+        self.assertIsNone(payload_cache.get(Wishlist.payload_key(wishlist.id)))
@@ -0,0 +1,105 @@
+"""
+Wishlist API Service Test Suite for pagination
+
+Test cases can be run with the following:
+  nosetests -v --with-spec --spec-color tests/test_routes_pagination.py
+"""
+from json import loads
+from service.models import db, Item
+from service.common import status  # HTTP Status Codes
+from tests.cases import BASE_URL, RoutesTestCase
+from tests.factories import ItemFactory
+
+
+######################################################################
+#  T E S T   C A S E S
+######################################################################
+class TestPaginatedRoutes(RoutesTestCase):
+    """ REST API Server Tests of cursor pages and streams """
+
+    def test_list_wishlists_paginated(self):
+        """It should page through all wishlists with a cursor"""
+        wishlists = self._create_wishlists(5)
+        resp = self.client.get(f"{BASE_URL}?limit=2")
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+        data = resp.get_json()
+        self.assertEqual([w["id"] for w in data], [w.id for w in wishlists[:2]])
+        self.assertIn('rel="next"', resp.headers["Link"])
+
+        seen = [w["id"] for w in data]
+        while "X-Next-Cursor" in resp.headers:
+            cursor = resp.headers["X-Next-Cursor"]
+            resp = self.client.get(f"{BASE_URL}?limit=2&cursor={cursor}")
+            self.assertEqual(resp.status_code, status.HTTP_200_OK)
+            seen.extend(w["id"] for w in resp.get_json())
+        self.assertEqual(seen, [w.id for w in wishlists])
+        self.assertNotIn("Link", resp.headers)
+
+    def test_list_wishlists_bad_page(self):
+        """It should not list wishlists with a bad cursor or limit"""
+        self._create_wishlists(1)
+        resp = self.client.get(f"{BASE_URL}?cursor=not-a-cursor")
+        self.assertEqual(resp.status_code, status.HTTP_400_BAD_REQUEST)
+        resp = self.client.get(f"{BASE_URL}?limit=0")
+        self.assertEqual(resp.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_stream_wishlists_ndjson(self):
+        """It should stream all wishlists as newline delimited JSON"""
+        wishlists = self._create_wishlists(3)
+        resp = self.client.get(f"{BASE_URL}?limit=1", headers={"Accept": "application/x-ndjson"})
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+        self.assertEqual(resp.mimetype, "application/x-ndjson")
+        lines = resp.get_data(as_text=True).splitlines()
+        self.assertEqual(len(lines), len(wishlists))
+        for line, wishlist in zip(lines, wishlists):
+            data = loads(line)
+            self.assertEqual(data["id"], wishlist.id)
+            self.assertEqual(data["name"], wishlist.name)
+            self.assertEqual(data["items"], [])
+
+    def test_list_items_sorted_pages(self):
+        """It should list the items of a wishlist sorted, filtered and page by page"""
+        wishlist = self._create_wishlists(1)[0]
+        url = f"{BASE_URL}/{wishlist.id}/items"
+        for n, (name, price) in enumerate([("cup", 4.0), ("bowl", 1.0), ("plate", 4.0), ("fork", 1.5), ("x", 9.0)]):
+            item = ItemFactory(id=4700 + n, wishlist_id=wishlist.id, name=name, price=price,
+                               category="tableware" if n % 2 else "kitchen")
+            resp = self.client.post(url, json=item.serialize())
+            self.assertEqual(resp.status_code, status.HTTP_201_CREATED)
+        # the API always sets both, older rows may have neither
+        Item.query.filter(Item.id == 4701).update({"price": None})
+        Item.query.filter(Item.id == 4704).update({"name": None})
+        db.session.commit()
+
+        def pages(**args):
+            ids, cursor = [], None
+            while True:
+                resp = self.client.get(url, query_string=dict(args, limit=2, **({"cursor": cursor} if cursor else {})))
+                self.assertEqual(resp.status_code, status.HTTP_200_OK)
+                self.assert_queries(resp, 2)
+                ids += [item["id"] for item in resp.get_json()]
+                cursor = resp.headers.get("X-Next-Cursor")
+                if not cursor:
+                    return ids
+
+        self.assertEqual(pages(), [4700, 4701, 4702, 4703, 4704])
+        self.assertEqual(pages(order="desc"), [4704, 4703, 4702, 4701, 4700])
+        # the items without a price or a name come last either way
+        self.assertEqual(pages(sort="price"), [4703, 4700, 4702, 4704, 4701])
+        self.assertEqual(pages(sort="price", order="desc"), [4704, 4702, 4700, 4703, 4701])
+        self.assertEqual(pages(sort="name"), [4701, 4700, 4703, 4702, 4704])
+        self.assertEqual(pages(sort="name", category="kitchen"), [4700, 4702, 4704])
+        self.assertEqual(pages(sort="price", min_price=2, max_price=5), [4700, 4702])
+
+        first = self.client.get(url, query_string={"sort": "price"})
+        self.assertNotEqual(first.headers["ETag"], self.client.get(url).headers["ETag"])
+        resp = self.client.get(url, query_string={"sort": "price"}, headers={"If-None-Match": first.headers["ETag"]})
+        self.assertEqual(resp.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        resp = self.client.get(url, query_string={"sort": "color"})
+        self.assertEqual(resp.status_code, status.HTTP_400_BAD_REQUEST)
+        cursor = self.client.get(url, query_string={"sort": "name", "limit": 1}).headers["X-Next-Cursor"]
+        resp = self.client.get(url, query_string={"sort": "price", "cursor": cursor})
+        self.assertEqual(resp.status_code, status.HTTP_400_BAD_REQUEST)
+        resp = self.client.get(f"{BASE_URL}/0/items")
+        self.assertEqual(resp.status_code, status.HTTP_404_NOT_FOUND)
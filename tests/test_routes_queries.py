@@ -0,0 +1,66 @@
+"""
+Wishlist API Service Test Suite for the number of queries
+
+Checks that every endpoint answers with a bounded number of queries, read
+from the X-DB-Queries header that DB_DEBUG_HEADERS turns on
+
+Test cases can be run with the following:
+  nosetests -v --with-spec --spec-color tests/test_routes_queries.py
+"""
+from service.common import status  # HTTP Status Codes
+from tests.cases import BASE_URL, RoutesTestCase
+from tests.factories import ItemFactory
+
+
+######################################################################
+#  T E S T   C A S E S
+######################################################################
+class TestQueryBudgets(RoutesTestCase):
+    """ REST API Server Tests of the queries each request runs """
+
+    def test_list_wishlists_query_count(self):
+        """It should list wishlists with a constant number of queries"""
+        def add_wishlists_with_items(count):
+            for wishlist in self._create_wishlists(count):
+                item = ItemFactory(id=wishlist.id, wishlist_id=wishlist.id)
+                resp = self.client.post(f"{BASE_URL}/{wishlist.id}/items", json=item.serialize())
+                self.assertEqual(resp.status_code, status.HTTP_201_CREATED)
+
+        def count_list_queries():
+            resp = self.client.get(BASE_URL)
+            self.assertEqual(resp.status_code, status.HTTP_200_OK)
+            return len(resp.get_json()), self.assert_queries(resp, 2)
+
+        add_wishlists_with_items(2)
+        listed, few_queries = count_list_queries()
+        self.assertEqual(listed, 2)
+        add_wishlists_with_items(6)
+        listed, many_queries = count_list_queries()
+        self.assertEqual(listed, 8)
+        self.assertEqual(few_queries, many_queries)
+
+    def test_query_budgets(self):
+        """It should answer every endpoint with a bounded number of queries"""
+        wishlist = self._create_wishlists(1)[0]
+        url = f"{BASE_URL}/{wishlist.id}"
+        items = [ItemFactory(id=5000 + n, wishlist_id=wishlist.id).serialize() for n in range(5)]
+        budgets = [
+            ("post", f"{url}/items", {"json": items[0]}, 6),
+            ("post", f"{url}/items:batch", {"json": items[1:]}, 5),
+            ("get", url, {}, 3),
+            ("get", BASE_URL, {}, 2),
+            ("get", BASE_URL, {"query_string": {"user_id": wishlist.user_id}}, 2),
+            ("get", BASE_URL, {"query_string": {"name": wishlist.name}}, 2),
+            ("get", f"{url}/items", {}, 2),
+            ("get", "/api/items", {"query_string": {"category": items[0]["category"], "min_price": 0}}, 1),
+            ("get", f"{url}/items/5000", {}, 1),
+            ("put", f"{url}/items/5000", {"json": dict(items[0], name="renamed")}, 5),
+            ("put", url, {"json": dict(wishlist.serialize(), items=[])}, 4),
+            ("delete", f"{url}/items/5000", {}, 4),
+            ("put", f"{url}/clear", {}, 4),
+            ("delete", url, {}, 2),
+        ]
+        for method, path, kwargs, budget in budgets:
+            resp = getattr(self.client, method)(path, **kwargs)
+            self.assertLess(resp.status_code, 400, f"{method} {path}")
+            self.assert_queries(resp, budget, f"{method.upper()} {path}")
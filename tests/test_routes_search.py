@@ -0,0 +1,97 @@
+"""
+Wishlist API Service Test Suite for searches
+
+Test cases can be run with the following:
+  nosetests -v --with-spec --spec-color tests/test_routes_search.py
+"""
+from service.common import status  # HTTP Status Codes
+from tests.cases import BASE_URL, RoutesTestCase
+from tests.factories import ItemFactory
+
+
+######################################################################
+#  T E S T   C A S E S
+######################################################################
+class TestSearchRoutes(RoutesTestCase):
+    """ REST API Server Tests of the item and name searches """
+
+    def test_search_items(self):
+        """It should search the Items of all or some Wishlists page by page"""
+        wishlists = self._create_wishlists(1, user_id=61) + self._create_wishlists(1, user_id=62)
+        for n in range(3):
+            for wishlist in wishlists:
+                item = ItemFactory(id=4400 + 10 * wishlist.id + n, wishlist_id=wishlist.id,
+                                   name=f"garden hose {n}", description="green " * (n + 1))
+                resp = self.client.post(f"{BASE_URL}/{wishlist.id}/items", json=item.serialize())
+                self.assertEqual(resp.status_code, status.HTTP_201_CREATED)
+
+        resp = self.client.get("/api/items/search", query_string={"q": "green hoses", "limit": 4})
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+        self.assert_queries(resp, 1)
+        found = resp.get_json()
+        self.assertEqual(len(found), 4)
+        self.assertEqual(set(found[0]) - {"score"}, set(ItemFactory().serialize()))
+        resp = self.client.get("/api/items/search", query_string={"q": "green hoses", "cursor": resp.headers["X-Next-Cursor"]})
+        found += resp.get_json()
+        self.assertNotIn("X-Next-Cursor", resp.headers)
+        self.assertEqual(len({item["id"] for item in found}), 6)
+        self.assertEqual([item["score"] for item in found], sorted((item["score"] for item in found), reverse=True))
+
+        resp = self.client.get("/api/items/search", query_string={"q": "hose", "wishlist_id": wishlists[0].id})
+        self.assertEqual({item["wishlist_id"] for item in resp.get_json()}, {wishlists[0].id})
+        resp = self.client.get("/api/items/search", query_string={"q": "hose", "user_id": 62})
+        self.assertEqual({item["wishlist_id"] for item in resp.get_json()}, {wishlists[1].id})
+        self.assertEqual(self.client.get("/api/items/search", query_string={"q": "rake"}).get_json(), [])
+        resp = self.client.get("/api/items/search", query_string={"q": "hose", "cursor": "bad"})
+        self.assertEqual(resp.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.client.get("/api/items/search").status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_query_items(self):
+        """It should query the Items of all Wishlists page by page"""
+        wishlists = self._create_wishlists(1, user_id=71) + self._create_wishlists(1, user_id=72)
+        for n in range(3):
+            for wishlist in wishlists:
+                item = ItemFactory(id=4600 + 10 * wishlist.id + n, wishlist_id=wishlist.id,
+                                   category="garden" if n else "kitchen", price=10.0 * (n + 1))
+                resp = self.client.post(f"{BASE_URL}/{wishlist.id}/items", json=item.serialize())
+                self.assertEqual(resp.status_code, status.HTTP_201_CREATED)
+
+        resp = self.client.get("/api/items", query_string={"category": "garden", "limit": 3})
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+        self.assert_queries(resp, 1)
+        found = resp.get_json()
+        self.assertEqual(set(found[0]), set(ItemFactory().serialize()))
+        self.assertIn("cursor=", resp.headers["Link"])
+        resp = self.client.get("/api/items", query_string={"category": "garden", "cursor": resp.headers["X-Next-Cursor"]})
+        self.assertNotIn("X-Next-Cursor", resp.headers)
+        found += resp.get_json()
+        self.assertEqual(len(found), 4)
+        self.assertEqual([item["id"] for item in found], sorted(item["id"] for item in found))
+        self.assertEqual({item["category"] for item in found}, {"garden"})
+
+        resp = self.client.get("/api/items", query_string={"min_price": 15, "max_price": 20, "user_id": 72})
+        self.assertEqual([(item["wishlist_id"], item["price"]) for item in resp.get_json()], [(wishlists[1].id, 20.0)])
+        resp = self.client.get("/api/items", query_string={"wishlist_id": wishlists[0].id})
+        self.assertEqual(len(resp.get_json()), 3)
+        self.assertEqual(len(self.client.get("/api/items").get_json()), 6)
+        resp = self.client.get("/api/items", query_string={"min_price": 20, "max_price": 10})
+        self.assertEqual(resp.status_code, status.HTTP_400_BAD_REQUEST)
+        resp = self.client.get("/api/items", query_string={"min_price": "cheap"})
+        self.assertEqual(resp.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_list_wishlists_by_name_prefix(self):
+        """It should list the wishlists whose name starts with a prefix page by page"""
+        starting = self._create_wishlists(3, name="Holiday gifts")
+        self._create_wishlists(2, name="Summer holiday")
+        resp = self.client.get(BASE_URL, query_string={"name": "holiday", "match": "prefix", "limit": 2})
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+        page = resp.get_json()
+        resp = self.client.get(
+            BASE_URL, query_string={"name": "holiday", "match": "prefix", "cursor": resp.headers["X-Next-Cursor"]}
+        )
+        self.assertEqual([w["id"] for w in page + resp.get_json()], [w.id for w in starting])
+
+        resp = self.client.get(BASE_URL, query_string={"name": "HOLIDAY"})
+        self.assertEqual(len(resp.get_json()), 5)
+        resp = self.client.get(BASE_URL, query_string={"name": "holiday", "match": "regex"})
+        self.assertEqual(resp.status_code, status.HTTP_400_BAD_REQUEST)
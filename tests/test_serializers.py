@@ -0,0 +1,61 @@
+"""
+Test cases for the fast JSON serializers
+
+"""
+import json
+import unittest
+from collections import namedtuple
+from flask_restx import marshal
+from service import serializers
+from service.models import DataValidationError
+from service.routes import item_model, wishlist_model
+from tests.factories import ItemFactory, WishlistFactory
+
+
+######################################################################
+#  S E R I A L I Z E R   T E S T   C A S E S
+######################################################################
+class TestSerializers(unittest.TestCase):
+    """ Test Cases for the single-pass serializers """
+
+    def test_wishlist_matches_marshal(self):
+        """It should encode a Wishlist like marshal_with did"""
+        wishlist = WishlistFactory()
+        wishlist.items = [ItemFactory(wishlist=wishlist, wishlist_id=wishlist.id) for _ in range(3)]
+        expected = marshal(wishlist.serialize(), wishlist_model)
+        self.assertEqual(json.loads(serializers.dump_wishlist(wishlist)), expected)
+        self.assertEqual(json.loads(serializers.dump_wishlists([wishlist])), [expected])
+
+    def test_item_matches_marshal(self):
+        """It should encode Items like marshal_with did"""
+        item = ItemFactory(price=5, description=None)
+        expected = marshal(item.serialize(), item_model)
+        data = json.loads(serializers.dump_item(item))
+        self.assertEqual(data, expected)
+        self.assertIsInstance(data["price"], float)
+        self.assertEqual(json.loads(serializers.dump_items([item])), [expected])
+
+    def test_item_from_row(self):
+        """It should encode column rows with the Item attribute names"""
+        row = namedtuple("Row", serializers.ITEM_FIELDS)(1, 2, "pen", "other", 1.5, "blue")
+        self.assertEqual(
+            serializers.dump_item(row),
+            b'{"id":1,"wishlist_id":2,"name":"pen","category":"other","price":1.5,"description":"blue"}',
+        )
+
+    def test_parse_projection(self):
+        """It should parse sparse fieldsets in the order of the full representation"""
+        self.assertEqual(serializers.parse_projection(None, None), serializers.FULL)
+        self.assertFalse(serializers.parse_projection(None, None, include_items=False).items)
+        self.assertEqual(
+            serializers.parse_projection("user_id, id", None),
+            serializers.Projection(("id", "user_id"), False),
+        )
+        self.assertEqual(serializers.parse_projection("id,items", None), serializers.Projection(("id",), True))
+        self.assertEqual(serializers.parse_projection(None, "items"), serializers.FULL)
+        self.assertEqual(serializers.FULL.etag_parts, ())
+        self.assertEqual(serializers.Projection(("id",), False).etag_parts, ("id", ""))
+        self.assertRaises(DataValidationError, serializers.parse_projection, "id,version", None)
+        self.assertRaises(DataValidationError, serializers.parse_projection, None, "owner")
+        for fields in ("", " , "):
+            self.assertRaises(DataValidationError, serializers.parse_projection, fields, "items")